@@ -0,0 +1,219 @@
+"""
+Fuzzy matching of canonical ingredient names to CIQUAL foods.
+
+Names are reduced to normalized tokens: accents folded, lowercased, French
+plurals stemmed, stop words dropped. So "Épinards frais" becomes
+['epinard', 'frai'] and "Épinard, cru" ['epinard', 'cru']. CIQUAL
+preparation qualifiers ("cru", "cuit", "appertisé", ...) are kept but weigh
+QUALIFIER_WEIGHT of a word in scores, and a food only matches through one of
+its other words, unless it has none: "eau" is the food "Eau", while "cru"
+matches no food.
+
+Candidates come from an inverted index token -> foods, built once. Tokens
+missing from the CIQUAL vocabulary (typos, spelling variants) are expanded
+to their nearest vocabulary tokens through a trigram index. Each candidate
+is scored in [0, 1] on the IDF-weighted share of the ingredient's tokens
+it covers, the share of its own tokens covered and whether both names start
+with the same word. The best score is the match confidence.
+"""
+
+import math
+import re
+import unicodedata
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+STOP_WORDS = {
+    'a', 'au', 'aux', 'avec', 'd', 'de', 'des', 'du', 'en', 'et', 'l', 'la', 'le', 'les',
+    'ou', 'par', 'pour', 'sans', 'sur', 'type', 'un', 'une',
+}
+
+# Preparation and packaging words in CIQUAL names; they mostly say how a food
+# was sampled, not what it is
+QUALIFIERS = {
+    'cru', 'crue', 'cuit', 'cuite', 'bouilli', 'bouillie', 'eau', 'vapeur', 'four', 'micro', 'onde',
+    'grille', 'grillee', 'roti', 'rotie', 'poele', 'poelee', 'frit', 'frite', 'braise', 'braisee',
+    'appertise', 'appertisee', 'egoutte', 'egouttee', 'conserve', 'surgele', 'surgelee',
+    'frais', 'fraiche', 'sec', 'seche', 'deshydrate', 'deshydratee', 'rehydrate', 'rehydratee',
+    'preemballe', 'preemballee', 'aliment', 'moyen', 'moyenne', 'nature', 'entier', 'entiere',
+    'decortique', 'decortiquee', 'pele', 'pelee', 'non', 'prepare', 'preparee',
+}
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+# Share of its IDF weight a qualifier keeps in scores
+QUALIFIER_WEIGHT = 0.2
+
+# Weight of the score components: ingredient tokens covered, candidate
+# tokens covered, same leading word
+INGREDIENT_WEIGHT = 0.65
+FOOD_WEIGHT = 0.25
+HEAD_WEIGHT = 0.10
+
+# Below this, an ingredient is left unlinked rather than guessed
+MIN_CONFIDENCE = 0.6
+
+# Out-of-vocabulary tokens are expanded to vocabulary tokens at least this similar
+MIN_TRIGRAM_SIMILARITY = 0.5
+
+
+def fold(text: str) -> str:
+    """Lowercase `text` without accents or ligatures"""
+    text = text.lower().replace('œ', 'oe').replace('æ', 'ae')
+    return ''.join(c for c in unicodedata.normalize('NFKD', text) if not unicodedata.combining(c))
+
+
+def stem(token: str) -> str:
+    """Singular of a French noun or adjective, close enough for matching:
+    chevaux -> cheval, pois -> poi (the same on both sides is all that matters)"""
+    if len(token) > 4 and token.endswith('aux'):
+        return token[:-3] + 'al'
+    if len(token) > 3 and token[-1] in 'sx' and not token.endswith('ss'):
+        return token[:-1]
+    return token
+
+
+_DROPPED = STOP_WORDS
+_QUALIFIER_TOKENS = {stem(word) for word in QUALIFIERS} | QUALIFIERS
+
+
+def tokens(name: str) -> List[str]:
+    """Normalized tokens of a name, in order, without duplicates"""
+    seen: List[str] = []
+    for token in TOKEN_PATTERN.findall(fold(name)):
+        token = stem(token)
+        if token not in _DROPPED and not token.isdigit() and token not in seen:
+            seen.append(token)
+    return seen
+
+
+def is_qualifier(token: str) -> bool:
+    return token in _QUALIFIER_TOKENS
+
+
+def trigrams(token: str) -> Set[str]:
+    padded = f'  {token} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+@dataclass(frozen=True)
+class Match:
+    ciqual_code: str
+    food_name: str
+    confidence: float
+
+
+class CIQUALMatcher:
+    """Index of CIQUAL foods, queried with canonical ingredient names"""
+
+    def __init__(self, foods: Iterable[Tuple[str, str]]):
+        """`foods` is (ciqual_code, food_name_fr) pairs"""
+        self.codes: List[str] = []
+        self.names: List[str] = []
+        self.food_tokens: List[List[str]] = []
+        self.postings: Dict[str, List[int]] = {}
+        for code, name in foods:
+            food_tokens = tokens(name or '')
+            if not food_tokens:
+                continue
+            index = len(self.codes)
+            self.codes.append(code)
+            self.names.append(name)
+            self.food_tokens.append(food_tokens)
+            for token in food_tokens:
+                self.postings.setdefault(token, []).append(index)
+
+        # Rare tokens identify a food, common ones ("sauce", "farine") barely do
+        count = len(self.codes)
+        self.idf = {
+            token: math.log(1 + count / len(ids)) * (QUALIFIER_WEIGHT if is_qualifier(token) else 1)
+            for token, ids in self.postings.items()
+        }
+        self.unknown_idf = math.log(1 + max(count, 1))
+        self.food_weight = [sum(self.idf[t] for t in food_tokens) for food_tokens in self.food_tokens]
+        # Foods with a word other than a qualifier only match through one;
+        # those named by qualifiers alone ("Eau") match through them
+        self.has_content = [not all(is_qualifier(t) for t in food_tokens) for food_tokens in self.food_tokens]
+
+        self.trigram_index: Dict[str, List[str]] = {}
+        for token in self.postings:
+            for gram in trigrams(token):
+                self.trigram_index.setdefault(gram, []).append(token)
+        self._expansions: Dict[str, List[Tuple[str, float]]] = {}
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def expand(self, token: str) -> List[Tuple[str, float]]:
+        """Vocabulary tokens standing for `token`, with their similarity:
+        the token itself when known, else its closest trigram neighbours"""
+        if token in self.postings:
+            return [(token, 1.0)]
+        if token not in self._expansions:
+            grams = trigrams(token)
+            shared: Dict[str, int] = {}
+            for gram in grams:
+                for other in self.trigram_index.get(gram, ()):
+                    shared[other] = shared.get(other, 0) + 1
+            similar = []
+            for other, common in shared.items():
+                similarity = common / (len(grams) + len(trigrams(other)) - common)
+                if similarity >= MIN_TRIGRAM_SIMILARITY:
+                    similar.append((other, similarity))
+            similar.sort(key=lambda pair: (-pair[1], pair[0]))
+            self._expansions[token] = similar[:3]
+        return self._expansions[token]
+
+    def candidates(self, name: str, limit: int = 5) -> List[Match]:
+        """Best `limit` foods for an ingredient name, most likely first"""
+        query = tokens(name)
+        if not query:
+            return []
+        weights = [
+            self.idf.get(token, self.unknown_idf * (QUALIFIER_WEIGHT if is_qualifier(token) else 1))
+            for token in query
+        ]
+        total = sum(weights)
+
+        # food -> (ingredient weight covered, food weight covered)
+        covered: Dict[int, List[float]] = {}
+        # Foods sharing a word other than a qualifier with the name
+        named: Set[int] = set()
+        for token, weight in zip(query, weights):
+            best: Dict[int, Tuple[float, float]] = {}
+            for other, similarity in self.expand(token):
+                for food in self.postings[other]:
+                    if food not in best or best[food][0] < similarity:
+                        best[food] = (similarity, self.idf[other])
+                    if not is_qualifier(other):
+                        named.add(food)
+            for food, (similarity, food_idf) in best.items():
+                sums = covered.setdefault(food, [0.0, 0.0])
+                sums[0] += weight * similarity
+                sums[1] += food_idf * similarity
+
+        scored = []
+        for food, (ingredient_part, food_part) in covered.items():
+            if self.has_content[food] and food not in named:
+                continue
+            head = self.food_tokens[food][0] == query[0]
+            score = (
+                INGREDIENT_WEIGHT * ingredient_part / total
+                + FOOD_WEIGHT * min(1.0, food_part / self.food_weight[food])
+                + HEAD_WEIGHT * head
+            )
+            # Ties go to the most generic food (fewest words), then the lowest code
+            generic = (len(self.food_tokens[food]), len(TOKEN_PATTERN.findall(fold(self.names[food]))))
+            scored.append((-score, generic, self.codes[food], food))
+        scored.sort()
+        return [
+            Match(self.codes[food], self.names[food], round(-score, 3))
+            for score, _, _, food in scored[:limit]
+        ]
+
+    def match(self, name: str, min_confidence: float = MIN_CONFIDENCE) -> Optional[Match]:
+        """Best food for an ingredient name, or None below `min_confidence`"""
+        best = self.candidates(name, limit=1)
+        if best and best[0].confidence >= min_confidence:
+            return best[0]
+        return None
@@ -55,7 +55,8 @@ CREATE TABLE ciqual.food_composition (
     -- Meta information
     data_source TEXT DEFAULT 'CIQUAL',
     last_updated TIMESTAMPTZ DEFAULT NOW(),
-    data_quality_score INTEGER DEFAULT 100 -- 0-100 quality score
+    data_quality_score INTEGER DEFAULT 100, -- 0-100 quality score
+    content_hash TEXT -- sha256 of the imported row, for delta imports
 );
 
 -- CALNUT complementary data (for nutrients missing in CIQUAL)
@@ -136,6 +137,7 @@ CREATE TABLE vf.canonical_ingredient (
     name TEXT NOT NULL UNIQUE,
     name_normalized TEXT NOT NULL, -- For search optimization
     ciqual_code TEXT REFERENCES ciqual.food_composition(ciqual_code),
+    ciqual_confidence REAL, -- 0-1 score of the name match that set ciqual_code
     off_barcode TEXT, -- OpenFoodFacts barcode link
     tags TEXT[] DEFAULT '{}', -- e.g., ['protein', 'legume', 'soy']
     category TEXT, -- 'protein', 'vegetable', 'grain', 'fruit', 'nut', 'supplement'
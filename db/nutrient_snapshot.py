@@ -0,0 +1,154 @@
+"""
+Compiled CIQUAL nutrient snapshot: one memory-mappable binary file.
+
+Layout (all little-endian):
+    8 bytes   magic b"VFNUTSNP"
+    uint32    format version (FORMAT_VERSION)
+    uint32    header length H
+    H bytes   JSON header: source_sha256, source_name, created_at, rows,
+              keys (the solver's N_KEYS), columns (importer columns in
+              `columns`), arrays {name: {dtype, shape, offset}}
+    arrays    from the first 64-byte boundary after the header, each at a
+              64-byte aligned offset relative to it:
+              ciqual_code, food_name_fr, food_group, food_subgroup  fixed-width UTF-8
+              nutrients  float32 (rows, len(keys)), per 100 g, missing values as 0
+              columns    float64 (rows, len(columns)), missing values as NaN
+
+The solver maps `nutrients` read-only (solver/snapshot.py); the importer
+rebuilds its food rows from `columns` when the source CSV is unchanged.
+"""
+
+import hashlib
+import json
+import math
+import os
+import struct
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+MAGIC = b"VFNUTSNP"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+
+# The solver's N_KEYS (solver/model.py), in order, with the importer column each comes from
+SOLVER_KEYS = {
+    'energy_kcal': 'energy_kcal',
+    'protein_g': 'protein_g',
+    'carbs_g': 'carbohydrates_g',
+    'fat_g': 'fat_g',
+    'fiber_g': 'fiber_g',
+    'b12_ug': 'vitamin_b12_ug',
+    'iron_mg': 'iron_mg',
+    'calcium_mg': 'calcium_mg',
+    'zinc_mg': 'zinc_mg',
+    'iodine_ug': 'iodine_ug',
+    'selenium_ug': 'selenium_ug',
+    'vitamin_d_ug': 'vitamin_d_ug',
+    'ala_g': 'alpha_linolenic_acid_g',
+}
+
+TEXT_COLUMNS = ['ciqual_code', 'food_name_fr', 'food_group', 'food_subgroup']
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def _text_array(values: List[Any]) -> np.ndarray:
+    encoded = [(value or '').encode('utf-8') for value in values]
+    return np.array(encoded, dtype=f"S{max((len(v) for v in encoded), default=0) or 1}")
+
+
+def write_snapshot(path: Path, foods: List[Dict[str, Any]], source: Path, source_sha256: Optional[str] = None) -> Dict[str, Any]:
+    """Write `foods` (process_ciqual_csv rows) as a snapshot of `source`;
+    replaces `path` atomically, so processes mapping the old file keep it"""
+    columns = [key for key in dict.fromkeys(key for food in foods for key in food) if key not in TEXT_COLUMNS]
+    values = np.array(
+        [[math.nan if food.get(column) is None else food[column] for column in columns] for food in foods],
+        dtype='<f8',
+    ).reshape(len(foods), len(columns))
+    nutrients = np.zeros((len(foods), len(SOLVER_KEYS)), dtype='<f4')
+    for k, column in enumerate(SOLVER_KEYS.values()):
+        if column in columns:
+            nutrients[:, k] = np.nan_to_num(values[:, columns.index(column)], nan=0.0)
+
+    arrays = {name: _text_array([food.get(name) for food in foods]) for name in TEXT_COLUMNS}
+    arrays['nutrients'] = nutrients
+    arrays['columns'] = values
+
+    header = {
+        'source_sha256': source_sha256 or file_sha256(source),
+        'source_name': Path(source).name,
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'rows': len(foods),
+        'keys': list(SOLVER_KEYS),
+        'columns': columns,
+        'arrays': {},
+    }
+    offset = 0
+    for name, array in arrays.items():
+        header['arrays'][name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+        offset = _aligned(offset + array.nbytes)
+    encoded = json.dumps(header).encode('utf-8')
+    base = _aligned(16 + len(encoded))
+
+    path = Path(path)
+    tmp = path.with_name(path.name + '.tmp')
+    with open(tmp, 'wb') as f:
+        f.write(MAGIC + struct.pack('<II', FORMAT_VERSION, len(encoded)) + encoded)
+        for name, array in arrays.items():
+            f.seek(base + header['arrays'][name]['offset'])
+            f.write(np.ascontiguousarray(array).tobytes())
+        f.truncate(base + offset)
+    os.replace(tmp, path)
+    return header
+
+
+def read_header(path: Path) -> Optional[Dict[str, Any]]:
+    """Header of the snapshot at `path`, None when missing or of another
+    format version; `data_offset` is where its arrays start"""
+    try:
+        with open(path, 'rb') as f:
+            magic, version, length = struct.unpack('<8sII', f.read(16))
+            if magic != MAGIC or version != FORMAT_VERSION:
+                return None
+            return {**json.loads(f.read(length)), 'data_offset': _aligned(16 + length)}
+    except (OSError, struct.error, ValueError):
+        return None
+
+
+def read_foods(path: Path) -> List[Dict[str, Any]]:
+    """The food rows a snapshot was written from, as process_ciqual_csv returns them"""
+    header = read_header(path)
+    if header is None:
+        raise ValueError(f"{path} is not a version {FORMAT_VERSION} nutrient snapshot")
+    arrays = {}
+    with open(path, 'rb') as f:
+        for name, spec in header['arrays'].items():
+            f.seek(header['data_offset'] + spec['offset'])
+            array = np.frombuffer(f.read(int(np.prod(spec['shape'])) * np.dtype(spec['dtype']).itemsize), dtype=spec['dtype'])
+            arrays[name] = array.reshape(spec['shape'])
+
+    text = {name: [value.decode('utf-8') for value in arrays[name].tolist()] for name in TEXT_COLUMNS}
+    values = arrays['columns'].astype(object)
+    values[np.isnan(arrays['columns'])] = None
+    columns = header['columns']
+    foods = []
+    for i, row in enumerate(values.tolist()):
+        food = {name: text[name][i] for name in TEXT_COLUMNS}
+        food.update(zip(columns, row))
+        if food.get('data_quality_score') is not None:
+            food['data_quality_score'] = int(food['data_quality_score'])
+        foods.append(food)
+    return foods
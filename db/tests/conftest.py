@@ -0,0 +1,39 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# The importer's modules import each other flat, as when run from db/
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+pytest.importorskip('pandas')
+pytest.importorskip('psycopg2')
+
+from import_ciqual import CIQUALImporter
+
+_ENERGY = 'Energie, Règlement UE N° 1169/2011 (kcal/100 g)'
+_PROTEIN = 'Protéines, N x facteur de Jones (g/100 g)'
+_B12 = 'Vitamine B12 (µg/100 g)'
+
+# A CIQUAL-shaped export: French decimals, "<" bounds, "traces" and "-"
+CIQUAL_CSV = '\n'.join([
+    f'alim_code;alim_nom_fr;alim_grp_nom_fr;alim_ssgrp_nom_fr;{_ENERGY};{_PROTEIN};{_B12}',
+    '20047;Épinard, cru;fruits, légumes, légumineuses et oléagineux;légumes;28,6;2,97;traces',
+    '20516;Lentille corail, cuite;fruits, légumes, légumineuses et oléagineux;légumineuses;117;< 0,5;-',
+    '25601;Poulet, rôti;viandes, œufs, poissons;volaille;168;25,6;0,3',
+    '19024;Lait demi-écrémé;produits laitiers;laits;46;3,3;0,2',
+    '9081;Tofu nature;aides culinaires;substituts;123;12,7;',
+    '13000;Pomme, pulpe et peau, crue;fruits;fruits crus;54,4;0,25;0',
+])
+
+
+@pytest.fixture
+def importer(tmp_path):
+    return CIQUALImporter('postgresql://localhost/unused', str(tmp_path / 'data'))
+
+
+@pytest.fixture
+def ciqual_csv(tmp_path):
+    path = tmp_path / 'ciqual.csv'
+    path.write_text(CIQUAL_CSV + '\n', encoding='utf-8')
+    return path
@@ -0,0 +1,79 @@
+class RecordingCursor:
+    """Cursor double keeping the SQL run and the COPY stream sent"""
+
+    def __init__(self):
+        self.statements = []
+        self.copied = None
+
+    def execute(self, sql, params=None):
+        self.statements.append(sql)
+
+    def copy_expert(self, sql, buffer):
+        self.statements.append(sql)
+        self.copied = buffer.read()
+
+
+def unescape(field):
+    """A field of COPY's text format back to its value"""
+    if field == '\\N':
+        return None
+    out, chars = [], iter(field)
+    for c in chars:
+        if c == '\\':
+            c = {'t': '\t', 'n': '\n', 'r': '\r', '\\': '\\'}[next(chars)]
+        out.append(c)
+    return ''.join(out)
+
+
+def food(code, name, **values):
+    return {
+        'ciqual_code': code, 'food_name_fr': name, 'food_group': 'légumes',
+        'food_subgroup': None, 'data_quality_score': 50, **values,
+    }
+
+
+def test_copy_fields_are_escaped(importer):
+    assert importer._copy_field(None) == '\\N'
+    assert importer._copy_field(0.1) == '0.1'
+    assert importer._copy_field(12) == '12'
+    assert importer._copy_field('a\tb\\c\nd\re') == 'a\\tb\\\\c\\nd\\re'
+
+
+def test_staged_rows_round_trip_through_copy(importer):
+    foods = [
+        food('1', 'Pois\tchiche\n"cuit"', energy_kcal=139.5, protein_g=None),
+        food('2', 'Tahin \\ purée', energy_kcal=None, energy_kj=2607.0),
+        food('1', 'Pois chiche', energy_kcal=140.0),
+    ]
+    cursor = RecordingCursor()
+    stats = importer.bulk_load(cursor, foods)
+
+    assert stats['rows'] == 2
+    lines = cursor.copied.split('\n')
+    assert lines[-1] == ''
+    columns = importer.FOOD_COLUMNS + ['content_hash']
+    rows = [dict(zip(columns, map(unescape, line.split('\t')))) for line in lines[:-1]]
+    # The last row of a repeated code wins, as successive upserts would
+    assert [row['food_name_fr'] for row in rows] == ['Pois chiche', 'Tahin \\ purée']
+    assert rows[1]['energy_kcal'] is None
+    assert rows[1]['energy_kj'] == '2607.0'
+    assert rows[1]['food_subgroup'] is None
+    assert rows[0]['content_hash'] == importer.row_fingerprint(foods[2])
+
+
+def test_merge_refreshes_every_imported_column(importer):
+    cursor = RecordingCursor()
+    importer.bulk_load(cursor, [food('1', 'Tofu', energy_kcal=120.0)])
+    copy = next(sql for sql in cursor.statements if sql.startswith('COPY'))
+    assert 'FROM STDIN' in copy
+    merge = next(sql for sql in cursor.statements if 'ON CONFLICT' in sql)
+    for column in importer.FOOD_COLUMNS[1:] + ['content_hash']:
+        assert f'{column} = EXCLUDED.{column}' in merge
+
+
+def test_fingerprint_follows_content(importer):
+    tofu = food('1', 'Tofu', energy_kcal=120.0)
+    assert importer.row_fingerprint(tofu) == importer.row_fingerprint(dict(tofu))
+    assert importer.row_fingerprint(tofu) != importer.row_fingerprint({**tofu, 'energy_kcal': 121.0})
+    # Keys outside FOOD_COLUMNS are not imported, so they do not count
+    assert importer.row_fingerprint(tofu) == importer.row_fingerprint({**tofu, 'note': 'x'})
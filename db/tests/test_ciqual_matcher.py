@@ -0,0 +1,83 @@
+from ciqual_matcher import CIQUALMatcher, fold, stem, tokens
+
+FOODS = [
+    ('20047', 'Épinard, cru'),
+    ('20048', 'Épinard, bouilli/cuit à l\'eau'),
+    ('20516', 'Lentille corail, cuite'),
+    ('20587', 'Lentille verte, sèche'),
+    ('20532', 'Pois chiche, appertisé, égoutté'),
+    ('13000', 'Pomme, pulpe et peau, crue'),
+    ('31016', 'Sauce tomate, préemballée'),
+    ('20208', 'Tomate, crue'),
+    ('9081', 'Tofu nature, préemballé'),
+    ('18066', 'Eau'),
+]
+
+
+def test_names_reduce_to_normalized_tokens():
+    assert fold('Œuf brouillé') == 'oeuf brouille'
+    assert stem('chevaux') == 'cheval'
+    assert stem('lentilles') == 'lentille'
+    assert stem('noix') == 'noi'
+    assert tokens('Épinards frais') == ['epinard', 'frai']
+    assert tokens('Pois chiches cuits à l\'eau') == ['poi', 'chiche', 'cuit', 'eau']
+
+
+def test_accents_plurals_and_qualifiers_match():
+    matcher = CIQUALMatcher(FOODS)
+    assert matcher.match('epinards').ciqual_code == '20047'
+    assert matcher.match('Pois chiches').ciqual_code == '20532'
+    assert matcher.match('Lentilles vertes').ciqual_code == '20587'
+    # The plain food wins over the dish it appears in
+    assert matcher.match('tomates').ciqual_code == '20208'
+    # Qualifiers weigh little, but still tell preparations apart
+    assert matcher.match('Épinards frais').ciqual_code == '20047'
+    assert matcher.match('Épinards cuits à l\'eau').ciqual_code == '20048'
+
+
+def test_foods_named_by_qualifiers_alone_still_link():
+    matcher = CIQUALMatcher(FOODS)
+    assert matcher.match('eau').ciqual_code == '18066'
+    assert [c.ciqual_code for c in matcher.candidates('Eau cuite')] == ['18066']
+
+
+def test_typos_go_through_the_trigram_index():
+    matcher = CIQUALMatcher(FOODS)
+    assert matcher.match('lentile corail').ciqual_code == '20516'
+
+
+def test_unrelated_names_stay_unlinked():
+    matcher = CIQUALMatcher(FOODS)
+    assert matcher.match('seitan') is None
+    assert matcher.match('cru') is None
+    candidates = matcher.candidates('tomate', limit=5)
+    assert [c.ciqual_code for c in candidates] == ['20208', '31016']
+    assert candidates[0].confidence > candidates[1].confidence
+
+
+class LinkCursor:
+    def __init__(self, ingredients, foods):
+        self.results = [ingredients, foods]
+
+    def execute(self, sql, params=None):
+        pass
+
+    def fetchall(self):
+        return self.results.pop(0)
+
+
+def test_link_ingredients_writes_confident_matches(importer, monkeypatch):
+    written = []
+    monkeypatch.setattr(
+        'import_ciqual.execute_values', lambda cur, sql, rows: written.extend(rows)
+    )
+    cursor = LinkCursor(
+        [
+            {'id': 'a1', 'name': 'Épinards'},
+            {'id': 'b2', 'name': 'Seitan'},
+        ],
+        [{'ciqual_code': code, 'food_name_fr': name} for code, name in FOODS],
+    )
+    assert importer.link_ingredients(cursor) == ['20047']
+    assert [(row[0], row[1]) for row in written] == [('a1', '20047')]
+    assert 0.6 <= written[0][2] <= 1
@@ -0,0 +1,107 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+
+def reference_rows(importer, csv_path):
+    """process_ciqual_csv as it was written first: one row and one value at a time"""
+    df = pd.read_csv(csv_path, encoding='utf-8', sep=';')
+    foods = []
+    for _, row in df.iterrows():
+        code = str(row.get('alim_code', '')).strip()
+        name = str(row.get('alim_nom_fr', '')).strip()
+        group = str(row.get('alim_grp_nom_fr', '')).strip()
+        subgroup = str(row.get('alim_ssgrp_nom_fr', '')).strip()
+        if not code or not name or not importer.is_vegan_food(name, group, subgroup):
+            continue
+        nutrients = {
+            ours: importer.clean_numeric_value(row[theirs])
+            for theirs, ours in importer.NUTRIENT_MAPPING.items()
+            if theirs in row
+        }
+        available = sum(1 for v in nutrients.values() if v is not None)
+        foods.append({
+            'ciqual_code': code,
+            'food_name_fr': name,
+            'food_group': group,
+            'food_subgroup': subgroup,
+            'data_quality_score': int(available / len(importer.NUTRIENT_MAPPING) * 100),
+            **nutrients,
+        })
+    return foods
+
+
+def test_rows_match_the_row_by_row_version(importer, ciqual_csv):
+    assert importer.process_ciqual_csv(ciqual_csv) == reference_rows(importer, ciqual_csv)
+
+
+def test_spelled_out_nan_is_missing_unlike_the_row_by_row_version(importer, ciqual_csv):
+    ciqual_csv.write_text(ciqual_csv.read_text(encoding='utf-8').replace('2,97', 'NAN'), encoding='utf-8')
+    ours = importer.process_ciqual_csv(ciqual_csv)
+    reference = reference_rows(importer, ciqual_csv)
+    assert [food['ciqual_code'] for food in ours] == [food['ciqual_code'] for food in reference]
+    for food, expected in zip(ours, reference):
+        if food['ciqual_code'] != '20047':
+            assert food == expected
+            continue
+        # The row-by-row version counted the NaN as an available value
+        assert food['protein_g'] is None and math.isnan(expected['protein_g'])
+        assert food['data_quality_score'] == int(1 / 21 * 100)
+        assert expected['data_quality_score'] == int(2 / 21 * 100)
+        assert {k: v for k, v in food.items() if k not in ('protein_g', 'data_quality_score')} == {
+            k: v for k, v in expected.items() if k not in ('protein_g', 'data_quality_score')
+        }
+
+
+def test_non_vegan_foods_are_dropped_and_values_cleaned(importer, ciqual_csv):
+    foods = {food['food_name_fr']: food for food in importer.process_ciqual_csv(ciqual_csv)}
+    assert sorted(foods) == [
+        'Lentille corail, cuite', 'Pomme, pulpe et peau, crue', 'Tofu nature', 'Épinard, cru',
+    ]
+    assert foods['Épinard, cru']['ciqual_code'] == '20047'
+    assert foods['Épinard, cru']['energy_kcal'] == 28.6
+    assert foods['Épinard, cru']['vitamin_b12_ug'] is None
+    assert foods['Lentille corail, cuite']['protein_g'] == 0.5
+    assert foods['Pomme, pulpe et peau, crue']['vitamin_b12_ug'] == 0.0
+    assert foods['Pomme, pulpe et peau, crue']['data_quality_score'] == int(3 / 21 * 100)
+
+
+def test_numeric_cleaning_matches_value_by_value(importer):
+    values = [
+        '12,5', ' 3 ', '< 0,5', '>1', 'traces', '-', '', None, np.nan, '1e-3', '1_000',
+        'inf', 'nan', 'NAN', '.5', '7.', '+2', '1,2,3', 4, 2.5,
+    ]
+    column = pd.Series(values, dtype=object)
+    cleaned = importer.clean_numeric_column(column)
+    for value, got in zip(values, cleaned):
+        expected = importer.clean_numeric_value(value)
+        if expected is None or math.isnan(expected):
+            assert math.isnan(got), value
+        else:
+            assert got == expected, value
+
+    column_of = {ours: theirs for theirs, ours in importer.NUTRIENT_MAPPING.items()}
+    frame = pd.DataFrame({
+        column_of['energy_kcal']: ['28,6', 'traces', '28,6'],
+        column_of['protein_g']: [1.5, np.nan, 2.0],
+        column_of['vitamin_b12_ug']: ['-', '< 0,1', '0'],
+    })
+    np.testing.assert_array_equal(
+        importer.clean_numeric_frame(frame),
+        [[28.6, 1.5, np.nan], [np.nan, np.nan, 0.1], [28.6, 2.0, 0.0]],
+    )
+
+
+def test_vegan_mask_matches_is_vegan_food(importer):
+    rows = [
+        ('Tofu nature', 'aides culinaires', 'substituts'),
+        ('Pain au lait', 'produits céréaliers', 'pains'),
+        ('Haricot vert', 'Viandes', ''),
+        ('Boisson au soja', 'boissons', 'LAIT végétal'),
+        ('Biscuit', 'produits sucrés', 'gâteaux'),
+    ]
+    name, group, subgroup = (pd.Series(column, dtype=object) for column in zip(*rows))
+    assert importer.vegan_mask(name, group, subgroup).tolist() == [
+        importer.is_vegan_food(*row) for row in rows
+    ]
@@ -0,0 +1,136 @@
+import pytest
+
+
+class Connection:
+    """Connection double: the importer only needs a cursor and the transaction calls"""
+
+    def __init__(self):
+        self.commits = self.rollbacks = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def cursor(self, cursor_factory=None):
+        return self
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def execute(self, sql, params=None):
+        pass
+
+
+@pytest.fixture
+def delta(importer, monkeypatch):
+    """Runs import_delta against `stored` fingerprints, recording what it writes"""
+    calls = {'loaded': None, 'deleted': None, 'linked': None}
+    conn = Connection()
+    monkeypatch.setattr(importer, 'connect_database', lambda: conn)
+    monkeypatch.setattr(importer, 'ensure_tables_exist', lambda cur: None)
+
+    def bulk_load(cur, foods):
+        calls['loaded'] = [food['ciqual_code'] for food in foods]
+        return {'rows': len(foods), 'rows_per_sec': 0.0}
+
+    monkeypatch.setattr(importer, 'bulk_load', bulk_load)
+    monkeypatch.setattr(importer, 'delete_foods', lambda cur, codes: calls.update(deleted=codes))
+    monkeypatch.setattr(importer, 'update_canonical_ingredients', lambda cur, codes=None: calls.update(linked=codes))
+
+    def run(foods, stored, dry_run=False):
+        monkeypatch.setattr(importer, 'stored_fingerprints', lambda cur: stored)
+        return importer.import_delta(foods, dry_run=dry_run), calls, conn
+
+    return run
+
+
+def stored_as(importer, foods):
+    return {
+        food['ciqual_code']: {'content_hash': importer.row_fingerprint(food), 'food_name_fr': food['food_name_fr']}
+        for food in foods
+    }
+
+
+FOODS = [
+    {'ciqual_code': '1', 'food_name_fr': 'Tofu', 'energy_kcal': 120.0},
+    {'ciqual_code': '2', 'food_name_fr': 'Lentille', 'energy_kcal': 116.0},
+    {'ciqual_code': '3', 'food_name_fr': 'Pois chiche', 'energy_kcal': 139.0},
+]
+
+
+def test_diff_sorts_codes_into_insert_update_delete(importer):
+    stored = stored_as(importer, FOODS[:2])
+    stored['9'] = {'content_hash': 'x', 'food_name_fr': 'Gone'}
+    stored['1']['content_hash'] = None  # imported before fingerprints existed
+    rows = {food['ciqual_code']: food for food in FOODS}
+    diff = importer.diff_foods(rows, stored)
+    assert diff == {'insert': ['3'], 'update': ['1'], 'delete': ['9']}
+    assert importer.format_diff(diff, rows, stored) == [
+        '+ 3 Pois chiche', '~ 1 Tofu', '- 9 Gone', '1 to insert, 1 to update, 1 to delete',
+    ]
+
+
+def test_only_changed_foods_are_written(importer, delta):
+    changed = {**FOODS[1], 'energy_kcal': 117.0}
+    stored = stored_as(importer, FOODS)
+    diff, calls, conn = delta([FOODS[0], changed], stored)
+
+    assert diff == {'insert': [], 'update': ['2'], 'delete': ['3']}
+    assert calls['loaded'] == ['2']
+    assert calls['deleted'] == ['3']
+    assert calls['linked'] == ['2']
+    assert conn.commits == 2
+
+
+def test_unchanged_foods_still_link_new_ingredients(importer, delta):
+    diff, calls, conn = delta(FOODS, stored_as(importer, FOODS))
+    assert diff == {'insert': [], 'update': [], 'delete': []}
+    assert calls['loaded'] is None and calls['deleted'] is None
+    assert calls['linked'] == []
+    assert conn.commits == 1
+
+
+class LinkCursor:
+    """The ingredient table and its link column exist; no ingredient is new"""
+
+    rowcount = 0
+
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, sql, params=None):
+        self.statements.append((' '.join(sql.split()), params))
+
+    def fetchone(self):
+        return {'ready': True, 'present': True}
+
+    def fetchall(self):
+        return []
+
+
+def test_unchanged_foods_only_match_new_ingredients(importer):
+    cursor = LinkCursor()
+    importer.update_canonical_ingredients(cursor, [])
+    assert not [sql for sql, _ in cursor.statements if sql.startswith(('ALTER', 'INSERT', 'UPDATE'))]
+    assert cursor.statements[-1][1] == {'new_only': True}
+
+    cursor = LinkCursor()
+    importer.update_canonical_ingredients(cursor, ['2'])
+    assert ('SELECT', {'new_only': False}) in [(sql[:6], params) for sql, params in cursor.statements]
+    assert cursor.statements[-1][0].startswith('INSERT INTO vf.ingredient_nutrients')
+
+
+def test_empty_database_and_dry_runs_write_nothing(importer, delta):
+    _, calls, conn = delta([], {})
+    assert calls['linked'] is None
+    assert conn.rollbacks == 1
+
+    diff, calls, conn = delta(FOODS, {}, dry_run=True)
+    assert diff['insert'] == ['1', '2', '3']
+    assert calls['loaded'] is None and calls['linked'] is None
+    assert conn.commits == 0
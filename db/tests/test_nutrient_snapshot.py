@@ -0,0 +1,62 @@
+import math
+
+import numpy as np
+
+from nutrient_snapshot import FORMAT_VERSION, SOLVER_KEYS, read_foods, read_header, write_snapshot
+
+
+def test_snapshot_round_trips_the_food_rows(importer, ciqual_csv, tmp_path):
+    foods = importer.process_ciqual_csv(ciqual_csv)
+    path = tmp_path / 'ciqual.snapshot'
+    header = write_snapshot(path, foods, ciqual_csv)
+
+    assert header['rows'] == len(foods)
+    assert header['keys'] == list(SOLVER_KEYS)
+    stored = read_header(path)
+    assert stored['source_sha256'] == header['source_sha256']
+    assert stored['data_offset'] % 64 == 0
+    assert read_foods(path) == foods
+
+
+def test_nutrient_matrix_follows_solver_keys(importer, ciqual_csv, tmp_path):
+    foods = importer.process_ciqual_csv(ciqual_csv)
+    path = tmp_path / 'ciqual.snapshot'
+    header = write_snapshot(path, foods, ciqual_csv)
+
+    spec = header['arrays']['nutrients']
+    assert spec['dtype'] == '<f4' and spec['offset'] % 64 == 0
+    with open(path, 'rb') as f:
+        f.seek(read_header(path)['data_offset'] + spec['offset'])
+        nutrients = np.frombuffer(f.read(4 * len(foods) * len(SOLVER_KEYS)), dtype='<f4')
+    nutrients = nutrients.reshape(spec['shape'])
+    for row, food in zip(nutrients, foods):
+        for value, column in zip(row, SOLVER_KEYS.values()):
+            expected = food.get(column)
+            assert value == np.float32(0 if expected is None or math.isnan(expected) else expected)
+
+
+def test_other_files_and_versions_are_not_snapshots(tmp_path, ciqual_csv):
+    assert read_header(tmp_path / 'missing') is None
+    assert read_header(ciqual_csv) is None
+    path = tmp_path / 'ciqual.snapshot'
+    write_snapshot(path, [], ciqual_csv)
+    data = bytearray(path.read_bytes())
+    data[8] = FORMAT_VERSION + 1
+    path.write_bytes(bytes(data))
+    assert read_header(path) is None
+
+
+def test_unchanged_source_reuses_the_snapshot(importer, ciqual_csv, tmp_path, monkeypatch):
+    snapshot = str(tmp_path / 'ciqual.snapshot')
+    foods = importer.load_foods(ciqual_csv, snapshot)
+
+    parsed = []
+    process = importer.process_ciqual_csv
+    monkeypatch.setattr(importer, 'process_ciqual_csv', lambda path: parsed.append(path) or process(path))
+    assert importer.load_foods(ciqual_csv, snapshot) == foods
+    assert parsed == []
+
+    ciqual_csv.write_text(ciqual_csv.read_text(encoding='utf-8').replace('28,6', '29,0'), encoding='utf-8')
+    changed = importer.load_foods(ciqual_csv, snapshot)
+    assert parsed == [ciqual_csv]
+    assert [food['energy_kcal'] for food in changed if food['ciqual_code'] == '20047'] == [29.0]
@@ -0,0 +1,261 @@
+"""Batch solves spread over a process pool (POST /solve/batch).
+
+Recipe pools are resolved in the API process before anything is submitted:
+each distinct inline recipe list is packed once into an unregistered Catalog
+and catalog_id requests use the registered one. Each distinct pool is then
+pickled once to a file of the batch; items carry only its path and digest,
+and a worker unpickles a pool the first time it sees its digest and keeps it
+for later items (and batches) on the same pool. Workers thus receive a
+recipe-less request instead of re-validating and re-packing the same recipes,
+or re-receiving the same matrix, for every item. Results are yielded as soon
+as each item finishes and are cached in the API process under the same keys
+as /solve.
+"""
+
+import asyncio
+import hashlib
+import multiprocessing as mp
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from pydantic import TypeAdapter
+
+from cache import solution_cache
+from catalog import Catalog
+from metrics import observe_result
+from model import pack_recipes
+from planner import cache_key, resolve_catalog, solve_request
+from schemas import Recipe, SolveRequest
+
+SOLVER_BATCH_WORKERS = int(os.getenv("SOLVER_BATCH_WORKERS", os.cpu_count() or 1))
+# Unpickled pools each worker keeps, by digest
+SOLVER_BATCH_WORKER_POOLS = int(os.getenv("SOLVER_BATCH_WORKER_POOLS", "8"))
+
+_recipe_list = TypeAdapter(List[Recipe])
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ProcessPoolExecutor:
+    """Process-wide batch pool, started on first use"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=max(1, SOLVER_BATCH_WORKERS),
+                mp_context=mp.get_context("spawn"),
+            )
+        return _executor
+
+
+def _reset_executor(broken: ProcessPoolExecutor) -> None:
+    """Drop a pool whose worker died so the next batch starts a fresh one"""
+    global _executor
+    with _executor_lock:
+        if _executor is broken:
+            _executor = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+# Worker side: pools already unpickled, least recently used first
+_worker_pools: "OrderedDict[str, Catalog]" = OrderedDict()
+
+
+def _worker_catalog(path: str, digest: str) -> Catalog:
+    catalog = _worker_pools.get(digest)
+    if catalog is None:
+        with open(path, "rb") as f:
+            catalog = pickle.load(f)
+        _worker_pools[digest] = catalog
+        while len(_worker_pools) > max(1, SOLVER_BATCH_WORKER_POOLS):
+            _worker_pools.popitem(last=False)
+    else:
+        _worker_pools.move_to_end(digest)
+    return catalog
+
+
+def solve_item(
+    req: SolveRequest, pool: Tuple[str, str]
+) -> Tuple[Dict[str, Any], float]:
+    """Worker entry point: (response, solve ms) of one batch item; `pool` is
+    the (path, digest) of its pickled Catalog"""
+    start = time.perf_counter()
+    result = solve_request(req, catalog=_worker_catalog(*pool))
+    return result, (time.perf_counter() - start) * 1000
+
+
+def _error(e: Exception) -> Dict[str, Any]:
+    if isinstance(e, ValueError):
+        return {"status_code": 400, "detail": str(e)}
+    return {"status_code": 500, "detail": f"{type(e).__name__}: {e}"}
+
+
+class _Pools:
+    """Packed pools of a batch, one per distinct recipe list, each pickled
+    once to a file in the batch's temporary directory"""
+
+    def __init__(self, shared: List[Recipe]):
+        self.shared = shared
+        self.catalogs: Dict[str, Catalog] = {}
+        self.files: Dict[str, str] = {}
+        self.directory: Optional[str] = None
+        self.pack_ms = 0.0
+
+    def resolve(self, req: SolveRequest) -> Tuple[Catalog, str, SolveRequest]:
+        """(pool, cache key, request to send) for one item"""
+        if req.catalog_id:
+            return resolve_catalog(req), cache_key(req), req
+        recipes = req.recipes or self.shared
+        if not recipes:
+            raise ValueError(
+                "recipes (or catalog_id) required, on the request or the batch"
+            )
+        digest = hashlib.sha256(_recipe_list.dump_json(recipes)).hexdigest()
+        catalog = self.catalogs.get(digest)
+        if catalog is None:
+            start = time.perf_counter()
+            catalog = Catalog(
+                id=f"batch-{digest[:12]}",
+                version=1,
+                digest=digest,
+                matrix=pack_recipes(recipes),
+                registered_at=time.time(),
+            )
+            self.catalogs[digest] = catalog
+            self.pack_ms += (time.perf_counter() - start) * 1000
+        # The key /solve computes for the same request with these recipes
+        key = cache_key(
+            req if req.recipes else req.model_copy(update={"recipes": recipes})
+        )
+        return catalog, key, req.model_copy(update={"recipes": []})
+
+    def spill(self, catalog: Catalog) -> Tuple[str, str]:
+        """(path, digest) of the pool's file, written when first submitted"""
+        path = self.files.get(catalog.digest)
+        if path is None:
+            if self.directory is None:
+                self.directory = tempfile.mkdtemp(prefix="solver-batch-")
+            path = os.path.join(self.directory, f"{catalog.digest}.pickle")
+            with open(path, "wb") as f:
+                pickle.dump(catalog, f, protocol=pickle.HIGHEST_PROTOCOL)
+            self.files[catalog.digest] = path
+        return path, catalog.digest
+
+    def close(self) -> None:
+        if self.directory is not None:
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+
+async def run_batch(
+    requests: List[SolveRequest], shared: Optional[List[Recipe]] = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """Yield one `{index, status, plan, meta, solve_ms, elapsed_ms}` (or
+    `{index, error, elapsed_ms}`) line per request as it finishes, then a
+    `{summary}` line. Identical requests are solved once."""
+    loop = asyncio.get_running_loop()
+    start = time.perf_counter()
+    executor = get_executor()
+    pools = _Pools(shared or [])
+    waiting: Dict[asyncio.Future, Tuple[str, List[int]]] = {}
+    # Solves in flight by cache key; a finished key is served from the cache
+    by_key: Dict[str, asyncio.Future] = {}
+    done = {"ok": 0, "failed": 0, "cached": 0, "submitted": 0}
+
+    def elapsed() -> float:
+        return round((time.perf_counter() - start) * 1000, 2)
+
+    def finished(
+        index: int, result: Dict[str, Any], solve_ms: float, cached: bool
+    ) -> Dict[str, Any]:
+        done["ok"] += 1
+        done["cached"] += cached
+        meta = {**result.get("meta", {}), "cached": cached}
+        line = {
+            "index": index,
+            **result,
+            "meta": meta,
+            "solve_ms": round(solve_ms, 2),
+            "elapsed_ms": elapsed(),
+        }
+        observe_result("/solve/batch", line)
+        return line
+
+    def failed(index: int, e: Exception) -> Dict[str, Any]:
+        done["failed"] += 1
+        return {"index": index, "error": _error(e), "elapsed_ms": elapsed()}
+
+    def collect(future: asyncio.Future) -> List[Dict[str, Any]]:
+        key, indices = waiting.pop(future)
+        del by_key[key]
+        try:
+            result, solve_ms = future.result()
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool):
+                _reset_executor(executor)
+            return [failed(index, e) for index in indices]
+        solution_cache.put(key, result)
+        return [finished(index, result, solve_ms, False) for index in indices]
+
+    try:
+        for index, req in enumerate(requests):
+            try:
+                # Packing and hashing stay off the event loop
+                catalog, key, item = await loop.run_in_executor(
+                    None, pools.resolve, req
+                )
+            except Exception as e:
+                yield failed(index, e)
+                continue
+            if key in by_key:
+                waiting[by_key[key]][1].append(index)
+                continue
+            result = solution_cache.get(key)
+            if result is not None:
+                yield finished(index, result, 0.0, True)
+                continue
+            try:
+                pool = await loop.run_in_executor(None, pools.spill, catalog)
+            except OSError as e:
+                yield failed(index, e)
+                continue
+            future = asyncio.wrap_future(executor.submit(solve_item, item, pool))
+            by_key[key] = future
+            waiting[future] = (key, [index])
+            done["submitted"] += 1
+            # Report items that finished while later ones were being prepared
+            for future in [f for f in waiting if f.done()]:
+                for line in collect(future):
+                    yield line
+
+        while waiting:
+            ready, _ = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+            for future in ready:
+                for line in collect(future):
+                    yield line
+    finally:
+        # Client gone: queued items are not worth solving any more
+        for future in waiting:
+            future.cancel()
+        pools.close()
+
+    wall = time.perf_counter() - start
+    yield {
+        "summary": {
+            "items": len(requests),
+            **done,
+            "pools_packed": len(pools.catalogs),
+            "pack_ms": round(pools.pack_ms, 2),
+            "workers": max(1, SOLVER_BATCH_WORKERS),
+            "wall_ms": round(wall * 1000, 2),
+            "items_per_sec": round(len(requests) / wall, 2) if wall > 0 else None,
+        }
+    }
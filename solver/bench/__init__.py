@@ -0,0 +1,14 @@
+"""Reproducible benchmarks for the solver.
+
+Run from solver/ (the service modules are imported flat, as in main.py):
+
+    python -m bench run --suite default --out before.json
+    python -m bench run --suite default --out after.json
+    python -m bench compare before.json after.json
+    python -m bench load --clients 8 --requests 200
+    python -m bench request --recipes 500 --days 7 > request.json
+    python -m bench wire --sizes 1000 5000
+
+Every case is generated from a seed, so two runs on the same tree solve the
+same requests; `compare` flags cases whose timings or objective got worse.
+"""
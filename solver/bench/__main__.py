@@ -0,0 +1,192 @@
+"""Command line: python -m bench {run,compare,load,request,wire} (from solver/)"""
+
+import argparse
+import json
+import sys
+
+from bench.compare import compare_runs, environment_mismatch
+from bench.workload import SUITES, TARGET_PROFILES, Case, make_request
+
+
+def _case(args: argparse.Namespace) -> Case:
+    return Case(
+        recipes=args.recipes,
+        days=args.days,
+        profile=args.profile,
+        dislike_rate=args.dislike_rate,
+        pinned_rate=args.pinned_rate,
+        mode=args.mode,
+        engine=args.engine,
+        time_limit_sec=args.time_limit,
+        seed=args.seed,
+    )
+
+
+def _add_case_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--recipes", type=int, default=500)
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument(
+        "--profile", choices=sorted(TARGET_PROFILES), default="adult_female"
+    )
+    parser.add_argument(
+        "--dislike-rate", type=float, default=0.0, help="Fraction of recipes disliked"
+    )
+    parser.add_argument(
+        "--pinned-rate", type=float, default=0.0, help="Fraction of slots pinned"
+    )
+    parser.add_argument("--mode", choices=["exact", "fast", "anytime"], default="exact")
+    parser.add_argument("--engine", choices=["cbc", "scip", "cp-sat"])
+    parser.add_argument("--time-limit", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m bench", description="Solver benchmarks"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser(
+        "run", help="Run a suite in-process and write the results as JSON"
+    )
+    run.add_argument("--suite", choices=sorted(SUITES), default="smoke")
+    run.add_argument("--only", help="Run only cases whose name contains this")
+    run.add_argument(
+        "--repeat", type=int, default=1, help="Solves per case; timings are medians"
+    )
+    run.add_argument("--out", help="Output file (stdout when omitted)")
+
+    compare = commands.add_parser(
+        "compare", help="Flag regressions of a run against a baseline run"
+    )
+    compare.add_argument("baseline")
+    compare.add_argument("current")
+    compare.add_argument(
+        "--time-tolerance", type=float, default=0.15, help="Relative slowdown allowed"
+    )
+    compare.add_argument(
+        "--min-delta-ms", type=float, default=5.0, help="Slowdowns below this are noise"
+    )
+    compare.add_argument("--objective-tolerance", type=float, default=0.01)
+    compare.add_argument("--rss-tolerance", type=float, default=0.2)
+
+    load = commands.add_parser(
+        "load", help="Drive the HTTP service with concurrent clients"
+    )
+    _add_case_arguments(load)
+    load.add_argument(
+        "--url", help="Service to load; a local uvicorn is started when omitted"
+    )
+    load.add_argument(
+        "--server-workers",
+        type=int,
+        default=1,
+        help="uvicorn workers of the local server",
+    )
+    load.add_argument("--path", default="/solve")
+    load.add_argument("--clients", type=int, default=4)
+    load.add_argument("--requests", type=int, default=100)
+    load.add_argument(
+        "--unique", type=int, default=10, help="Distinct requests cycled through"
+    )
+    load.add_argument("--out")
+
+    request = commands.add_parser(
+        "request", help="Print the SolveRequest of one generated case"
+    )
+    _add_case_arguments(request)
+
+    wire = commands.add_parser(
+        "wire", help="Bytes and decode time of /solve bodies per wire format"
+    )
+    wire.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[1000, 2000, 5000],
+        help="Recipe pool sizes",
+    )
+    wire.add_argument("--days", type=int, default=7)
+    wire.add_argument(
+        "--repeat", type=int, default=5, help="Timings are medians over this many runs"
+    )
+    wire.add_argument("--out")
+
+    args = parser.parse_args()
+
+    if args.command == "request":
+        json.dump(make_request(_case(args)), sys.stdout)
+        return 0
+
+    if args.command == "compare":
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.current) as f:
+            current = json.load(f)
+        for line in environment_mismatch(baseline, current):
+            print(f"warning: environments differ, {line}", file=sys.stderr)
+        changes = compare_runs(
+            baseline,
+            current,
+            args.time_tolerance,
+            args.min_delta_ms,
+            args.objective_tolerance,
+            args.rss_tolerance,
+        )
+        for change in changes:
+            print(change)
+        regressions = sum(change.regression for change in changes)
+        print(
+            f"{regressions} regression(s), {len(changes) - regressions} improvement(s)"
+        )
+        return 1 if regressions else 0
+
+    if args.command == "wire":
+        from bench.wire import run_wire, summary
+
+        report = run_wire(args.sizes, args.days, args.repeat)
+        for line in summary(report):
+            print(line, file=sys.stderr)
+    elif args.command == "run":
+        from bench.runner import run_suite
+
+        cases = [
+            case
+            for case in SUITES[args.suite]
+            if not args.only or args.only in case.name
+        ]
+        report = run_suite(
+            cases, args.repeat, log=lambda line: print(line, file=sys.stderr)
+        )
+        report["suite"] = args.suite
+    else:
+        from bench.load import local_server, run_load
+
+        case = _case(args)
+        if args.url:
+            report = run_load(
+                args.url, case, args.clients, args.requests, args.unique, args.path
+            )
+        else:
+            with local_server(args.server_workers) as url:
+                report = run_load(
+                    url, case, args.clients, args.requests, args.unique, args.path
+                )
+        latency = report["latency_ms"]
+        print(
+            f"{report['requests']} requests, {report['clients']} clients: {report['throughput_rps']} req/s, "
+            f"p50={latency['p50']}ms p95={latency['p95']}ms p99={latency['p99']}ms, statuses {report['statuses']}",
+            file=sys.stderr,
+        )
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
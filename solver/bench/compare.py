@@ -0,0 +1,108 @@
+"""Compare two benchmark runs and flag regressions.
+
+A case regresses when it got slower by more than `time_tolerance` (relative)
+and `min_delta_ms` (absolute, so sub-millisecond noise is ignored), when its
+objective got worse by more than `objective_tolerance` (relative), when its
+peak RSS grew by more than `rss_tolerance`, or when it stopped finding a plan.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+COMPARED_TIMINGS = ("build_ms", "solve_ms", "total_ms")
+SOLVED = {"Optimal", "Feasible", "Heuristic"}
+
+
+@dataclass
+class Change:
+    case: str
+    metric: str
+    before: Optional[float]
+    after: Optional[float]
+    regression: bool
+
+    @property
+    def ratio(self) -> Optional[float]:
+        if self.before is None or self.after is None or self.before == 0:
+            return None
+        return self.after / self.before
+
+    def __str__(self) -> str:
+        ratio = "" if self.ratio is None else f" ({self.ratio - 1:+.1%})"
+        flag = "REGRESSION" if self.regression else "improved"
+        return (
+            f"{flag:10} {self.case} {self.metric}: {self.before} -> {self.after}{ratio}"
+        )
+
+
+def _relative(before: Optional[float], after: Optional[float]) -> Optional[float]:
+    if before is None or after is None:
+        return None
+    return (after - before) / max(abs(before), 1e-9)
+
+
+def compare_runs(
+    before: Dict[str, Any],
+    after: Dict[str, Any],
+    time_tolerance: float = 0.15,
+    min_delta_ms: float = 5.0,
+    objective_tolerance: float = 0.01,
+    rss_tolerance: float = 0.2,
+) -> List[Change]:
+    """Regressions and notable improvements of `after` against `before`, case by case"""
+    baseline = {row["name"]: row for row in before["cases"] if "error" not in row}
+    changes: List[Change] = []
+    for row in after["cases"]:
+        name = row["name"]
+        old = baseline.get(name)
+        if old is None:
+            continue
+        if "error" in row:
+            changes.append(Change(name, "error", None, None, True))
+            continue
+        if old["status"] in SOLVED and row["status"] not in SOLVED:
+            changes.append(
+                Change(
+                    name, f"status {old['status']} -> {row['status']}", None, None, True
+                )
+            )
+            continue
+
+        for key in COMPARED_TIMINGS:
+            a, b = old["timings"].get(key), row["timings"].get(key)
+            change = _relative(a, b)
+            if change is None or abs(b - a) < min_delta_ms:
+                continue
+            if change > time_tolerance:
+                changes.append(Change(name, key, a, b, True))
+            elif change < -time_tolerance:
+                changes.append(Change(name, key, a, b, False))
+
+        # Objectives are minimized; only comparable when both runs found a plan
+        change = _relative(old["objective"], row["objective"])
+        if change is not None and abs(change) > objective_tolerance:
+            changes.append(
+                Change(
+                    name, "objective", old["objective"], row["objective"], change > 0
+                )
+            )
+
+        change = _relative(old["peak_rss_mb"], row["peak_rss_mb"])
+        if change is not None and change > rss_tolerance:
+            changes.append(
+                Change(
+                    name, "peak_rss_mb", old["peak_rss_mb"], row["peak_rss_mb"], True
+                )
+            )
+    return changes
+
+
+def environment_mismatch(before: Dict[str, Any], after: Dict[str, Any]) -> List[str]:
+    """Environment fields that differ between the runs, which make timings incomparable"""
+    keys = ("machine", "cpu_count", "python", "ortools")
+    a, b = before.get("environment", {}), after.get("environment", {})
+    return [
+        f"{key}: {a.get(key)} -> {b.get(key)}"
+        for key in keys
+        if a.get(key) != b.get(key)
+    ]
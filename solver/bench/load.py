@@ -0,0 +1,180 @@
+"""End-to-end load test: concurrent clients against a running service.
+
+Without a URL, a uvicorn instance is started on a free local port for the
+duration of the test. Each client is a thread with its own keep-alive
+connection, sending the generated requests in turn; distinct seeds give
+distinct requests, so `unique` controls how much the solution cache helps.
+"""
+
+import http.client
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import replace
+from typing import Any, Dict, Iterator, List, Optional
+from urllib.parse import urlsplit
+
+from bench.workload import Case, make_request
+
+SOLVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@contextmanager
+def local_server(workers: int = 1, startup_sec: float = 30.0) -> Iterator[str]:
+    """Base URL of a uvicorn instance serving main:app, stopped on exit"""
+    port = _free_port()
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "main:app",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(port),
+            "--workers",
+            str(workers),
+            "--log-level",
+            "warning",
+        ],
+        cwd=SOLVER_DIR,
+    )
+    url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + startup_sec
+        while True:
+            try:
+                status, _ = _request(
+                    http.client.HTTPConnection("127.0.0.1", port, timeout=1),
+                    "GET",
+                    "/health",
+                    None,
+                )
+                if status == 200:
+                    break
+            except OSError:
+                pass
+            if process.poll() is not None or time.monotonic() > deadline:
+                raise RuntimeError("uvicorn did not start")
+            time.sleep(0.2)
+        yield url
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def _request(
+    conn: http.client.HTTPConnection, method: str, path: str, body: Optional[bytes]
+):
+    conn.request(method, path, body=body, headers={"Content-Type": "application/json"})
+    response = conn.getresponse()
+    return response.status, response.read()
+
+
+def _percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = q / 100 * (len(ordered) - 1)
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return round(ordered[low] + (ordered[high] - ordered[low]) * (rank - low), 2)
+
+
+def run_load(
+    url: str,
+    case: Case,
+    clients: int = 4,
+    requests: int = 100,
+    unique: int = 10,
+    path: str = "/solve",
+    warmup: int = 1,
+) -> Dict[str, Any]:
+    """Send `requests` requests from `clients` concurrent clients, cycling
+    through `unique` distinct payloads (seeds case.seed .. case.seed + unique - 1)"""
+    bodies = [
+        json.dumps(make_request(replace(case, seed=case.seed + i))).encode()
+        for i in range(unique)
+    ]
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+
+    for body in bodies[:warmup]:
+        _request(
+            http.client.HTTPConnection(host, port, timeout=600), "POST", path, body
+        )
+
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    cached = 0
+    lock = threading.Lock()
+    counter = iter(range(requests))
+
+    def client() -> None:
+        nonlocal cached
+        conn = http.client.HTTPConnection(host, port, timeout=600)
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            start = time.perf_counter()
+            try:
+                status, raw = _request(conn, "POST", path, bodies[i % unique])
+                label = str(status)
+                hit = status == 200 and json.loads(raw).get("meta", {}).get(
+                    "cached", False
+                )
+            except (OSError, http.client.HTTPException) as e:
+                conn.close()
+                conn = http.client.HTTPConnection(host, port, timeout=600)
+                label, hit = type(e).__name__, False
+            elapsed = (time.perf_counter() - start) * 1000
+            with lock:
+                latencies.append(elapsed)
+                statuses[label] = statuses.get(label, 0) + 1
+                cached += bool(hit)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+
+    return {
+        "case": case.describe(),
+        "url": url,
+        "path": path,
+        "clients": clients,
+        "requests": requests,
+        "unique": unique,
+        "statuses": statuses,
+        "cached": cached,
+        "wall_sec": round(wall, 3),
+        "throughput_rps": round(requests / wall, 2) if wall > 0 else None,
+        "latency_ms": {
+            "mean": round(statistics.fmean(latencies), 2) if latencies else None,
+            "p50": _percentile(latencies, 50),
+            "p95": _percentile(latencies, 95),
+            "p99": _percentile(latencies, 99),
+            "max": round(max(latencies), 2) if latencies else None,
+        },
+    }
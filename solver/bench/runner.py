@@ -0,0 +1,145 @@
+"""Run benchmark cases and record their timings, quality and memory.
+
+Each case runs in a fresh spawned process, so its peak RSS is its own and
+nothing warmed up by the previous case carries over. Timings are medians over the repeats; the objective and status come from
+the first repeat, as the solve is deterministic for a given engine.
+"""
+
+import multiprocessing as mp
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List
+
+from bench.workload import Case, make_request
+
+# Timings kept per case, from meta.timings (wall time of each solve phase)
+TIMING_KEYS = (
+    "pool_ms",
+    "prefilter_ms",
+    "build_ms",
+    "heuristic_ms",
+    "solve_ms",
+    "extract_ms",
+    "total_ms",
+)
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def run_case(case: Case, repeat: int) -> Dict[str, Any]:
+    """Worker entry point: solve one case `repeat` times. solve_request()
+    does not go through the solution cache, so every repeat really solves."""
+    from planner import solve_request
+    from schemas import SolveRequest
+
+    start = time.perf_counter()
+    req = SolveRequest(**make_request(case))
+    generate_ms = (time.perf_counter() - start) * 1000
+    rss_before = _peak_rss_mb()
+
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = solve_request(req)
+        wall_ms = (time.perf_counter() - start) * 1000
+        runs.append((result, wall_ms))
+
+    result = runs[0][0]
+    meta = result.get("meta", {})
+    timings = {
+        key: round(
+            statistics.median(
+                r.get("meta", {}).get("timings", {}).get(key, 0.0) for r, _ in runs
+            ),
+            2,
+        )
+        for key in TIMING_KEYS
+        if key in meta.get("timings", {})
+    }
+    return {
+        **case.describe(),
+        "status": result["status"],
+        "objective": meta.get("objective"),
+        "best_bound": meta.get("best_bound"),
+        "gap": meta.get("gap"),
+        "nodes": meta.get("nodes"),
+        "engine_used": meta.get("engine"),
+        "model": meta.get("model"),
+        "pool_after": meta.get("pool_after"),
+        "timings": timings,
+        "wall_ms": round(statistics.median(ms for _, ms in runs), 2),
+        "wall_ms_runs": [round(ms, 2) for _, ms in runs],
+        "generate_ms": round(generate_ms, 2),
+        "rss_before_solve_mb": rss_before,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def environment() -> Dict[str, Any]:
+    """What a run was measured on, so runs from different machines are not mistaken for a regression"""
+    try:
+        commit = (
+            subprocess.run(
+                ["git", "rev-parse", "--short", "HEAD"],
+                capture_output=True,
+                text=True,
+                timeout=5,
+                check=False,
+            ).stdout.strip()
+            or None
+        )
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    try:
+        from ortools import __version__ as ortools_version
+    except ImportError:
+        ortools_version = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "ortools": ortools_version,
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def run_suite(cases: List[Case], repeat: int = 1, log=None) -> Dict[str, Any]:
+    """`{environment, repeat, cases}` for every case, failures included as `{name, error}`"""
+    results = []
+    ctx = mp.get_context("spawn")
+    for i, case in enumerate(cases, 1):
+        with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+            try:
+                row = pool.submit(run_case, case, repeat).result()
+            except Exception as e:
+                row = {**case.describe(), "error": f"{type(e).__name__}: {e}"}
+        results.append(row)
+        if log is not None:
+            log(f"[{i}/{len(cases)}] {_summary(row)}")
+    return {"environment": environment(), "repeat": repeat, "cases": results}
+
+
+def _summary(row: Dict[str, Any]) -> str:
+    if "error" in row:
+        return f"{row['name']}: {row['error']}"
+    return (
+        f"{row['name']}: {row['status']} objective={row['objective']} gap={row['gap']} "
+        + " ".join(
+            f"{key[:-3]}={ms}ms"
+            for key, ms in row["timings"].items()
+            if key != "total_ms"
+        )
+        + f" wall={row['wall_ms']}ms rss={row['peak_rss_mb']}MB"
+    )
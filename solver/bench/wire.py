@@ -0,0 +1,135 @@
+"""Wire format benchmark: bytes on the wire and decode time of /solve bodies.
+
+For each pool size the same request is encoded as JSON, as MessagePack with
+`recipes` as objects, and as MessagePack with a `recipe_columns` block
+(float64 and float32). Decoding is timed up to the packed RecipeMatrix the
+solver works on, so the JSON and MessagePack-rows paths include building
+the Recipe models and pack_recipes(). Response encoding is timed on a
+fast-mode result of the same request.
+"""
+
+import json
+import statistics
+import time
+from typing import Any, Callable, Dict, List
+
+from bench.workload import Case, make_request
+
+
+def _median_ms(fn: Callable[[], Any], repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return round(statistics.median(times), 3)
+
+
+def run_wire(sizes: List[int], days: int = 7, repeat: int = 5) -> Dict[str, Any]:
+    """`{msgpack, orjson, sizes: [{recipes, formats: {name: {bytes, decode_ms}}, response}]}`"""
+    import wire
+    from model import pack_recipes
+    from planner import resolve_pool, solve_request
+    from schemas import SolveRequest
+
+    if wire.msgpack is None:
+        raise RuntimeError("the wire benchmark needs the msgpack package")
+    packb = wire.msgpack.packb
+
+    rows = []
+    for size in sizes:
+        payload = make_request(Case(recipes=size, days=days, mode="fast"))
+        columnar = {key: value for key, value in payload.items() if key != "recipes"}
+        bodies = {
+            "json": (json.dumps(payload).encode(), None),
+            "msgpack_rows": (packb(payload), wire.MSGPACK),
+            "msgpack_columns_f8": (
+                packb(
+                    {
+                        **columnar,
+                        "recipe_columns": wire.pack_columns(payload["recipes"]),
+                    }
+                ),
+                wire.MSGPACK,
+            ),
+            "msgpack_columns_f4": (
+                packb(
+                    {
+                        **columnar,
+                        "recipe_columns": wire.pack_columns(payload["recipes"], "<f4"),
+                    }
+                ),
+                wire.MSGPACK,
+            ),
+        }
+
+        def decode(body: bytes, content_type) -> None:
+            req, catalog = wire.decode_solve(body, content_type)
+            resolve_pool(req, catalog)
+
+        formats = {
+            # What FastAPI did before: json.loads, then validation into models
+            "json_fastapi": {
+                "bytes": len(bodies["json"][0]),
+                "decode_ms": _median_ms(
+                    lambda raw=bodies["json"][0]: pack_recipes(
+                        SolveRequest(**json.loads(raw)).recipes
+                    ),
+                    repeat,
+                ),
+            }
+        }
+        for name, (body, content_type) in bodies.items():
+            formats[name] = {
+                "bytes": len(body),
+                "decode_ms": _median_ms(
+                    lambda body=body, content_type=content_type: decode(
+                        body, content_type
+                    ),
+                    repeat,
+                ),
+            }
+
+        result = solve_request(SolveRequest(**payload))
+        response = {
+            "json_stdlib": _median_ms(
+                lambda result=result: json.dumps(
+                    result, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+                ),
+                repeat,
+            ),
+            "json": _median_ms(
+                lambda result=result: wire.encode(result, False), repeat
+            ),
+            "msgpack": _median_ms(
+                lambda result=result: wire.encode(result, True), repeat
+            ),
+        }
+        rows.append(
+            {
+                "recipes": size,
+                "days": days,
+                "formats": formats,
+                "response_encode_ms": response,
+            }
+        )
+
+    return {
+        "msgpack": wire.msgpack is not None,
+        "orjson": wire.orjson is not None,
+        "repeat": repeat,
+        "sizes": rows,
+    }
+
+
+def summary(report: Dict[str, Any]) -> List[str]:
+    lines = []
+    for row in report["sizes"]:
+        base = row["formats"]["json_fastapi"]
+        lines.append(f"{row['recipes']} recipes:")
+        for name, measured in row["formats"].items():
+            lines.append(
+                f"  {name:20} {measured['bytes'] / 1024:9.1f} KiB ({measured['bytes'] / base['bytes']:6.1%})"
+                f" {measured['decode_ms']:9.2f} ms ({base['decode_ms'] / max(measured['decode_ms'], 1e-6):5.1f}x)"
+            )
+    return lines
@@ -0,0 +1,245 @@
+"""Seeded generator of realistic SolveRequest payloads.
+
+Recipes are drawn from per-slot archetypes (porridge, bowls, curries, ...)
+whose per-serving nutrients follow typical vegan dishes, scaled by a random
+portion size and jittered per nutrient. Target profiles are daily intakes
+for a few kinds of eaters. The same Case always yields the same request.
+"""
+
+import random
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional
+
+from model import N_KEYS, SLOTS
+
+# Per-serving nutrients, in N_KEYS order
+_ARCHETYPES = {
+    "porridge": (
+        ["breakfast"],
+        380,
+        [12, 60, 9, 8, 0.4, 3.0, 180, 2.2, 10, 6, 1.0, 0.8],
+        10,
+        1.2,
+    ),
+    "smoothie_bowl": (
+        ["breakfast", "snack"],
+        320,
+        [14, 48, 8, 9, 1.0, 2.2, 250, 1.6, 8, 4, 1.2, 1.5],
+        8,
+        2.2,
+    ),
+    "tofu_scramble": (
+        ["breakfast", "lunch"],
+        300,
+        [22, 12, 18, 4, 0.3, 3.5, 350, 2.4, 12, 10, 0.4, 0.5],
+        15,
+        2.0,
+    ),
+    "lentil_curry": (
+        ["lunch", "dinner"],
+        520,
+        [26, 70, 14, 16, 0.2, 6.5, 110, 3.6, 15, 9, 0.0, 0.3],
+        35,
+        2.3,
+    ),
+    "buddha_bowl": (
+        ["lunch", "dinner"],
+        600,
+        [22, 78, 20, 14, 0.2, 5.0, 160, 3.2, 12, 14, 0.2, 0.9],
+        25,
+        3.5,
+    ),
+    "pasta": (
+        ["lunch", "dinner"],
+        650,
+        [24, 95, 18, 10, 0.1, 4.2, 90, 2.8, 8, 30, 0.0, 0.2],
+        20,
+        2.0,
+    ),
+    "chili": (
+        ["lunch", "dinner"],
+        540,
+        [25, 72, 13, 18, 0.1, 6.0, 130, 3.0, 10, 8, 0.0, 0.2],
+        40,
+        2.6,
+    ),
+    "seitan_stir_fry": (
+        ["dinner"],
+        560,
+        [38, 50, 20, 7, 0.2, 5.5, 140, 2.0, 14, 20, 0.3, 0.4],
+        25,
+        3.8,
+    ),
+    "soup": (
+        ["lunch", "dinner"],
+        280,
+        [11, 40, 7, 9, 0.1, 3.0, 90, 1.4, 18, 5, 0.0, 0.2],
+        30,
+        1.8,
+    ),
+    "hummus_plate": (
+        ["lunch", "snack"],
+        350,
+        [13, 38, 16, 9, 0.0, 3.4, 120, 2.0, 4, 6, 0.0, 0.3],
+        10,
+        2.4,
+    ),
+    "trail_mix": (
+        ["snack"],
+        250,
+        [8, 18, 17, 4, 0.0, 2.0, 70, 1.8, 2, 18, 0.0, 0.6],
+        2,
+        1.5,
+    ),
+    "fortified_yogurt": (
+        ["snack", "breakfast"],
+        160,
+        [7, 20, 5, 2, 0.5, 0.8, 200, 0.8, 20, 2, 1.5, 0.1],
+        2,
+        1.3,
+    ),
+}
+
+# Daily targets: energy_kcal first, then the rest of N_KEYS in order
+TARGET_PROFILES = {
+    "adult_female": [2000, 60, 250, 70, 30, 4.0, 16, 950, 8, 150, 70, 15, 1.1],
+    "adult_male": [2500, 75, 310, 85, 35, 4.0, 11, 950, 11, 150, 70, 15, 1.6],
+    "athlete": [3200, 140, 420, 100, 40, 4.0, 14, 1000, 14, 150, 70, 15, 1.8],
+    "teen": [2400, 65, 300, 80, 30, 3.5, 13, 1150, 11, 150, 60, 15, 1.4],
+    "senior": [1800, 70, 220, 60, 28, 4.0, 10, 1000, 10, 150, 70, 20, 1.2],
+}
+
+
+@dataclass
+class Case:
+    """One benchmark request; the name is the key runs are compared on"""
+
+    recipes: int
+    days: int
+    profile: str = "adult_female"
+    dislike_rate: float = 0.0
+    pinned_rate: float = 0.0
+    mode: str = "exact"
+    engine: Optional[str] = None
+    time_limit_sec: int = 10
+    seed: int = 0
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def name(self) -> str:
+        parts = [
+            f"r{self.recipes}",
+            f"d{self.days}",
+            self.profile,
+            self.mode,
+            self.engine or "default",
+        ]
+        if self.dislike_rate:
+            parts.append(f"dis{self.dislike_rate:g}")
+        if self.pinned_rate:
+            parts.append(f"pin{self.pinned_rate:g}")
+        parts += [f"{key}={value}" for key, value in sorted(self.extra.items())]
+        return "-".join(parts) + f"-s{self.seed}"
+
+    def describe(self) -> Dict[str, Any]:
+        return {"name": self.name, **asdict(self)}
+
+
+def generate_recipes(count: int, seed: int) -> List[Dict[str, Any]]:
+    """`count` recipes as Recipe payloads, ids r0..r{count-1}"""
+    rnd = random.Random(f"recipes-{seed}")
+    names = sorted(_ARCHETYPES)
+    recipes = []
+    for i in range(count):
+        kind = rnd.choice(names)
+        slots, kcal, per_serving, time_min, cost = _ARCHETYPES[kind]
+        size = rnd.lognormvariate(0, 0.25)
+        values = [kcal * size] + [
+            v * size * rnd.lognormvariate(0, 0.35) for v in per_serving
+        ]
+        recipe = {
+            "id": f"r{i}",
+            "title": f"{kind.replace('_', ' ')} #{i}",
+            "time_min": max(1, round(time_min * rnd.lognormvariate(0, 0.4))),
+            "cost_eur": round(cost * size * rnd.lognormvariate(0, 0.3), 2),
+            "nutrients": {key: round(value, 3) for key, value in zip(N_KEYS, values)},
+            "slots": list(slots),
+        }
+        if rnd.random() < 0.2:
+            recipe["portions"] = {slot: {"min": 0.5, "max": 1.5} for slot in slots}
+        recipes.append(recipe)
+    return recipes
+
+
+def make_request(case: Case) -> Dict[str, Any]:
+    """SolveRequest payload of a case"""
+    recipes = generate_recipes(case.recipes, case.seed)
+    rnd = random.Random(f"request-{case.name}")
+    dislikes = sorted(
+        rnd.sample([r["id"] for r in recipes], int(case.dislike_rate * len(recipes)))
+    )
+    disliked = set(dislikes)
+    templates = []
+    for _ in range(case.days):
+        day = {}
+        for slot in SLOTS:
+            if rnd.random() < case.pinned_rate:
+                options = [
+                    r["id"]
+                    for r in recipes
+                    if slot in r["slots"] and r["id"] not in disliked
+                ]
+                if options:
+                    day[slot] = rnd.choice(options)
+        templates.append(day)
+    payload = {
+        "recipes": recipes,
+        "day_templates": templates,
+        "targets": dict(zip(N_KEYS, TARGET_PROFILES[case.profile])),
+        "dislikes": dislikes,
+        "time_limit_sec": case.time_limit_sec,
+        "mode": case.mode,
+        # Repeats must leave room for every slot of the horizon
+        "max_repeat": min(
+            5, max(2, -(-case.days * len(SLOTS) // max(1, case.recipes // 4)))
+        ),
+        **case.extra,
+    }
+    if case.engine:
+        payload["engine"] = case.engine
+    return payload
+
+
+def _grid(recipes: List[int], days: List[int], **kwargs: Any) -> List[Case]:
+    return [Case(recipes=r, days=d, **kwargs) for r in recipes for d in days]
+
+
+SUITES: Dict[str, List[Case]] = {
+    # A minute or so: catches gross regressions
+    "smoke": [
+        Case(recipes=50, days=1, time_limit_sec=5),
+        Case(recipes=300, days=7, time_limit_sec=5),
+        Case(recipes=300, days=7, mode="fast"),
+    ],
+    "default": [
+        *_grid([50, 500, 2000], [1, 7]),
+        Case(recipes=500, days=7, mode="fast"),
+        Case(recipes=500, days=7, mode="anytime", time_limit_sec=5),
+        Case(recipes=500, days=7, profile="athlete", dislike_rate=0.2),
+        Case(recipes=500, days=7, profile="senior", pinned_rate=0.2),
+        Case(recipes=500, days=14),
+    ],
+    "full": [
+        *_grid([50, 500, 2000, 5000], [1, 7, 14, 28], time_limit_sec=20),
+        *[
+            Case(recipes=1000, days=7, profile=p, dislike_rate=rate)
+            for p in sorted(TARGET_PROFILES)
+            for rate in (0.0, 0.3)
+        ],
+        *[
+            Case(recipes=2000, days=7, engine=e, time_limit_sec=20)
+            for e in ("cbc", "scip", "cp-sat")
+        ],
+        *[Case(recipes=5000, days=d, mode="fast") for d in (7, 28)],
+    ],
+}
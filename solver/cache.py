@@ -0,0 +1,159 @@
+"""Content-addressed cache of solve results.
+
+Requests are keyed by a SHA-256 of their normalized JSON form, kept in an
+in-process LRU with a TTL and optionally mirrored to a directory so entries
+survive restarts. Identical requests arriving while one is being solved wait
+for that solve instead of starting their own.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+SOLVER_CACHE_SIZE = int(os.getenv("SOLVER_CACHE_SIZE", "256"))
+SOLVER_CACHE_TTL_SEC = int(os.getenv("SOLVER_CACHE_TTL_SEC", "3600"))
+SOLVER_CACHE_DIR = os.getenv("SOLVER_CACHE_DIR")
+
+# Results worth replaying; anything else is retried on the next request
+CACHEABLE_STATUSES = {"Optimal", "Feasible", "Heuristic", "Infeasible", "EMPTY_POOL"}
+
+
+def request_key(payload: Dict[str, Any]) -> str:
+    """Hash of a request dict with order-insensitive fields normalized"""
+    normalized = dict(payload)
+    normalized["recipes"] = sorted(payload.get("recipes", []), key=lambda r: r["id"])
+    for field in ("dislikes", "exclude_ids"):
+        normalized[field] = sorted(set(payload.get(field) or []))
+    if payload.get("include_ids") is not None:
+        normalized["include_ids"] = sorted(set(payload["include_ids"]))
+    blob = json.dumps(normalized, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class SolutionCache:
+    def __init__(self, max_entries: int, ttl_sec: int, disk_dir: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl_sec = ttl_sec
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        if self.disk_dir is not None:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._inflight: Dict[str, Future] = {}
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get_or_solve(
+        self, key: str, solve: Callable[[], Dict[str, Any]]
+    ) -> Tuple[Dict[str, Any], str]:
+        """Return (result, source) where source is "hit", "coalesced" or "miss"."""
+        with self._lock:
+            result = self._lookup(key)
+            if result is not None:
+                self.hits += 1
+                return result, "hit"
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not owner:
+            return future.result(), "coalesced"
+
+        try:
+            result = solve()
+        except BaseException as e:
+            with self._lock:
+                del self._inflight[key]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            if result.get("status") in CACHEABLE_STATUSES:
+                self._store(key, result)
+            del self._inflight[key]
+        future.set_result(result)
+        return result, "miss"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Cached result for `key` without solving, or None."""
+        with self._lock:
+            result = self._lookup(key)
+            if result is not None:
+                self.hits += 1
+            return result
+
+    def put(self, key: str, result: Dict[str, Any]) -> None:
+        """Store a result solved elsewhere, if its status is worth replaying."""
+        if result.get("status") in CACHEABLE_STATUSES:
+            with self._lock:
+                self._store(key, result)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "inflight": len(self._inflight),
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+            }
+
+    def _lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            stored_at, result = entry
+            if time.time() - stored_at <= self.ttl_sec:
+                self._entries.move_to_end(key)
+                return result
+            del self._entries[key]
+
+        if self.disk_dir is None:
+            return None
+        path = self.disk_dir / f"{key}.json"
+        try:
+            stored_at = path.stat().st_mtime
+            if time.time() - stored_at > self.ttl_sec:
+                path.unlink(missing_ok=True)
+                return None
+            result = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        self.disk_hits += 1
+        self._remember(key, stored_at, result)
+        return result
+
+    def _store(self, key: str, result: Dict[str, Any]) -> None:
+        self._remember(key, time.time(), result)
+        if self.disk_dir is None:
+            return
+        path = self.disk_dir / f"{key}.json"
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            tmp.write_text(json.dumps(result), encoding="utf-8")
+            os.replace(tmp, path)
+        except OSError:
+            tmp.unlink(missing_ok=True)
+
+    def _remember(self, key: str, stored_at: float, result: Dict[str, Any]) -> None:
+        self._entries[key] = (stored_at, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+solution_cache = SolutionCache(
+    SOLVER_CACHE_SIZE, SOLVER_CACHE_TTL_SEC, SOLVER_CACHE_DIR
+)
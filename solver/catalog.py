@@ -0,0 +1,215 @@
+"""Server-side recipe catalogs.
+
+A catalog is a recipe set registered once (POST /catalogs or a JSON file in
+SOLVER_CATALOG_DIR) and kept as a packed RecipeMatrix. Solve requests then
+reference it by `catalog_id` instead of shipping every recipe.
+
+Registered catalogs are written back to SOLVER_CATALOG_DIR so worker
+processes and restarted instances pick them up from the same files:
+`<catalog_id>.json` holds the latest version and `<catalog_id>/v<N>.json`
+each of the last SOLVER_CATALOG_VERSIONS versions, loaded when a request
+asks for that catalog_version.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from model import RecipeMatrix, pack_recipes
+from schemas import Recipe
+
+SOLVER_CATALOG_DIR = os.getenv(
+    "SOLVER_CATALOG_DIR", str(Path(__file__).resolve().parent / "catalogs")
+)
+# Versions of each catalog kept on disk; older ones are deleted on register
+SOLVER_CATALOG_VERSIONS = int(os.getenv("SOLVER_CATALOG_VERSIONS", "10"))
+
+
+@dataclass
+class Catalog:
+    id: str
+    version: int
+    digest: str
+    matrix: RecipeMatrix
+    registered_at: float
+
+    def select(
+        self, include: Optional[List[str]] = None, exclude: Optional[List[str]] = None
+    ) -> RecipeMatrix:
+        """Rows whose id is in `include` (all when None) and not in `exclude`."""
+        ids = np.array(self.matrix.ids, dtype=object)
+        mask = np.ones(len(ids), dtype=bool)
+        if include is not None:
+            mask &= np.isin(ids, include)
+        if exclude:
+            mask &= ~np.isin(ids, exclude)
+        return self.matrix.take(np.flatnonzero(mask))
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "catalog_id": self.id,
+            "version": self.version,
+            "digest": self.digest,
+            "size": len(self.matrix),
+            "registered_at": self.registered_at,
+        }
+
+
+def recipes_digest(recipes: List[Recipe]) -> str:
+    blob = json.dumps(
+        [r.model_dump() for r in recipes], sort_keys=True, separators=(",", ":")
+    )
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def load_catalog_file(path: Path) -> Catalog:
+    """Load a `{catalog_id?, version?, recipes}` JSON file (or a bare recipe list)."""
+    data = json.loads(Path(path).read_text(encoding="utf-8"))
+    if isinstance(data, list):
+        data = {"recipes": data}
+    recipes = [Recipe(**r) for r in data["recipes"]]
+    return Catalog(
+        id=data.get("catalog_id") or Path(path).stem,
+        version=int(data.get("version", 1)),
+        digest=recipes_digest(recipes),
+        matrix=pack_recipes(recipes),
+        registered_at=Path(path).stat().st_mtime,
+    )
+
+
+class CatalogStore:
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        keep_versions: int = SOLVER_CATALOG_VERSIONS,
+    ):
+        self.directory = Path(directory) if directory else None
+        self.keep_versions = keep_versions
+        self._lock = threading.Lock()
+        self._catalogs: Dict[str, Dict[int, Catalog]] = {}
+        self._mtimes: Dict[str, float] = {}
+
+    def register(self, catalog_id: str, recipes: List[Recipe]) -> Catalog:
+        """Store a recipe set; identical content keeps the current version."""
+        digest = recipes_digest(recipes)
+        with self._lock:
+            self._refresh(catalog_id)
+            versions = self._catalogs.setdefault(catalog_id, {})
+            latest = versions[max(versions)] if versions else None
+            if latest is not None and latest.digest == digest:
+                return latest
+            catalog = Catalog(
+                id=catalog_id,
+                version=latest.version + 1 if latest else 1,
+                digest=digest,
+                matrix=pack_recipes(recipes),
+                registered_at=time.time(),
+            )
+            versions[catalog.version] = catalog
+            self._write(catalog, recipes)
+            return catalog
+
+    def get(self, catalog_id: str, version: Optional[int] = None) -> Catalog:
+        with self._lock:
+            self._refresh(catalog_id)
+            if version is not None:
+                self._load_version(catalog_id, version)
+            versions = self._catalogs.get(catalog_id)
+            if not versions:
+                raise KeyError(f"Unknown catalog '{catalog_id}'")
+            if version is None:
+                return versions[max(versions)]
+            if version not in versions:
+                raise KeyError(f"Unknown version {version} of catalog '{catalog_id}'")
+            return versions[version]
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            if self.directory is not None and self.directory.is_dir():
+                for path in self.directory.glob("*.json"):
+                    self._refresh(path.stem)
+            return [
+                versions[max(versions)].describe()
+                for versions in self._catalogs.values()
+                if versions
+            ]
+
+    def _path(self, catalog_id: str) -> Optional[Path]:
+        return (
+            self.directory / f"{catalog_id}.json"
+            if self.directory is not None
+            else None
+        )
+
+    def _version_path(self, catalog_id: str, version: int) -> Optional[Path]:
+        return (
+            self.directory / catalog_id / f"v{version}.json"
+            if self.directory is not None
+            else None
+        )
+
+    def _load_version(self, catalog_id: str, version: int) -> None:
+        """Load an older version from its file, unless already in memory."""
+        if version in self._catalogs.get(catalog_id, {}):
+            return
+        path = self._version_path(catalog_id, version)
+        if path is None or not path.is_file():
+            return
+        catalog = load_catalog_file(path)
+        catalog.id = catalog_id
+        if catalog.version == version:
+            self._catalogs.setdefault(catalog_id, {})[version] = catalog
+
+    def _refresh(self, catalog_id: str) -> None:
+        """(Re)load the catalog file when it is new or changed on disk."""
+        path = self._path(catalog_id)
+        if path is None:
+            return
+        try:
+            mtime = path.stat().st_mtime
+        except OSError:
+            return
+        if self._mtimes.get(catalog_id) == mtime:
+            return
+        catalog = load_catalog_file(path)
+        catalog.id = catalog_id
+        self._catalogs.setdefault(catalog_id, {})[catalog.version] = catalog
+        self._mtimes[catalog_id] = mtime
+
+    def _write(self, catalog: Catalog, recipes: List[Recipe]) -> None:
+        path = self._path(catalog.id)
+        if path is None:
+            return
+        blob = json.dumps(
+            {
+                "catalog_id": catalog.id,
+                "version": catalog.version,
+                "recipes": [r.model_dump() for r in recipes],
+            }
+        )
+        # The version file first, so the latest one never lacks its own
+        version_path = self._version_path(catalog.id, catalog.version)
+        for target in (version_path, path):
+            target.parent.mkdir(parents=True, exist_ok=True)
+            tmp = target.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_text(blob, encoding="utf-8")
+            os.replace(tmp, target)
+        self._mtimes[catalog.id] = path.stat().st_mtime
+
+        for old in version_path.parent.glob("v*.json"):
+            try:
+                stale = int(old.stem[1:]) <= catalog.version - self.keep_versions
+            except ValueError:
+                continue
+            if stale:
+                old.unlink(missing_ok=True)
+
+
+catalogs = CatalogStore(SOLVER_CATALOG_DIR)
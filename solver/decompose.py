@@ -0,0 +1,165 @@
+"""Rolling-horizon solving for plans longer than a week.
+
+Days are only coupled through the max_repeat budget, so a long horizon is
+solved as consecutive blocks of SOLVER_BLOCK_DAYS days, each a regular model
+over its own days. Each block gets a per-recipe repeat budget: what earlier
+blocks left of max_repeat, net of the pins still ahead, capped at this
+block's share of the remaining days so the first weeks cannot use up the
+best recipes. Time and cost weights are rescaled by block/horizon length, so
+block objectives add up to the objective of the monolithic model.
+
+Model size and solve time then grow linearly with the horizon; the bound
+(and gap) reported is the one of the decomposed problem.
+"""
+
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from engines import SolveControl, SolveOutcome, solve_model
+from model import (
+    RecipeMatrix,
+    build_model,
+    pinned_servings,
+    plan_values,
+    solution_picks,
+)
+
+SOLVER_BLOCK_DAYS = int(os.getenv("SOLVER_BLOCK_DAYS", "7"))
+
+
+@dataclass
+class RollingOutcome:
+    # Totals over the blocks; objective is None unless every block found a plan
+    summary: SolveOutcome
+    picks: np.ndarray  # (days, len(SLOTS)) recipe index, -1 when empty
+    servings: np.ndarray
+    build_ms: float
+    blocks: List[Dict[str, Any]]  # solve meta of each block
+
+
+def block_budget(
+    max_repeat: int,
+    used: np.ndarray,
+    reserved_ahead: np.ndarray,
+    reserved_here: np.ndarray,
+    block_days: int,
+    days_left: int,
+) -> np.ndarray:
+    """Per-recipe max_repeat for the next block's model.
+
+    used: picks in earlier blocks; reserved_ahead: uses held back for this
+    block and later ones (pins, and the warm-start plan's picks); those of
+    this block, reserved_here, are added back on top of its fair share.
+    """
+    free_left = np.maximum(0, max_repeat - used - reserved_ahead)
+    share = np.minimum(
+        free_left, np.ceil(free_left * block_days / days_left).astype(int)
+    )
+    return share + reserved_here
+
+
+def solve_rolling(
+    matrix: RecipeMatrix,
+    targets: np.ndarray,
+    weights: Dict[str, float],
+    max_repeat: int,
+    pins: np.ndarray,
+    time_limit_sec: float,
+    engine: Optional[str] = None,
+    workers: Optional[int] = None,
+    start: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+    control: Optional[SolveControl] = None,
+    block_days: int = SOLVER_BLOCK_DAYS,
+) -> RollingOutcome:
+    """Solve the horizon of `pins` block by block.
+
+    `start` (picks, servings) for the whole horizon warm-starts each block;
+    its picks are reserved like pins, so each block's hint stays within the
+    block's budget. The time limit is split across blocks by their length.
+    """
+    days = len(pins)
+    n = len(matrix)
+    control = control or SolveControl()
+    scale = {
+        key: float(weights.get(key, default))
+        for key, default in (("time", 0.2), ("cost", 0.2))
+    }
+    # Blocks left unsolved (failure, stop) keep their pins at the pinned servings
+    picks = pins.copy()
+    servings = pinned_servings(matrix, pins)
+    used = np.zeros(n, dtype=int)
+    reserved = pins if start is None else np.where(pins >= 0, pins, start[0])
+    reserved_ahead = np.bincount(reserved[reserved >= 0], minlength=n)
+    objective = bound = 0.0
+    build_ms = solve_ms = 0.0
+    nodes = 0
+    engine_used = engine
+    statuses = []
+    blocks = []
+
+    for first in range(0, days, block_days):
+        block = slice(first, min(days, first + block_days))
+        size = block.stop - block.start
+        block_pins = pins[block]
+        block_reserved = reserved[block]
+        reserved_here = np.bincount(block_reserved[block_reserved >= 0], minlength=n)
+        budget = block_budget(
+            max_repeat, used, reserved_ahead, reserved_here, size, days - first
+        )
+        # Per-pick time/cost terms are divided by the block length in the model
+        block_weights = {
+            **weights,
+            **{key: value * size / days for key, value in scale.items()},
+        }
+        model = build_model(matrix, size, targets, block_weights, budget, block_pins)
+        hint = (
+            None
+            if start is None
+            else plan_values(model, matrix, start[0][block], start[1][block])
+        )
+        outcome = solve_model(
+            model, time_limit_sec * size / days, engine, workers, hint, control
+        )
+        build_ms += model.build_ms
+        solve_ms += outcome.solve_ms
+        nodes += outcome.nodes or 0
+        engine_used = outcome.engine
+        statuses.append(outcome.status)
+        blocks.append({"days": [block.start, block.stop - 1], **outcome.meta()})
+
+        block_picks, block_servings = solution_picks(model, outcome.values)
+        picks[block], servings[block] = block_picks, block_servings
+        used += np.bincount(block_picks[block_picks >= 0], minlength=n)
+        reserved_ahead -= reserved_here
+        if outcome.objective is None:
+            objective, bound = None, None
+            break
+        objective += outcome.objective
+        bound = (
+            None
+            if bound is None or outcome.best_bound is None
+            else bound + outcome.best_bound
+        )
+        if control.stopped:
+            if block.stop < days:
+                statuses.append("NotSolved")
+                objective, bound = None, None
+            break
+
+    # Optimal only when every block is; the first block without a plan otherwise
+    status = next(
+        (s for s in statuses if s not in ("Optimal", "Feasible")),
+        "Optimal" if all(s == "Optimal" for s in statuses) else "Feasible",
+    )
+    return RollingOutcome(
+        summary=SolveOutcome(
+            status, np.empty(0), solve_ms, engine_used, objective, bound, nodes
+        ),
+        picks=picks,
+        servings=servings,
+        build_ms=build_ms,
+        blocks=blocks,
+    )
@@ -0,0 +1,374 @@
+"""Solver engines for a built PlanModel.
+
+Every engine solves the same PlanModel arrays and returns values for its
+columns, so plans, objectives and gaps are comparable across engines:
+
+- "cbc" and "scip" load the model's MPModelProto into pywraplp;
+- "cp-sat" rescales it to integers (servings in SERVING_STEPS per serving,
+  deviations in DEVIATION_STEPS per unit, each row multiplied so its
+  coefficients keep about COEF_DIGITS significant digits) and runs the
+  parallel CP-SAT search with `workers` threads.
+
+A `hint` (a full solution vector, e.g. from heuristic.py) warm-starts SCIP and
+CP-SAT; OR-Tools' CBC interface does not read solution hints. CP-SAT needs
+one more than the others (see WARM_START_ENGINES). A SolveControl
+lets another thread stop the solve and receive incumbents; only CP-SAT
+reports them as they are found, the MPSolver engines report their final one.
+"""
+
+import math
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+
+import numpy as np
+import scipy.sparse as sp
+from ortools.linear_solver import linear_solver_pb2, pywraplp
+from ortools.sat.python import cp_model
+
+from model import PlanModel
+
+SOLVER_ENGINE = os.getenv("SOLVER_ENGINE", "cbc")
+SOLVER_CPSAT_WORKERS = int(
+    os.getenv("SOLVER_CPSAT_WORKERS", str(min(8, os.cpu_count() or 1)))
+)
+
+SERVING_STEPS = 20  # CP-SAT servings resolution: 0.05
+DEVIATION_STEPS = 100  # CP-SAT deviation resolution: 0.01 nutrient unit
+OBJECTIVE_STEPS = 10_000  # CP-SAT objective resolution: 1e-4
+COEF_DIGITS = 6
+BOUND_LIMIT = 2**62  # stands in for infinite row bounds, clear of int64 overflow
+
+STATUS_LABELS = {
+    pywraplp.Solver.OPTIMAL: "Optimal",
+    pywraplp.Solver.FEASIBLE: "Feasible",
+    pywraplp.Solver.INFEASIBLE: "Infeasible",
+    pywraplp.Solver.UNBOUNDED: "Unbounded",
+    pywraplp.Solver.ABNORMAL: "Abnormal",
+    pywraplp.Solver.NOT_SOLVED: "NotSolved",
+}
+
+CPSAT_STATUS_LABELS = {
+    cp_model.OPTIMAL: "Optimal",
+    cp_model.FEASIBLE: "Feasible",
+    cp_model.INFEASIBLE: "Infeasible",
+    cp_model.MODEL_INVALID: "Abnormal",
+    cp_model.UNKNOWN: "NotSolved",
+}
+
+
+@dataclass
+class SolveOutcome:
+    status: str
+    values: np.ndarray  # empty when no solution was found
+    solve_ms: float
+    engine: str
+    objective: Optional[float] = None  # of `values` in the shared model
+    best_bound: Optional[float] = None
+    nodes: Optional[int] = None  # branch-and-bound nodes (CP-SAT: branches) explored
+
+    @property
+    def gap(self) -> Optional[float]:
+        """Relative gap between the objective and the engine's best bound"""
+        if (
+            self.objective is None
+            or self.best_bound is None
+            or not math.isfinite(self.best_bound)
+        ):
+            return None
+        return abs(self.objective - self.best_bound) / max(1e-9, abs(self.objective))
+
+    def meta(self) -> Dict:
+        return {
+            "engine": self.engine,
+            "solve_ms": round(self.solve_ms, 2),
+            "objective": None if self.objective is None else round(self.objective, 4),
+            "best_bound": (
+                None if self.best_bound is None else round(self.best_bound, 4)
+            ),
+            "gap": None if self.gap is None else round(self.gap, 6),
+            "nodes": self.nodes,
+        }
+
+
+class SolveControl:
+    """Stops a running solve from another thread and receives its incumbents.
+
+    on_solution(values, objective, best_bound) runs on the solver thread.
+    """
+
+    def __init__(
+        self,
+        on_solution: Optional[
+            Callable[[np.ndarray, float, Optional[float]], None]
+        ] = None,
+    ):
+        self.on_solution = on_solution
+        self._lock = threading.Lock()
+        self._interrupt: Optional[Callable[[], object]] = None
+        self.stopped = False
+
+    def stop(self) -> None:
+        with self._lock:
+            self.stopped = True
+            if self._interrupt is not None:
+                self._interrupt()
+
+    def attach(self, interrupt: Callable[[], object]) -> None:
+        """Register how to interrupt the solve about to start"""
+        with self._lock:
+            self._interrupt = interrupt
+
+    def solution(
+        self, values: np.ndarray, objective: float, best_bound: Optional[float]
+    ) -> None:
+        if self.on_solution is not None:
+            self.on_solution(values, objective, best_bound)
+
+
+class _Incumbents(cp_model.CpSolverSolutionCallback):
+    def __init__(self, model: PlanModel, control: SolveControl):
+        super().__init__()
+        self.scale = _column_scales(model)
+        self.control = control
+
+    def on_solution_callback(self) -> None:
+        values = np.array(self.response_proto.solution, dtype=np.float64) / self.scale
+        self.control.solution(values, self.objective_value, self.best_objective_bound)
+
+
+def _objective_of(model: PlanModel, values: np.ndarray) -> Optional[float]:
+    return float(model.objective @ values + model.offset) if values.size else None
+
+
+def _solve_mpsolver(
+    backend: str,
+    model: PlanModel,
+    time_limit_sec: float,
+    workers: int,
+    hint: Optional[np.ndarray],
+    control: SolveControl,
+) -> SolveOutcome:
+    """Solve with a pywraplp backend and read every variable value at once."""
+    solver = pywraplp.Solver.CreateSolver(backend)
+    if solver is None:
+        raise RuntimeError(f"OR-Tools {backend} solver unavailable")
+    error = solver.LoadModelFromProto(model.proto)
+    if error:
+        raise RuntimeError(f"Invalid model: {error}")
+    if hint is not None:
+        solver.SetHint(solver.variables(), hint.tolist())
+
+    solver.SetTimeLimit(int(time_limit_sec * 1000))
+    # CBC cannot be interrupted; it then runs to its time limit
+    control.attach(solver.InterruptSolve)
+    start = time.perf_counter()
+    # Stopped before it started: the solver has no response to read
+    solved = not control.stopped
+    status = solver.Solve() if solved else pywraplp.Solver.NOT_SOLVED
+    solve_ms = (time.perf_counter() - start) * 1000
+
+    response = linear_solver_pb2.MPSolutionResponse()
+    if solved:
+        solver.FillSolutionResponseProto(response)
+    values = np.array(response.variable_value, dtype=np.float64)
+    found = status in (pywraplp.Solver.OPTIMAL, pywraplp.Solver.FEASIBLE)
+    outcome = SolveOutcome(
+        status=STATUS_LABELS.get(status, str(status)),
+        values=values if found else np.empty(0),
+        solve_ms=solve_ms,
+        engine=backend.lower(),
+        objective=_objective_of(model, values) if found else None,
+        best_bound=response.best_objective_bound if found else None,
+        nodes=solver.nodes() if solved else 0,
+    )
+    if found:
+        control.solution(outcome.values, outcome.objective, outcome.best_bound)
+    return outcome
+
+
+def _column_scales(model: PlanModel) -> np.ndarray:
+    scale = np.where(model.integer, 1.0, float(DEVIATION_STEPS))
+    scale[model.z_cols] = SERVING_STEPS
+    return scale
+
+
+def _row_scales(scaled: sp.csr_matrix) -> np.ndarray:
+    """Power-of-ten row multipliers, multiples of DEVIATION_STEPS, so the
+    largest coefficient of each row lands near 10**COEF_DIGITS."""
+    largest = np.zeros(scaled.shape[0])
+    np.maximum.at(
+        largest,
+        np.repeat(np.arange(scaled.shape[0]), np.diff(scaled.indptr)),
+        np.abs(scaled.data),
+    )
+    largest = np.maximum(largest, 1e-12)
+    exponent = np.floor(np.log10(10.0**COEF_DIGITS / (largest * DEVIATION_STEPS)))
+    return DEVIATION_STEPS * 10.0 ** np.maximum(0, exponent)
+
+
+def _scaled_bound(values: np.ndarray, up: bool) -> np.ndarray:
+    """Round row/column bounds inward to integers, clipping infinities."""
+    rounded = np.floor(values + 1e-6) if up else np.ceil(values - 1e-6)
+    return np.clip(
+        np.nan_to_num(rounded, posinf=BOUND_LIMIT, neginf=-BOUND_LIMIT),
+        -BOUND_LIMIT,
+        BOUND_LIMIT,
+    ).astype(np.int64)
+
+
+def _cp_sat_model(
+    model: PlanModel, hint: Optional[np.ndarray] = None
+) -> cp_model.CpModel:
+    """Integer-scaled copy of the shared model for CP-SAT.
+
+    A hint is rounded onto the integer grid and its deviation columns are
+    recomputed from the rounded rows, so CP-SAT receives a consistent start.
+    """
+    col_scale = _column_scales(model)
+    scaled = sp.csr_matrix(model.constraints @ sp.diags(1.0 / col_scale))
+    row_scale = _row_scales(scaled)
+    coeffs = sp.csr_matrix(sp.diags(row_scale) @ scaled)
+    coeffs.data = np.round(coeffs.data)
+    coeffs.eliminate_zeros()
+    row_lb = _scaled_bound(model.row_lower * row_scale, up=False)
+    row_ub = _scaled_bound(model.row_upper * row_scale, up=True)
+
+    col_lb = np.ceil(model.lower * col_scale - 1e-6)
+    col_ub = np.floor(model.upper * col_scale + 1e-6)
+    # Deviation columns are unbounded above; cap them at what their rows can need
+    unbounded = ~np.isfinite(col_ub)
+    slack = sp.csc_matrix(coeffs[:, np.flatnonzero(unbounded)])
+    slack_cols = np.repeat(np.arange(slack.shape[1]), np.diff(slack.indptr))
+    if unbounded.any():
+        magnitude = np.where(unbounded, 0.0, np.maximum(np.abs(col_lb), np.abs(col_ub)))
+        finite_bounds = np.maximum(
+            np.where(np.isfinite(model.row_lower), np.abs(row_lb), 0),
+            np.where(np.isfinite(model.row_upper), np.abs(row_ub), 0),
+        )
+        activity = abs(coeffs) @ magnitude + finite_bounds
+        need = np.zeros(slack.shape[1])
+        np.maximum.at(need, slack_cols, activity[slack.indices] / np.abs(slack.data))
+        col_ub[unbounded] = np.ceil(need)
+
+    cp = cp_model.CpModel()
+    proto = cp.proto
+    for lb, ub in zip(
+        col_lb.astype(np.int64).tolist(), col_ub.astype(np.int64).tolist()
+    ):
+        proto.variables.add().domain.extend([lb, ub])
+    indptr, indices, data = (
+        coeffs.indptr,
+        coeffs.indices.tolist(),
+        coeffs.data.astype(np.int64).tolist(),
+    )
+    for i, (lb, ub) in enumerate(zip(row_lb.tolist(), row_ub.tolist())):
+        linear = proto.constraints.add().linear
+        linear.vars.extend(indices[indptr[i] : indptr[i + 1]])
+        linear.coeffs.extend(data[indptr[i] : indptr[i + 1]])
+        linear.domain.extend([lb, ub])
+
+    used = np.flatnonzero(model.objective)
+    objective = proto.objective
+    objective.vars.extend(used.tolist())
+    objective.coeffs.extend(
+        np.round(model.objective[used] / col_scale[used] * OBJECTIVE_STEPS)
+        .astype(np.int64)
+        .tolist()
+    )
+    objective.offset = round(model.offset * OBJECTIVE_STEPS)
+    objective.scaling_factor = 1.0 / OBJECTIVE_STEPS
+
+    if hint is not None:
+        start = np.clip(np.round(hint * col_scale), col_lb, col_ub)
+        start[unbounded] = 0
+        rest = coeffs @ start
+        rows, c = slack.indices, slack.data
+        # Smallest slack that brings each of its rows back inside its bounds
+        over = np.where(
+            c < 0, rest[rows] - row_ub[rows], row_lb[rows] - rest[rows]
+        ) / np.abs(c)
+        need = np.zeros(slack.shape[1])
+        np.maximum.at(need, slack_cols, np.ceil(over))
+        start[unbounded] = np.minimum(need, col_ub[unbounded])
+        proto.solution_hint.vars.extend(range(model.num_cols))
+        proto.solution_hint.values.extend(start.astype(np.int64).tolist())
+    return cp
+
+
+def _solve_cp_sat(
+    model: PlanModel,
+    time_limit_sec: float,
+    workers: int,
+    hint: Optional[np.ndarray],
+    control: SolveControl,
+) -> SolveOutcome:
+    cp = _cp_sat_model(model, hint)
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = float(time_limit_sec)
+    solver.parameters.num_workers = workers
+    callback = _Incumbents(model, control) if control.on_solution is not None else None
+    control.attach(solver.stop_search)
+
+    start = time.perf_counter()
+    # Stopped before it started: the solver has no response to read
+    solved = not control.stopped
+    status = solver.solve(cp, callback) if solved else cp_model.UNKNOWN
+    solve_ms = (time.perf_counter() - start) * 1000
+
+    found = status in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+    values = (
+        np.array(solver.response_proto.solution, dtype=np.float64)
+        / _column_scales(model)
+        if found
+        else np.empty(0)
+    )
+    return SolveOutcome(
+        status=CPSAT_STATUS_LABELS.get(status, str(status)),
+        values=values,
+        solve_ms=solve_ms,
+        engine="cp-sat",
+        objective=_objective_of(model, values),
+        best_bound=solver.best_objective_bound if found else None,
+        nodes=solver.num_branches if solved else 0,
+    )
+
+
+ENGINES = {
+    "cbc": lambda *args: _solve_mpsolver("CBC", *args),
+    "scip": lambda *args: _solve_mpsolver("SCIP", *args),
+    "cp-sat": _solve_cp_sat,
+}
+
+# Engines the planner warm-starts from the heuristic plan in every mode: on the
+# bench's 30-recipe, 3-day request with 5 s, CP-SAT alone ends about 8x above
+# CBC's objective, and within about 1.25x of it from the heuristic plan
+WARM_START_ENGINES = {"cp-sat"}
+
+
+def resolve_engine(engine: Optional[str]) -> str:
+    """`engine`, or the server default (SOLVER_ENGINE) when None"""
+    return engine or SOLVER_ENGINE
+
+
+def solve_model(
+    model: PlanModel,
+    time_limit_sec: float,
+    engine: Optional[str] = None,
+    workers: Optional[int] = None,
+    hint: Optional[np.ndarray] = None,
+    control: Optional[SolveControl] = None,
+) -> SolveOutcome:
+    """Solve `model` with `engine` (server default when None), optionally warm-started."""
+    engine = resolve_engine(engine)
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown solver engine '{engine}'")
+    return ENGINES[engine](
+        model,
+        time_limit_sec,
+        workers or SOLVER_CPSAT_WORKERS,
+        hint,
+        control or SolveControl(),
+    )
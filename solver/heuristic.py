@@ -0,0 +1,242 @@
+"""Millisecond heuristic planner behind `mode: "fast"` and the anytime warm start.
+
+Scores plans with the MIP objective: alpha * band deviation of each day plus
+(beta * time + gamma * cost) / days per picked recipe, under the same repeat
+budget and slot eligibility. Two phases:
+
+1. greedy fill: every free slot, day by day, gets the candidate (or nothing)
+   that best tracks its share of the daily band, at its best portion;
+2. local search: each slot is re-optimized against the rest of its day, which
+   covers both swapping the recipe and adjusting its portion, until no move
+   improves the objective or the time budget runs out.
+
+Slots only consider a shortlist of candidates, ranked once by how well they
+cover a slot's share of the band alone, long enough that the repeat budget
+cannot exhaust it.
+"""
+
+import math
+import os
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from model import BAND_HIGH, BAND_LOW, N_KEYS, SLOTS, RecipeMatrix, pinned_servings
+from scoring import best_portions
+
+SOLVER_FAST_CANDIDATES = int(os.getenv("SOLVER_FAST_CANDIDATES", "50"))
+SOLVER_FAST_SEARCH_MS = float(os.getenv("SOLVER_FAST_SEARCH_MS", "50"))
+
+# Portions tried when ranking the shortlist, clipped to each slot's bounds
+PORTION_GRID = np.array([0.5, 1.0, 1.5, 2.0])
+
+
+@dataclass
+class HeuristicPlan:
+    picks: np.ndarray  # (days, len(SLOTS)) recipe index, -1 when empty
+    servings: np.ndarray  # (days, len(SLOTS))
+    objective: float
+    moves: int  # improving local-search moves applied
+    elapsed_ms: float
+
+
+def _deviation(totals: np.ndarray, low: np.ndarray, high: np.ndarray) -> np.ndarray:
+    return (np.maximum(0.0, totals - high) + np.maximum(0.0, low - totals)).sum(axis=-1)
+
+
+def _shortlist(
+    matrix: RecipeMatrix,
+    low: np.ndarray,
+    high: np.ndarray,
+    pick_cost: np.ndarray,
+    alpha: float,
+    size: int,
+) -> List[np.ndarray]:
+    """Per slot, the `size` eligible recipes that best fill the slot's share of the band"""
+    share_low = low / len(SLOTS)
+    share_high = high / len(SLOTS)
+    shortlist = []
+    for s in range(len(SLOTS)):
+        candidates = np.flatnonzero(matrix.eligible[:, s])
+        if candidates.size > size:
+            portions = np.clip(
+                PORTION_GRID,
+                matrix.portion_min[candidates, s, None],
+                matrix.portion_max[candidates, s, None],
+            )
+            totals = portions[:, :, None] * matrix.nutrients[candidates, None, :]
+            score = (
+                alpha * _deviation(totals, share_low, share_high).min(axis=1)
+                + pick_cost[candidates]
+            )
+            candidates = np.sort(candidates[np.argpartition(score, size)[:size]])
+        shortlist.append(candidates)
+    return shortlist
+
+
+def plan_heuristic(
+    matrix: RecipeMatrix,
+    days: int,
+    targets: np.ndarray,
+    weights: Dict[str, float],
+    max_repeat: int,
+    pins: np.ndarray,
+    pin_servings: Optional[np.ndarray] = None,
+    banned: Optional[np.ndarray] = None,
+    start_from: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+    time_budget_ms: float = SOLVER_FAST_SEARCH_MS,
+    candidates_per_slot: int = SOLVER_FAST_CANDIDATES,
+) -> HeuristicPlan:
+    """Greedy fill plus local search; pinned slots stay as they are.
+
+    `pin_servings` and `banned` mean what they do in model.build_model.
+    `start_from` (picks, servings) seeds free slots before the greedy fill.
+    """
+    start = time.perf_counter()
+    deadline = start + time_budget_ms / 1000
+    n = len(matrix)
+    alpha = float(weights.get("nutri", 1.0))
+    beta = float(weights.get("time", 0.2))
+    gamma = float(weights.get("cost", 0.2))
+    low = BAND_LOW * targets
+    high = BAND_HIGH * targets
+    pick_cost = (beta * matrix.time_min + gamma * matrix.cost_eur) / max(1, days)
+    nutrients = matrix.nutrients
+
+    picks = pins.copy()
+    servings = (
+        pinned_servings(matrix, pins)
+        if pin_servings is None
+        else np.where(pins >= 0, pin_servings, 0.0)
+    )
+    pin_day, pin_slot = np.nonzero(pins >= 0)
+    totals = np.zeros((days, len(N_KEYS)))
+    np.add.at(
+        totals,
+        pin_day,
+        nutrients[pins[pin_day, pin_slot]] * servings[pin_day, pin_slot, None],
+    )
+    counts = np.bincount(pins[pin_day, pin_slot], minlength=n)
+    # Recipes may be shortlisted for every slot, so each list must cover the horizon alone
+    size = max(candidates_per_slot, 2 * math.ceil(days * len(SLOTS) / max_repeat))
+    shortlist = _shortlist(matrix, low, high, pick_cost, alpha, size)
+
+    closed = np.zeros(pins.shape, dtype=bool)
+    excluded: Dict[Tuple[int, int], List[int]] = {}
+    for d, s, r in (
+        banned if banned is not None else np.empty((0, 3), dtype=int)
+    ).tolist():
+        if r < 0:
+            closed[d, s] = True
+        else:
+            excluded.setdefault((d, s), []).append(r)
+
+    def best_move(d: int, s: int, base: np.ndarray, lo: np.ndarray, hi: np.ndarray):
+        """(recipe, servings, score) of the best fill of (d, s) on top of `base`, recipe -1 for empty"""
+        current = picks[d, s]
+        candidates = shortlist[s] if current < 0 else np.append(shortlist[s], current)
+        candidates = candidates[
+            (counts[candidates] < max_repeat) | (candidates == current)
+        ]
+        if (d, s) in excluded:
+            candidates = candidates[~np.isin(candidates, excluded[d, s])]
+        best = (-1, 0.0, alpha * float(_deviation(base, lo, hi)))
+        if candidates.size:
+            portions, deviation = best_portions(
+                base,
+                nutrients[candidates],
+                lo,
+                hi,
+                matrix.portion_min[candidates, s],
+                matrix.portion_max[candidates, s],
+            )
+            score = alpha * deviation + pick_cost[candidates]
+            i = int(score.argmin())
+            if score[i] < best[2]:
+                best = (int(candidates[i]), float(portions[i]), float(score[i]))
+        return best
+
+    def place(d: int, s: int, recipe: int, portions: float) -> None:
+        current = picks[d, s]
+        if current >= 0:
+            counts[current] -= 1
+            totals[d] -= servings[d, s] * nutrients[current]
+        picks[d, s] = recipe
+        servings[d, s] = portions if recipe >= 0 else 0.0
+        if recipe >= 0:
+            counts[recipe] += 1
+            totals[d] += portions * nutrients[recipe]
+
+    free = [np.flatnonzero((pins[d] < 0) & ~closed[d]) for d in range(days)]
+
+    if start_from is not None:
+        start_picks, start_servings = start_from
+        for d in range(days):
+            for s in free[d].tolist():
+                r = int(start_picks[d, s])
+                if (
+                    r >= 0
+                    and matrix.eligible[r, s]
+                    and counts[r] < max_repeat
+                    and r not in excluded.get((d, s), ())
+                ):
+                    place(
+                        d,
+                        s,
+                        r,
+                        float(
+                            np.clip(
+                                start_servings[d, s],
+                                matrix.portion_min[r, s],
+                                matrix.portion_max[r, s],
+                            )
+                        ),
+                    )
+
+    # Greedy: the j-th empty slot of a day aims at j/F of what the band still needs
+    for d in range(days):
+        fixed = totals[d].copy()
+        empty = [s for s in free[d].tolist() if picks[d, s] < 0]
+        for j, s in enumerate(empty, start=1):
+            frac = j / len(empty)
+            lo = fixed + frac * np.maximum(0.0, low - fixed)
+            hi = fixed + frac * np.maximum(0.0, high - fixed)
+            recipe, portions, _ = best_move(d, s, totals[d], lo, hi)
+            if recipe >= 0:
+                place(d, s, recipe, portions)
+
+    # Local search: re-optimize one slot at a time against the full band
+    moves = 0
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = False
+        for d in range(days):
+            for s in free[d].tolist():
+                current = picks[d, s]
+                base = totals[d] - (
+                    servings[d, s] * nutrients[current] if current >= 0 else 0.0
+                )
+                score_now = alpha * float(_deviation(totals[d], low, high)) + (
+                    pick_cost[current] if current >= 0 else 0.0
+                )
+                recipe, portions, score = best_move(d, s, base, low, high)
+                if score < score_now - 1e-9:
+                    place(d, s, recipe, portions)
+                    moves += 1
+                    improved = True
+            if time.perf_counter() >= deadline:
+                break
+
+    picked = picks[picks >= 0]
+    objective = alpha * float(_deviation(totals, low, high).sum()) + float(
+        pick_cost[picked].sum()
+    )
+    return HeuristicPlan(
+        picks=picks,
+        servings=servings,
+        objective=objective,
+        moves=moves,
+        elapsed_ms=(time.perf_counter() - start) * 1000,
+    )
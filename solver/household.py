@@ -0,0 +1,322 @@
+"""Joint plan for a household sharing its meals.
+
+Every member eats from the same (day, slot) recipe choice y, with their own
+portions z and their own daily band: one model instead of one solve per
+person followed by reconciling the plans. A recipe a member dislikes caps
+their portion of it at zero; they skip that meal rather than it being banned
+for everyone. The objective sums each member's band deviation (times alpha)
+and the time and cost of each recipe cooked, as in model.build_model.
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from model import (
+    BAND_HIGH,
+    BAND_LOW,
+    N_KEYS,
+    SLOTS,
+    PlanModel,
+    RecipeMatrix,
+    _Rows,
+    empty_day,
+)
+from scoring import best_portions
+
+
+@dataclass
+class HouseholdModel(PlanModel):
+    """PlanModel whose z_cols are (members, cells) and whose pin_servings,
+    band_low and band_high have a leading members axis. Pins are cells, so
+    `pins` is all -1."""
+
+    members: int = 1
+
+
+def build_household_model(
+    matrix: RecipeMatrix,
+    days: int,
+    targets: np.ndarray,
+    allowed: np.ndarray,
+    weights: Dict[str, float],
+    max_repeat: int,
+    pins: Optional[np.ndarray] = None,
+) -> HouseholdModel:
+    """Build the household MIP.
+
+    targets: (members, K) daily targets; allowed: (members, n) bool, False
+    where the member dislikes the recipe. Unlike build_model, a pin only
+    fixes the recipe: its y is fixed at 1 and members' portions stay free,
+    so the model has no pinned slots of its own.
+    """
+    start = time.perf_counter()
+    n = len(matrix)
+    S = len(SLOTS)
+    K = len(N_KEYS)
+    M = len(targets)
+    if pins is None:
+        pins = np.full((days, S), -1)
+
+    # One candidate cell per eligible (slot, recipe) pair, except that a
+    # recipe nobody may eat is never worth cooking; a pinned slot has just
+    # its pinned recipe, picked for sure
+    slot_day, slot_slot = np.nonzero(np.ones((days, S), dtype=bool))
+    slot_pin = pins[slot_day, slot_slot]
+    candidates = matrix.eligible[:, slot_slot].T & allowed.any(axis=0)
+    candidates[slot_pin >= 0] = np.arange(n) == slot_pin[slot_pin >= 0, None]
+    cell_free, cell_recipe = np.nonzero(candidates)
+    cell_day = slot_day[cell_free]
+    cell_slot = slot_slot[cell_free]
+    cell_min = matrix.portion_min[cell_recipe, cell_slot]
+    cell_max = matrix.portion_max[cell_recipe, cell_slot]
+    cell_pinned = slot_pin[cell_free] >= 0
+    m = cell_day.size
+
+    # Column layout: [y cells | z cells per member | dev_pos (M,d,k) | dev_neg (M,d,k)]
+    y_cols = np.arange(m)
+    z_cols = m + np.arange(M * m).reshape(M, m)
+    dev_pos = (M + 1) * m + np.arange(M * days * K)
+    dev_neg = dev_pos + M * days * K
+    num_cols = (M + 1) * m + 2 * M * days * K
+
+    alpha = float(weights.get("nutri", 1.0))
+    beta = float(weights.get("time", 0.2))
+    gamma = float(weights.get("cost", 0.2))
+
+    member_max = cell_max * allowed[:, cell_recipe]
+    lower = np.zeros(num_cols)
+    lower[y_cols[cell_pinned]] = 1.0
+    upper = np.concatenate(
+        [np.ones(m), member_max.ravel(), np.full(2 * M * days * K, np.inf)]
+    )
+    objective = np.zeros(num_cols)
+    objective[y_cols] = (
+        beta * matrix.time_min[cell_recipe] + gamma * matrix.cost_eur[cell_recipe]
+    ) / max(1, days)
+    objective[dev_pos] = alpha
+    objective[dev_neg] = alpha
+
+    rows = _Rows()
+
+    # One recipe at most per shared slot
+    rows.add(slot_day.size, [(cell_free, y_cols, 1.0)], -np.inf, 1.0)
+
+    # Each member's portion: z <= max * y, and z >= min * y unless they dislike it
+    local = np.arange(M * m)
+    member_y = np.tile(y_cols, M)
+    rows.add(
+        M * m,
+        [(local, z_cols.ravel(), 1.0), (local, member_y, -member_max.ravel())],
+        -np.inf,
+        0.0,
+    )
+    has_min = np.flatnonzero(((cell_min > 0) & allowed[:, cell_recipe]).ravel())
+    local = np.arange(has_min.size)
+    rows.add(
+        has_min.size,
+        [
+            (local, z_cols.ravel()[has_min], 1.0),
+            (local, member_y[has_min], -np.tile(cell_min, M)[has_min]),
+        ],
+        0.0,
+        np.inf,
+    )
+
+    # Each member's daily totals inside their band, up to their deviation variables
+    coeffs = matrix.nutrients[cell_recipe]
+    cell_idx, k_idx = np.nonzero(coeffs)
+    high = np.repeat(BAND_HIGH * targets[:, None, :], days, axis=1)
+    low = np.repeat(BAND_LOW * targets[:, None, :], days, axis=1)
+    for member in range(M):
+        total_rows = cell_day[cell_idx] * K + k_idx
+        total_terms = (total_rows, z_cols[member, cell_idx], coeffs[cell_idx, k_idx])
+        dk = np.arange(days * K)
+        span = slice(member * days * K, (member + 1) * days * K)
+        rows.add(
+            days * K,
+            [total_terms, (dk, dev_pos[span], -1.0)],
+            -np.inf,
+            high[member].ravel(),
+        )
+        rows.add(
+            days * K,
+            [total_terms, (dk, dev_neg[span], 1.0)],
+            low[member].ravel(),
+            np.inf,
+        )
+
+    # Max repeat of a recipe across the horizon, pinned meals included
+    rows.add(
+        n,
+        [(cell_recipe, y_cols, 1.0)],
+        -np.inf,
+        np.maximum(max_repeat, np.bincount(pins[pins >= 0], minlength=n)),
+    )
+
+    integer = np.zeros(num_cols, dtype=bool)
+    integer[y_cols] = True
+
+    return HouseholdModel(
+        lower=lower,
+        upper=upper,
+        objective=objective,
+        offset=0.0,
+        constraints=rows.matrix(num_cols),
+        row_lower=np.concatenate(rows.lb),
+        row_upper=np.concatenate(rows.ub),
+        integer=integer,
+        days=days,
+        cell_day=cell_day,
+        cell_slot=cell_slot,
+        cell_recipe=cell_recipe,
+        y_cols=y_cols,
+        z_cols=z_cols,
+        pins=np.full((days, S), -1),
+        pin_servings=np.zeros((M, days, S)),
+        band_low=low,
+        band_high=high,
+        vars_removed=0,
+        build_ms=(time.perf_counter() - start) * 1000,
+        members=M,
+    )
+
+
+def member_shares(targets: np.ndarray) -> np.ndarray:
+    """Each member's share of the household's needs: their mean fraction of
+    the summed targets, over nutrients someone has a target for."""
+    total = targets.sum(axis=0)
+    has = total > 0
+    if not has.any():
+        return np.full(len(targets), 1.0 / len(targets))
+    share = (targets[:, has] / total[has]).mean(axis=1)
+    return share / share.sum()
+
+
+def fit_portions(
+    matrix: RecipeMatrix,
+    picks: np.ndarray,
+    portions: np.ndarray,
+    targets: np.ndarray,
+    allowed: np.ndarray,
+    passes: int = 3,
+) -> np.ndarray:
+    """Coordinate descent on each member's portions of fixed picks: in turn,
+    every meal gets the portion that best fits the rest of the member's day.
+    portions: (members, days, slots)."""
+    portions = portions.copy()
+    nutrients = matrix.nutrients
+    day, slot = np.nonzero(picks >= 0)
+    recipes = picks[day, slot]
+    filled = picks >= 0
+    for member in range(len(targets)):
+        low, high = BAND_LOW * targets[member], BAND_HIGH * targets[member]
+        totals = (
+            np.where(filled, portions[member], 0.0)[..., None]
+            * nutrients[np.maximum(picks, 0)]
+        ).sum(axis=1)
+        for _ in range(passes):
+            for d, s, r in zip(day.tolist(), slot.tolist(), recipes.tolist()):
+                if not allowed[member, r]:
+                    continue
+                base = totals[d] - portions[member, d, s] * nutrients[r]
+                best, _ = best_portions(
+                    base,
+                    nutrients[r, None],
+                    low,
+                    high,
+                    matrix.portion_min[r, s, None],
+                    matrix.portion_max[r, s, None],
+                )
+                portions[member, d, s] = best[0]
+                totals[d] = base + best[0] * nutrients[r]
+    return portions
+
+
+def household_values(
+    model: HouseholdModel, matrix: RecipeMatrix, picks: np.ndarray, portions: np.ndarray
+) -> np.ndarray:
+    """Solution vector for (days, slots) picks and (members, days, slots)
+    portions; picks outside the model's cells are left empty."""
+    n = len(matrix)
+    S = len(SLOTS)
+    M = model.members
+    values = np.zeros(model.num_cols)
+    day, slot = np.nonzero(picks >= 0)
+    # Cells are laid out by (day, slot) then recipe, so their keys are sorted
+    cell_keys = (model.cell_day * S + model.cell_slot) * n + model.cell_recipe
+    wanted = (day * S + slot) * n + picks[day, slot]
+    found = np.searchsorted(cell_keys, wanted)
+    hit = found < cell_keys.size
+    hit[hit] = cell_keys[found[hit]] == wanted[hit]
+    cells = found[hit]
+    values[model.y_cols[cells]] = 1.0
+    values[model.z_cols[:, cells]] = np.minimum(
+        portions[:, day[hit], slot[hit]], model.upper[model.z_cols[:, cells]]
+    )
+
+    K = len(N_KEYS)
+    m = model.y_cols.size
+    for member in range(M):
+        totals = np.zeros((model.days, K))
+        np.add.at(
+            totals,
+            model.cell_day[cells],
+            matrix.nutrients[model.cell_recipe[cells]]
+            * values[model.z_cols[member, cells], None],
+        )
+        dev_pos = (M + 1) * m + (member * model.days + np.arange(model.days)) * K
+        span = (dev_pos[:, None] + np.arange(K)).ravel()
+        values[span] = np.maximum(0.0, totals - model.band_high[member]).ravel()
+        values[span + M * model.days * K] = np.maximum(
+            0.0, model.band_low[member] - totals
+        ).ravel()
+    return values
+
+
+def extract_household_plan(
+    model: HouseholdModel, matrix: RecipeMatrix, values: np.ndarray, names: List[str]
+) -> List[Dict[str, Dict[str, Any]]]:
+    """Per-day shared plan: `{recipeId, servings, portions: {member: servings}}`
+    per slot, servings being the total cooked."""
+    picks = np.full((model.days, len(SLOTS)), -1)
+    portions = np.zeros((model.members, model.days, len(SLOTS)))
+    if values.size:
+        picked = np.flatnonzero(values[model.y_cols] > 0.5)
+        day, slot = model.cell_day[picked], model.cell_slot[picked]
+        picks[day, slot] = model.cell_recipe[picked]
+        portions[:, day, slot] = values[model.z_cols[:, picked]]
+
+    plan = [
+        {slot: {**meal, "portions": {}} for slot, meal in empty_day().items()}
+        for _ in range(model.days)
+    ]
+    portions = np.round(np.maximum(portions, 0.0), 2)
+    for d, s in zip(*np.nonzero(picks >= 0)):
+        share = portions[:, d, s].tolist()
+        plan[d][SLOTS[s]] = {
+            "recipeId": matrix.ids[picks[d, s]],
+            "servings": round(sum(share), 2),
+            "portions": dict(zip(names, share)),
+        }
+    return plan
+
+
+def member_plan(
+    plan: List[Dict[str, Dict[str, Any]]], name: str
+) -> List[Dict[str, Dict[str, Any]]]:
+    """One member's view of a household plan, in the `/solve` plan format;
+    meals they skip are empty."""
+    member = []
+    for day in plan:
+        meals = {}
+        for slot, meal in day.items():
+            servings = meal["portions"].get(name, 0.0)
+            meals[slot] = {
+                "recipeId": meal["recipeId"] if servings > 0 else None,
+                "servings": servings,
+            }
+        member.append(meals)
+    return member
@@ -0,0 +1,319 @@
+"""Asynchronous solve jobs running on a fleet of worker processes.
+
+Each worker is a separate process with its own pipe, so a CBC search never
+holds the API process's GIL or threadpool. Jobs wait in a bounded queue; when
+it is full, submit() raises QueueFull and the API answers 429.
+
+CBC cannot be interrupted mid-search, so cancelling a running job kills its
+worker process and a fresh one takes its place.
+
+A job submitted with a cache key stores its result in this process's
+solution_cache under that key, and submitting the same key again while it
+is queued or running returns the job already under way.
+"""
+
+import math
+import multiprocessing as mp
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from multiprocessing.connection import wait
+from typing import Any, Callable, Deque, Dict, Optional
+
+from cache import solution_cache
+from metrics import observe_result
+from planner import solve_payload
+
+SOLVER_WORKERS = int(os.getenv("SOLVER_WORKERS", os.cpu_count() or 1))
+SOLVER_MAX_QUEUE = int(os.getenv("SOLVER_MAX_QUEUE", "32"))
+SOLVER_JOB_TTL_SEC = int(os.getenv("SOLVER_JOB_TTL_SEC", "3600"))
+
+# Used for Retry-After until some jobs have finished
+DEFAULT_JOB_SEC = 5.0
+
+
+class QueueFull(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__(f"solver queue is full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+@dataclass
+class Job:
+    id: str
+    payload: Any
+    key: Optional[str] = None  # solution_cache key of the result
+    status: str = "queued"  # queued | running | done | failed | cancelled
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed", "cancelled")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+def _worker_main(conn, target: Callable[[Any], Any]) -> None:
+    while True:
+        try:
+            msg = conn.recv()
+        except EOFError:
+            return
+        if msg is None:
+            return
+        job_id, payload = msg
+        try:
+            conn.send((job_id, True, target(payload)))
+        except Exception as e:
+            conn.send((job_id, False, f"{type(e).__name__}: {e}"))
+
+
+class _Worker:
+    def __init__(self, ctx, target: Callable[[Any], Any]):
+        self.ctx = ctx
+        self.target = target
+        self.job_id: Optional[str] = None
+        self.start()
+
+    def start(self) -> None:
+        self.conn, child = self.ctx.Pipe()
+        self.process = self.ctx.Process(
+            target=_worker_main, args=(child, self.target), daemon=True
+        )
+        self.process.start()
+        child.close()
+        self.job_id = None
+        self.recycle = False
+
+    def restart(self) -> None:
+        self.conn.close()
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(timeout=5)
+        self.start()
+
+
+class WorkerPool:
+    """Runs `target(payload)` for submitted jobs on `workers` processes."""
+
+    def __init__(
+        self,
+        target: Callable[[Any], Any],
+        workers: int,
+        max_queue: int,
+        job_ttl_sec: int = 3600,
+    ):
+        self.max_queue = max_queue
+        self.job_ttl_sec = job_ttl_sec
+        self._ctx = mp.get_context("spawn")
+        self._lock = threading.Lock()
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._pending: Deque[str] = deque()
+        self._by_key: Dict[str, str] = {}  # cache key -> unfinished job id
+        self._durations: Deque[float] = deque(maxlen=50)
+        self._workers = [_Worker(self._ctx, target) for _ in range(max(1, workers))]
+        self._wake_r, self._wake_w = self._ctx.Pipe(duplex=False)
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._run, name="solver-dispatch", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, payload: Any, key: Optional[str] = None) -> Job:
+        """Queue `payload`; with a `key`, the job of the same key still
+        queued or running, if any, is returned instead"""
+        with self._lock:
+            self._prune()
+            running = self._jobs.get(self._by_key.get(key))
+            if running is not None and not running.finished:
+                return running
+            if len(self._pending) >= self.max_queue:
+                raise QueueFull(self._retry_after())
+            job = Job(id=uuid.uuid4().hex, payload=payload, key=key)
+            self._jobs[job.id] = job
+            self._pending.append(job.id)
+            if key is not None:
+                self._by_key[key] = job.id
+        self._wake()
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.finished:
+                return job
+            if job.status == "queued":
+                self._pending.remove(job_id)
+            else:
+                # The dispatcher sees the dead pipe and starts a replacement
+                for worker in self._workers:
+                    if worker.job_id == job_id:
+                        worker.recycle = True
+                        worker.process.kill()
+            job.status = "cancelled"
+            job.payload = None
+            job.finished_at = time.time()
+            self._forget(job)
+        return job
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "workers": len(self._workers),
+                "busy": sum(1 for w in self._workers if w.job_id is not None),
+                "queued": len(self._pending),
+                "max_queue": self.max_queue,
+            }
+
+    def shutdown(self) -> None:
+        self._closed = True
+        self._wake()
+        self._thread.join(timeout=5)
+        for worker in self._workers:
+            try:
+                worker.conn.send(None)
+            except OSError:
+                pass
+            worker.process.join(timeout=5)
+            if worker.process.is_alive():
+                worker.process.kill()
+
+    def _wake(self) -> None:
+        self._wake_w.send_bytes(b"")
+
+    def _retry_after(self) -> int:
+        per_job = (
+            sum(self._durations) / len(self._durations)
+            if self._durations
+            else DEFAULT_JOB_SEC
+        )
+        return max(
+            1, math.ceil(per_job * (len(self._pending) + 1) / len(self._workers))
+        )
+
+    def _forget(self, job: Job) -> None:
+        if job.key is not None and self._by_key.get(job.key) == job.id:
+            del self._by_key[job.key]
+
+    def _prune(self) -> None:
+        cutoff = time.time() - self.job_ttl_sec
+        expired = [
+            j.id for j in self._jobs.values() if j.finished and j.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def _run(self) -> None:
+        while not self._closed:
+            self._dispatch()
+            busy = {w.conn: w for w in self._workers if w.job_id is not None}
+            for conn in wait([self._wake_r, *busy], timeout=1.0):
+                if conn is self._wake_r:
+                    while self._wake_r.poll():
+                        self._wake_r.recv_bytes()
+                else:
+                    self._collect(busy[conn])
+
+    def _dispatch(self) -> None:
+        broken = []
+        with self._lock:
+            for worker in self._workers:
+                if worker.job_id is not None or not self._pending:
+                    continue
+                job = self._jobs[self._pending.popleft()]
+                job.status = "running"
+                job.started_at = time.time()
+                worker.job_id = job.id
+                try:
+                    worker.conn.send((job.id, job.payload))
+                except OSError:
+                    worker.job_id = None
+                    broken.append(worker)
+                    job.status = "queued"
+                    job.started_at = None
+                    self._pending.appendleft(job.id)
+                    continue
+                job.payload = None
+        # Restarts join the old process, so they run without the lock held
+        for worker in broken:
+            worker.restart()
+
+    def _collect(self, worker: _Worker) -> None:
+        try:
+            job_id, ok, value = worker.conn.recv()
+        except (EOFError, OSError):
+            with self._lock:
+                job = self._jobs.get(worker.job_id)
+                if job is not None and job.status == "running":
+                    job.status = "failed"
+                    job.error = "Solver worker exited unexpectedly"
+                    job.finished_at = time.time()
+                    self._forget(job)
+                worker.job_id = None
+            worker.restart()
+            return
+
+        with self._lock:
+            # A result that raced with a cancel: the process is being killed
+            recycle, worker.job_id = worker.recycle, None
+            job = self._jobs.get(job_id)
+            if job is not None and job.status == "running":
+                job.finished_at = time.time()
+                self._durations.append(job.finished_at - job.started_at)
+                if ok:
+                    job.status = "done"
+                    job.result = value
+                else:
+                    job.status = "failed"
+                    job.error = value
+                self._forget(job)
+            else:
+                job = None
+        if recycle:
+            worker.restart()
+        if job is not None and ok:
+            if job.key is not None:
+                # The worker's cache is its own; later requests hit this one
+                solution_cache.put(job.key, value)
+            observe_result("/solve/jobs", value)
+
+
+_pool: Optional[WorkerPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> WorkerPool:
+    """Process-wide pool, started on first use so importing the app stays cheap"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = WorkerPool(
+                solve_payload, SOLVER_WORKERS, SOLVER_MAX_QUEUE, SOLVER_JOB_TTL_SEC
+            )
+        return _pool
+
+
+def pool_stats() -> Optional[Dict[str, int]]:
+    """get_pool().stats(), or None when no job has started the pool yet"""
+    pool = _pool
+    return None if pool is None else pool.stats()
@@ -1,10 +1,46 @@
+import asyncio
+import json
+import time
+from typing import Optional, Tuple
 
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
-from typing import List, Dict, Optional
-from ortools.linear_solver import pywraplp
-import time
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from pydantic import ValidationError
+
+from batch import run_batch
+from cache import solution_cache
+from catalog import Catalog, catalogs
+from engines import SolveControl
+from jobs import QueueFull, get_pool, pool_stats
+from metrics import MetricsMiddleware, observe_result, render, validate_ms
+from planner import (
+    cache_key,
+    cached_result,
+    household_request,
+    resolve_request,
+    solve_cached,
+    solve_streaming,
+    substitutes_request,
+)
+from schemas import (
+    BatchRequest,
+    CatalogRequest,
+    HouseholdRequest,
+    ResolveRequest,
+    SolveRequest,
+    SubstitutesRequest,
+)
+from snapshot import load_snapshot
+from wire import (
+    JSON,
+    MSGPACK,
+    UnsupportedMediaType,
+    decode_solve,
+    encode,
+    wants_msgpack,
+)
 
 app = FastAPI(title="VeganFlemme Optimizer")
 
@@ -15,160 +51,312 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware, routes=app.router.routes)
+
+# Mapped once per process; workers share the file's pages
+nutrient_snapshot = load_snapshot()
+
+
+def observed(endpoint: str, result: dict, validate: Optional[float]) -> dict:
+    """`result` with the request's validation time in meta.timings, recorded in the metrics"""
+    meta = result.get("meta")
+    if meta is not None and validate is not None:
+        result = {
+            **result,
+            "meta": {
+                **meta,
+                "timings": {**meta.get("timings", {}), "validate_ms": validate},
+            },
+        }
+    observe_result(endpoint, result)
+    return result
 
-SLOTS = ["breakfast","lunch","dinner","snack"]
-N_KEYS = ["energy_kcal","protein_g","carbs_g","fat_g","fiber_g","b12_ug","iron_mg","calcium_mg","zinc_mg","iodine_ug","selenium_ug","vitamin_d_ug","ala_g"]
-
-class Nutrients(BaseModel):
-    energy_kcal: float = 0
-    protein_g: float = 0
-    carbs_g: float = 0
-    fat_g: float = 0
-    fiber_g: float = 0
-    b12_ug: float = 0
-    iron_mg: float = 0
-    calcium_mg: float = 0
-    zinc_mg: float = 0
-    iodine_ug: float = 0
-    selenium_ug: float = 0
-    vitamin_d_ug: float = 0
-    ala_g: float = 0
-
-class Recipe(BaseModel):
-    id: str
-    title: str
-    time_min: int = 20
-    cost_eur: float = 2.5
-    nutrients: Nutrients
-
-class DayPlan(BaseModel):
-    breakfast: Optional[str] = None
-    lunch: Optional[str] = None
-    dinner: Optional[str] = None
-    snack: Optional[str] = None
-
-class SolveRequest(BaseModel):
-    recipes: List[Recipe]
-    day_templates: List[DayPlan]
-    targets: Nutrients
-    weights: Dict[str, float] = {}
-    dislikes: List[str] = []
-    max_repeat: int = Field(2, ge=1, le=5)
-    time_limit_sec: int = Field(25, ge=5, le=180)
 
 @app.get("/health")
 def health():
     return {"ok": True, "ts": time.time()}
 
+
 @app.get("/healthz")
 def healthz():
     """Health check endpoint matching frontend expectations"""
     return {"ok": True, "ts": time.time()}
 
-@app.post("/solve")
-def solve(req: SolveRequest):
+
+@app.get("/catalogs")
+def list_catalogs():
+    return {"catalogs": catalogs.list()}
+
+
+@app.post("/catalogs", status_code=201)
+def register_catalog(req: CatalogRequest):
+    """Register (or version) a recipe set that solve requests can reference by catalog_id"""
+    return catalogs.register(req.catalog_id, req.recipes).describe()
+
+
+@app.get("/catalogs/{catalog_id}")
+def get_catalog(catalog_id: str, version: Optional[int] = None):
     try:
-        if not req.recipes or not req.day_templates:
-            raise HTTPException(status_code=400, detail="recipes and day_templates required")
-
-        # Filter recipes
-        R = [r for r in req.recipes if r.id not in set(req.dislikes)]
-        if not R:
-            return {"status": "EMPTY_POOL", "plan": [{"breakfast": None, "lunch": None, "dinner": None, "snack": None} for _ in range(len(req.day_templates))]}
-
-        days = len(req.day_templates)
-        n = len(R)
-        rid_index = {R[i].id: i for i in range(n)}
-
-        solver = pywraplp.Solver.CreateSolver("CBC")
-        if solver is None:
-            raise RuntimeError("OR-Tools CBC solver unavailable")
-
-        BIG = 2.0
-
-        # Decision variables
-        y = {}  # pick recipe
-        z = {}  # portions of recipe i on (d,slot)
-        for d in range(days):
-            for s in SLOTS:
-                for i in range(n):
-                    y[d, s, i] = solver.BoolVar(f"y_{d}_{s}_{i}")
-                    z[d, s, i] = solver.NumVar(0.0, BIG, f"z_{d}_{s}_{i}")
-
-        # Choose at most 1 recipe per slot
-        for d in range(days):
-            for s in SLOTS:
-                solver.Add(sum(y[d, s, i] for i in range(n)) <= 1)
-                for i in range(n):
-                    # Link z <= BIG * y
-                    solver.Add(z[d, s, i] <= BIG * y[d, s, i])
-
-        # Nutrient totals per day
-        # val[d,k] = sum_{s,i} z[d,s,i] * nutrient_k[i]   (linear, car z est continu et multiplie un CONSTANTE)
-        val = {(d,k): solver.NumVar(0.0, solver.infinity(), f"val_{d}_{k}") for d in range(days) for k in N_KEYS}
-        for d in range(days):
-            for k in N_KEYS:
-                solver.Add(val[d,k] == sum(z[d, s, i] * getattr(R[i].nutrients, k) for s in SLOTS for i in range(n)))
-
-        # Deviation variables around targets
-        dev_pos = {(d,k): solver.NumVar(0.0, solver.infinity(), f"devp_{d}_{k}") for d in range(days) for k in N_KEYS}
-        dev_neg = {(d,k): solver.NumVar(0.0, solver.infinity(), f"devn_{d}_{k}") for d in range(days) for k in N_KEYS}
-
-        T = req.targets
-        for d in range(days):
-            for k in N_KEYS:
-                target = max(0.0, getattr(T, k))
-                low = 0.85 * target
-                high = 1.15 * target
-                solver.Add(val[d,k] - high <= dev_pos[d,k])
-                solver.Add(low - val[d,k] <= dev_neg[d,k])
-
-        # Max repeat of a recipe across the week
-        for i in range(n):
-            solver.Add(sum(y[d, s, i] for d in range(days) for s in SLOTS) <= req.max_repeat)
-
-        # Mean time / cost (linear on y)
-        mean_time = (1.0 / max(1, days)) * solver.Sum([y[d, s, i] * R[i].time_min for d in range(days) for s in SLOTS for i in range(n)])
-        mean_cost = (1.0 / max(1, days)) * solver.Sum([y[d, s, i] * R[i].cost_eur for d in range(days) for s in SLOTS for i in range(n)])
-
-        alpha = float(req.weights.get("nutri", 1.0))
-        beta  = float(req.weights.get("time", 0.2))
-        gamma = float(req.weights.get("cost", 0.2))
-
-        nutri_term = solver.Sum([dev_pos[d,k] + dev_neg[d,k] for d in range(days) for k in N_KEYS])
-        objective = solver.Sum([alpha * nutri_term, beta * mean_time, gamma * mean_cost])
-        solver.Minimize(objective)
-
-        solver.SetTimeLimit(int(req.time_limit_sec * 1000))
-        status = solver.Solve()
-
-        status_map = {
-            pywraplp.Solver.OPTIMAL: "Optimal",
-            pywraplp.Solver.FEASIBLE: "Feasible",
-            pywraplp.Solver.INFEASIBLE: "Infeasible",
-            pywraplp.Solver.UNBOUNDED: "Unbounded",
-            pywraplp.Solver.ABNORMAL: "Abnormal",
-            pywraplp.Solver.NOT_SOLVED: "NotSolved",
-        }
-        label = status_map.get(status, str(status))
-
-        # Build solution
-        plan = []
-        for d in range(days):
-            day = {}
-            for s in SLOTS:
-                chosen = None
-                portions = 0.0
-                for i in range(n):
-                    if y[d, s, i].solution_value() > 0.5:
-                        chosen = R[i].id
-                        portions = z[d, s, i].solution_value()
-                        break
-                day[s] = {"recipeId": chosen, "servings": round(portions, 2)}
-            plan.append(day)
-
-        return {"status": label, "plan": plan}
+        return catalogs.get(catalog_id, version).describe()
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+
+
+@app.get("/foods")
+def foods_snapshot():
+    """The CIQUAL nutrient snapshot served by /foods/{ciqual_code}"""
+    if nutrient_snapshot is None:
+        raise HTTPException(
+            status_code=404, detail="No nutrient snapshot loaded (NUTRIENT_SNAPSHOT)"
+        )
+    return nutrient_snapshot.describe()
+
+
+@app.get("/foods/{ciqual_code}")
+def get_food(ciqual_code: str, grams: float = Query(100.0, gt=0)):
+    """Nutrients of `grams` of a CIQUAL food, in N_KEYS units"""
+    if nutrient_snapshot is None:
+        raise HTTPException(
+            status_code=404, detail="No nutrient snapshot loaded (NUTRIENT_SNAPSHOT)"
+        )
+    food = nutrient_snapshot.food(ciqual_code, grams)
+    if food is None:
+        raise HTTPException(
+            status_code=404, detail=f"Unknown CIQUAL food {ciqual_code}"
+        )
+    return food
+
+
+@app.get("/cache/stats")
+def cache_stats():
+    return solution_cache.stats()
+
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus text exposition: latencies, phase timings, result counts,
+    and queue/worker/cache state"""
+    extra = {f"cache_{name}": value for name, value in solution_cache.stats().items()}
+    jobs = pool_stats()
+    if jobs is not None:
+        extra.update({f"jobs_{name}": value for name, value in jobs.items()})
+    return PlainTextResponse(render(extra), media_type="text/plain; version=0.0.4")
+
+
+def solve_anytime(req: SolveRequest):
+    """Heuristic plan right away, or the refined one once it is cached; the
+    warm-started MIP runs as a solve job whose id is in meta.job_id (the
+    same job for repeats while it runs), and its result is cached under
+    the request's key when it finishes"""
+    refined = cached_result(req)
+    if refined is not None:
+        return refined
+    result = solve_cached(req.model_copy(update={"mode": "fast"}))
+    try:
+        job = get_pool().submit(req.model_dump(), cache_key(req))
+    except QueueFull:
+        job = None
+    return {
+        **result,
+        "meta": {
+            **result.get("meta", {}),
+            "mode": req.mode,
+            "job_id": job.id if job else None,
+        },
+    }
+
+
+async def solve_body(request: Request) -> Tuple[SolveRequest, Optional[Catalog]]:
+    """/solve's body as JSON or MessagePack, with its packed recipe_columns pool if any (wire.py)"""
+    body = await request.body()
+    try:
+        return decode_solve(body, request.headers.get("content-type"))
+    except ValidationError as e:
+        raise RequestValidationError(
+            [{**error, "loc": ("body", *error["loc"])} for error in e.errors()]
+        )
+    except UnsupportedMediaType as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except (TypeError, ValueError) as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+# The body is parsed by solve_body, so its schema is declared by hand
+SOLVE_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            media: {"schema": {"$ref": "#/components/schemas/SolveRequest"}}
+            for media in (JSON, MSGPACK)
+        },
+    }
+}
+
 
+@app.post("/solve", openapi_extra=SOLVE_BODY)
+def solve(
+    request: Request, body: Tuple[SolveRequest, Optional[Catalog]] = Depends(solve_body)
+):
+    """JSON by default; MessagePack with `Accept: application/msgpack`"""
+    req, catalog = body
+    validate = validate_ms()
+    try:
+        if req.mode == "anytime":
+            if catalog is not None:
+                raise ValueError(
+                    "recipe_columns supports the exact and fast modes; register a catalog for anytime solves"
+                )
+            result = solve_anytime(req)
+        else:
+            result = solve_cached(req, catalog=catalog)
+        content, media_type = encode(
+            observed("/solve", result, validate),
+            wants_msgpack(request.headers.get("accept")),
+        )
+        return Response(content, media_type=media_type)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         # Return readable error to caller
         raise HTTPException(status_code=500, detail=f"{type(e).__name__}: {e}")
+
+
+@app.post("/resolve")
+def resolve(req: ResolveRequest):
+    """Re-plan only the changed slots of a previous plan, keeping the rest of the week"""
+    validate = validate_ms()
+    try:
+        return observed("/resolve", solve_cached(req, resolve_request), validate)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"{type(e).__name__}: {e}")
+
+
+@app.post("/solve/household")
+def solve_household(req: HouseholdRequest):
+    """One plan for several people sharing meals, each with their own portions"""
+    validate = validate_ms()
+    try:
+        return observed(
+            "/solve/household", solve_cached(req, household_request), validate
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"{type(e).__name__}: {e}")
+
+
+@app.post("/substitutes")
+def substitutes(req: SubstitutesRequest):
+    """Ranked replacements for one (day, slot), each at its best portion"""
+    validate = validate_ms()
+    try:
+        return observed("/substitutes", substitutes_request(req), validate)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post("/solve/stream")
+async def solve_stream(req: SolveRequest):
+    """Server-Sent Events: an `incumbent` event per improving plan, then one
+    `final` (the /solve response) or `error` event. Closing the connection
+    stops the solve."""
+    loop = asyncio.get_running_loop()
+    events: asyncio.Queue = asyncio.Queue()
+    control = SolveControl()
+    start = time.perf_counter()
+
+    def emit(kind: str, body: dict):
+        loop.call_soon_threadsafe(events.put_nowait, (kind, body))
+
+    def on_incumbent(incumbent: dict):
+        emit(
+            "incumbent",
+            {**incumbent, "elapsed_ms": round((time.perf_counter() - start) * 1000, 2)},
+        )
+
+    def run():
+        try:
+            result = solve_streaming(req, control, on_incumbent)
+            observe_result("/solve/stream", result)
+            emit(
+                "final",
+                {
+                    **result,
+                    "elapsed_ms": round((time.perf_counter() - start) * 1000, 2),
+                },
+            )
+        except ValueError as e:
+            emit("error", {"status_code": 400, "detail": str(e)})
+        except Exception as e:
+            emit("error", {"status_code": 500, "detail": f"{type(e).__name__}: {e}"})
+
+    async def stream():
+        loop.run_in_executor(None, run)
+        try:
+            while True:
+                kind, body = await events.get()
+                yield f"event: {kind}\ndata: {json.dumps(body)}\n\n"
+                if kind != "incumbent":
+                    break
+        finally:
+            # Client disconnected or the solve is over; either way stop searching
+            control.stop()
+
+    return StreamingResponse(
+        stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"}
+    )
+
+
+@app.post("/solve/batch")
+async def solve_batch(req: BatchRequest):
+    """Solve many requests on the batch process pool. Streams newline-delimited
+    JSON, one line per item in completion order plus a final `summary` line;
+    with `stream: false`, returns `{results, summary}` in request order."""
+    lines = run_batch(req.requests, req.recipes)
+    if req.stream:
+
+        async def stream():
+            async for line in lines:
+                yield json.dumps(line) + "\n"
+
+        return StreamingResponse(
+            stream(),
+            media_type="application/x-ndjson",
+            headers={"Cache-Control": "no-cache"},
+        )
+
+    results = [line async for line in lines]
+    summary = results.pop()
+    return {"results": sorted(results, key=lambda r: r["index"]), **summary}
+
+
+@app.post("/solve/jobs", status_code=202)
+def create_solve_job(req: SolveRequest):
+    """Queue a solve on the worker pool and return its job id right away"""
+    try:
+        job = get_pool().submit(req.model_dump())
+    except QueueFull as e:
+        raise HTTPException(
+            status_code=429,
+            detail="Solver queue is full, retry later",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    return job.to_dict()
+
+
+@app.get("/solve/jobs/{job_id}")
+def get_solve_job(job_id: str):
+    job = get_pool().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return job.to_dict()
+
+
+@app.delete("/solve/jobs/{job_id}")
+def cancel_solve_job(job_id: str):
+    job = get_pool().cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return job.to_dict()
@@ -0,0 +1,286 @@
+"""Per-phase timers and Prometheus metrics for the solver service.
+
+Solves time their phases with PhaseTimer and return the timings, model size
+and search stats in `meta`, so results computed in worker processes carry
+them back too. The API process feeds every result it hands out to
+observe_result(), which updates the histograms and counters rendered by
+GET /metrics in the Prometheus text format (no client library needed).
+"""
+
+import contextvars
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from starlette.routing import Match
+
+# Where profiled requests also write their binary cProfile dump, if set
+SOLVER_PROFILE_DIR = os.getenv("SOLVER_PROFILE_DIR")
+
+# Histogram buckets, in seconds
+LATENCY_BUCKETS = (
+    0.001,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+    180.0,
+)
+PROFILE_LINES = 30
+
+# perf_counter() of when the current HTTP request arrived, set by the middleware
+request_started: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar(
+    "request_started", default=None
+)
+
+
+class PhaseTimer:
+    """Accumulates wall time per named phase of one request and, when
+    `profile` is set, a cProfile of the phases entered with profiled=True."""
+
+    def __init__(self, profile: bool = False):
+        self.start = time.perf_counter()
+        self.ms: Dict[str, float] = {}
+        self.profiler = cProfile.Profile() if profile else None
+
+    @contextmanager
+    def phase(self, name: str, profiled: bool = False) -> Iterator[None]:
+        profiler = self.profiler if profiled else None
+        start = time.perf_counter()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            self.add(name, (time.perf_counter() - start) * 1000)
+
+    def add(self, name: str, ms: float) -> None:
+        self.ms[name] = self.ms.get(name, 0.0) + ms
+
+    def meta(self) -> Dict[str, float]:
+        timings = {f"{name}_ms": round(ms, 2) for name, ms in self.ms.items()}
+        timings["total_ms"] = round((time.perf_counter() - self.start) * 1000, 2)
+        return timings
+
+    def profile(self) -> Optional[Dict[str, Any]]:
+        """`{top, dump}`: the heaviest profiled calls by cumulative time, and
+        the binary dump written to SOLVER_PROFILE_DIR if set"""
+        if self.profiler is None:
+            return None
+        text = io.StringIO()
+        pstats.Stats(self.profiler, stream=text).sort_stats("cumulative").print_stats(
+            PROFILE_LINES
+        )
+        report: Dict[str, Any] = {"top": text.getvalue(), "dump": None}
+        if SOLVER_PROFILE_DIR:
+            path = (
+                Path(SOLVER_PROFILE_DIR) / f"build-{os.getpid()}-{time.time_ns()}.prof"
+            )
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self.profiler.dump_stats(str(path))
+            report["dump"] = path.name
+        return report
+
+    def report(
+        self, meta: Dict[str, Any], model: Optional[Any] = None
+    ) -> Dict[str, Any]:
+        """`meta` plus timings, the model's size stats and the profile, if any"""
+        meta["timings"] = self.meta()
+        if model is not None:
+            meta["model"] = model.stats()
+        profile = self.profile()
+        if profile is not None:
+            meta["profile"] = profile
+        return meta
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...]) -> str:
+    if not names:
+        return ""
+    escaped = (
+        str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        for v in values
+    )
+    return "{" + ",".join(f'{n}="{v}"' for n, v in zip(names, escaped)) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name, self.help, self.labels = name, help, labels
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *values: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[values] = self._values.get(values, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            lines += [
+                f"{self.name}{_labels(self.labels, k)} {v:g}"
+                for k, v in sorted(self._values.items())
+            ]
+        return lines
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = LATENCY_BUCKETS,
+    ):
+        self.name, self.help, self.labels, self.buckets = name, help, labels, buckets
+        # bucket counts, then sum and count
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *values: str) -> None:
+        with self._lock:
+            series = self._values.setdefault(values, [0.0] * (len(self.buckets) + 2))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._values.items()):
+                for bound, count in zip(self.buckets, series):
+                    lines.append(
+                        f"{self.name}_bucket{_labels(self.labels + ('le',), key + (f'{bound:g}',))} {count:g}"
+                    )
+                lines.append(
+                    f"{self.name}_bucket{_labels(self.labels + ('le',), key + ('+Inf',))} {series[-1]:g}"
+                )
+                lines.append(
+                    f"{self.name}_sum{_labels(self.labels, key)} {series[-2]:g}"
+                )
+                lines.append(
+                    f"{self.name}_count{_labels(self.labels, key)} {series[-1]:g}"
+                )
+        return lines
+
+
+class Gauge:
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name, self.help, self.labels = name, help, labels
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def set(self, value: float, *values: str) -> None:
+        with self._lock:
+            self._values[values] = value
+
+    def add(self, amount: float, *values: str) -> None:
+        with self._lock:
+            self._values[values] = self._values.get(values, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        with self._lock:
+            lines += [
+                f"{self.name}{_labels(self.labels, k)} {v:g}"
+                for k, v in sorted(self._values.items())
+            ]
+        return lines
+
+
+request_seconds = Histogram(
+    "solver_request_seconds", "HTTP request latency", ("endpoint",)
+)
+phase_seconds = Histogram(
+    "solver_phase_seconds", "Time spent per solve phase", ("phase",)
+)
+results_total = Counter(
+    "solver_results_total",
+    "Results handed out, by status and engine",
+    ("endpoint", "status", "engine"),
+)
+inflight = Gauge("solver_inflight_requests", "Requests being served", ("endpoint",))
+# Refreshed on every scrape
+state = Gauge("solver_state", "Queue, worker and cache state at scrape time", ("name",))
+
+REGISTRY = [request_seconds, phase_seconds, results_total, inflight, state]
+
+
+def observe_result(endpoint: str, result: Dict[str, Any]) -> None:
+    """Count a result and record its phase timings; a cached result only
+    records the time spent validating its request"""
+    meta = result.get("meta") or {}
+    results_total.inc(
+        endpoint, str(result.get("status", "ok")), str(meta.get("engine") or "none")
+    )
+    for key, ms in (meta.get("timings") or {}).items():
+        if (
+            key == "total_ms"
+            or not key.endswith("_ms")
+            or (meta.get("cached") and key != "validate_ms")
+        ):
+            continue
+        phase_seconds.observe(ms / 1000, key[:-3])
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing each HTTP request until its last body chunk is
+    sent (so streamed responses count in full) and tracking requests in
+    flight. Requests are labelled by route template, so job ids and catalog
+    ids do not each make a series of their own."""
+
+    def __init__(self, app, routes: List[Any]):
+        self.app = app
+        self.routes = routes
+
+    def endpoint(self, scope) -> str:
+        for route in self.routes:
+            if route.matches(scope)[0] == Match.FULL:
+                return getattr(route, "path", scope["path"])
+        return "unmatched"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        start = time.perf_counter()
+        token = request_started.set(start)
+        endpoint = self.endpoint(scope)
+        inflight.add(1, endpoint)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            inflight.add(-1, endpoint)
+            request_seconds.observe(time.perf_counter() - start, endpoint)
+            request_started.reset(token)
+
+
+def validate_ms() -> Optional[float]:
+    """Time from the request's arrival to its handler: body read and validation"""
+    started = request_started.get()
+    return None if started is None else round((time.perf_counter() - started) * 1000, 2)
+
+
+def render(extra: Dict[str, float]) -> str:
+    """All metrics in the Prometheus text format; `extra` refreshes solver_state"""
+    for name, value in extra.items():
+        state.set(value, name)
+    return "\n".join(line for metric in REGISTRY for line in metric.render()) + "\n"
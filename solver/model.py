@@ -0,0 +1,455 @@
+"""Matrix-based MIP construction for the VeganFlemme optimizer.
+
+Recipes are packed once into dense NumPy arrays (nutrients, time, cost) and the
+whole model is emitted as one sparse constraint matrix. OR-Tools loads it in a
+single call, so build time no longer scales with the number of Python
+expression objects. The same arrays are the model description every engine in
+engines.py solves.
+"""
+
+import time
+from dataclasses import dataclass, replace
+from functools import cached_property
+from operator import attrgetter
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+import scipy.sparse as sp
+from ortools.linear_solver import linear_solver_pb2
+from ortools.linear_solver.python import model_builder_helper as mbh
+
+SLOTS = ["breakfast", "lunch", "dinner", "snack"]
+N_KEYS = [
+    "energy_kcal",
+    "protein_g",
+    "carbs_g",
+    "fat_g",
+    "fiber_g",
+    "b12_ug",
+    "iron_mg",
+    "calcium_mg",
+    "zinc_mg",
+    "iodine_ug",
+    "selenium_ug",
+    "vitamin_d_ug",
+    "ala_g",
+]
+
+BIG = 2.0  # default max portions of a recipe in one slot
+BAND_LOW = 0.85
+BAND_HIGH = 1.15
+
+
+@dataclass
+class RecipeMatrix:
+    """Column-oriented view of a recipe pool (one row per recipe)."""
+
+    ids: List[str]
+    nutrients: np.ndarray  # (n, len(N_KEYS))
+    time_min: np.ndarray  # (n,)
+    cost_eur: np.ndarray  # (n,)
+    eligible: np.ndarray  # (n, len(SLOTS)) bool, recipe may fill that slot
+    portion_min: np.ndarray  # (n, len(SLOTS)) servings when picked
+    portion_max: np.ndarray  # (n, len(SLOTS))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def take(self, rows: np.ndarray) -> "RecipeMatrix":
+        """Sub-matrix with the given row indices, in that order."""
+        return RecipeMatrix(
+            ids=[self.ids[i] for i in rows.tolist()],
+            nutrients=self.nutrients[rows],
+            time_min=self.time_min[rows],
+            cost_eur=self.cost_eur[rows],
+            eligible=self.eligible[rows],
+            portion_min=self.portion_min[rows],
+            portion_max=self.portion_max[rows],
+        )
+
+
+def pack_recipes(recipes: Sequence) -> RecipeMatrix:
+    """Pack Recipe objects into a RecipeMatrix, reading each attribute once."""
+    get_nutrients = attrgetter(*N_KEYS)
+    n = len(recipes)
+    slot_index = {slot: j for j, slot in enumerate(SLOTS)}
+    eligible = np.ones((n, len(SLOTS)), dtype=bool)
+    portion_min = np.zeros((n, len(SLOTS)))
+    portion_max = np.full((n, len(SLOTS)), BIG)
+    for i, r in enumerate(recipes):
+        if getattr(r, "slots", None) is not None:
+            eligible[i] = False
+            eligible[i, [slot_index[slot] for slot in r.slots]] = True
+        for slot, bounds in (getattr(r, "portions", None) or {}).items():
+            portion_min[i, slot_index[slot]] = bounds.min
+            portion_max[i, slot_index[slot]] = bounds.max
+    return RecipeMatrix(
+        ids=[r.id for r in recipes],
+        nutrients=np.array(
+            [get_nutrients(r.nutrients) for r in recipes], dtype=np.float64
+        ).reshape(n, len(N_KEYS)),
+        time_min=np.array([r.time_min for r in recipes], dtype=np.float64),
+        cost_eur=np.array([r.cost_eur for r in recipes], dtype=np.float64),
+        eligible=eligible,
+        portion_min=portion_min,
+        portion_max=portion_max,
+    )
+
+
+def target_vector(targets) -> np.ndarray:
+    """Nutrient targets as an array in N_KEYS order, clipped at zero."""
+    return np.maximum(0.0, np.array(attrgetter(*N_KEYS)(targets), dtype=np.float64))
+
+
+@dataclass
+class PlanModel:
+    """A built model plus the column layout needed to read a plan back.
+
+    The linear program is kept as arrays: minimize objective @ x + offset
+    subject to row_lower <= constraints @ x <= row_upper, lower <= x <= upper,
+    x integer where `integer` is set.
+    """
+
+    lower: np.ndarray
+    upper: np.ndarray
+    objective: np.ndarray
+    offset: float
+    constraints: sp.csr_matrix
+    row_lower: np.ndarray
+    row_upper: np.ndarray
+    integer: np.ndarray  # (num_cols,) bool
+    days: int
+    # One entry per (day, slot, recipe) candidate cell
+    cell_day: np.ndarray
+    cell_slot: np.ndarray
+    cell_recipe: np.ndarray
+    y_cols: np.ndarray  # pick recipe
+    z_cols: np.ndarray  # portions
+    pins: np.ndarray  # (days, len(SLOTS)) recipe index fixed in that slot, -1 when free
+    pin_servings: np.ndarray  # (days, len(SLOTS))
+    band_low: np.ndarray  # (days, len(N_KEYS)) daily band left for the free slots
+    band_high: np.ndarray
+    vars_removed: int  # y/z variables not created because their slot is pinned
+    build_ms: float
+
+    @property
+    def num_cols(self) -> int:
+        return self.lower.size
+
+    def stats(self) -> Dict[str, int]:
+        """Model size, as reported in response meta"""
+        return {
+            "variables": self.num_cols,
+            "integer_variables": int(self.integer.sum()),
+            "constraints": self.constraints.shape[0],
+            "nonzeros": int(self.constraints.nnz),
+        }
+
+    @cached_property
+    def proto(self) -> linear_solver_pb2.MPModelProto:
+        """The model as an MPModelProto, for the MPSolver engines"""
+        helper = mbh.ModelBuilderHelper()
+        helper.fill_model_from_sparse_data(
+            self.lower,
+            self.upper,
+            self.objective,
+            self.row_lower,
+            self.row_upper,
+            self.constraints,
+        )
+        helper.set_objective_offset(float(self.offset))
+        for col in np.flatnonzero(self.integer).tolist():
+            helper.set_var_integrality(col, True)
+        return mbh.to_mpmodel_proto(helper)
+
+
+class _Rows:
+    """Accumulates constraint rows as COO triplets."""
+
+    def __init__(self):
+        self.rows: List[np.ndarray] = []
+        self.cols: List[np.ndarray] = []
+        self.vals: List[np.ndarray] = []
+        self.lb: List[np.ndarray] = []
+        self.ub: List[np.ndarray] = []
+        self.count = 0
+
+    def add(self, count: int, terms, lb, ub) -> None:
+        """Add `count` rows; terms are (local_row, col, coeff) arrays."""
+        for local_row, col, coeff in terms:
+            self.rows.append(self.count + np.asarray(local_row))
+            self.cols.append(np.asarray(col))
+            self.vals.append(
+                np.broadcast_to(np.asarray(coeff, dtype=np.float64), np.shape(col))
+            )
+        self.lb.append(np.broadcast_to(np.asarray(lb, dtype=np.float64), (count,)))
+        self.ub.append(np.broadcast_to(np.asarray(ub, dtype=np.float64), (count,)))
+        self.count += count
+
+    def matrix(self, num_cols: int) -> sp.csr_matrix:
+        return sp.csr_matrix(
+            (
+                np.concatenate(self.vals),
+                (np.concatenate(self.rows), np.concatenate(self.cols)),
+            ),
+            shape=(self.count, num_cols),
+        )
+
+
+def pinned_servings(matrix: RecipeMatrix, pins: np.ndarray) -> np.ndarray:
+    """Servings of each pinned slot: one, clipped to the slot's portion bounds"""
+    pin_day, pin_slot = np.nonzero(pins >= 0)
+    pin_recipe = pins[pin_day, pin_slot]
+    servings = np.zeros(pins.shape)
+    servings[pin_day, pin_slot] = np.clip(
+        1.0,
+        matrix.portion_min[pin_recipe, pin_slot],
+        matrix.portion_max[pin_recipe, pin_slot],
+    )
+    return servings
+
+
+def build_model(
+    matrix: RecipeMatrix,
+    days: int,
+    targets: np.ndarray,
+    weights: Dict[str, float],
+    max_repeat: Union[int, np.ndarray],
+    pins: Optional[np.ndarray] = None,
+    pin_servings: Optional[np.ndarray] = None,
+    banned: Optional[np.ndarray] = None,
+) -> PlanModel:
+    """Build the weekly MIP for `matrix` in bulk.
+
+    Variables exist only for (free slot, recipe) pairs the recipe is eligible
+    for, with that pair's portion bounds. Slots pinned in `pins` are fixed at
+    `pin_servings` (default: one serving clipped to the portion bounds) of
+    their recipe: no variables are created for them and their nutrients, time
+    and cost are folded into the day's bounds and the objective offset.
+    `banned` rows (day, slot, recipe) remove single candidates; recipe -1
+    keeps that free slot empty. `max_repeat` is a scalar or one budget per
+    recipe.
+    """
+    start = time.perf_counter()
+    n = len(matrix)
+    S = len(SLOTS)
+    K = len(N_KEYS)
+    if pins is None:
+        pins = np.full((days, S), -1)
+
+    pin_day, pin_slot = np.nonzero(pins >= 0)
+    pin_recipe = pins[pin_day, pin_slot]
+    pinned_count = np.bincount(pin_recipe, minlength=n)
+    repeat_left = np.maximum(0, max_repeat - pinned_count)
+
+    # One candidate cell per eligible (free slot, recipe) pair, for recipes
+    # the pins leave some repeat budget to
+    free_day, free_slot = np.nonzero(pins < 0)
+    cell_free, cell_recipe = np.nonzero(
+        matrix.eligible[:, free_slot].T & (repeat_left > 0)
+    )
+    if banned is not None and len(banned):
+        slot_key = free_day[cell_free] * S + free_slot[cell_free]
+        banned_key = banned[:, 0] * S + banned[:, 1]
+        whole = banned[:, 2] < 0
+        keep = ~np.isin(slot_key, banned_key[whole])
+        keep &= ~np.isin(
+            slot_key * n + cell_recipe, banned_key[~whole] * n + banned[~whole, 2]
+        )
+        cell_free, cell_recipe = cell_free[keep], cell_recipe[keep]
+    cell_day = free_day[cell_free]
+    cell_slot = free_slot[cell_free]
+    cell_min = matrix.portion_min[cell_recipe, cell_slot]
+    cell_max = matrix.portion_max[cell_recipe, cell_slot]
+    m = cell_day.size
+
+    if pin_servings is None:
+        pin_servings = pinned_servings(matrix, pins)
+    fixed = np.zeros((days, K))
+    np.add.at(
+        fixed,
+        pin_day,
+        matrix.nutrients[pin_recipe] * pin_servings[pin_day, pin_slot, None],
+    )
+
+    # Column layout: [y cells | z cells | dev_pos (d,k) | dev_neg (d,k)]
+    y_cols = np.arange(m)
+    z_cols = m + y_cols
+    dev_pos = 2 * m + np.arange(days * K)
+    dev_neg = dev_pos + days * K
+    num_cols = 2 * m + 2 * days * K
+
+    alpha = float(weights.get("nutri", 1.0))
+    beta = float(weights.get("time", 0.2))
+    gamma = float(weights.get("cost", 0.2))
+
+    lower = np.zeros(num_cols)
+    upper = np.concatenate([np.ones(m), cell_max, np.full(2 * days * K, np.inf)])
+    objective = np.zeros(num_cols)
+    # Mean time / cost over the horizon are linear on y
+    objective[y_cols] = (
+        beta * matrix.time_min[cell_recipe] + gamma * matrix.cost_eur[cell_recipe]
+    ) / max(1, days)
+    objective[dev_pos] = alpha
+    objective[dev_neg] = alpha
+    offset = (
+        beta * matrix.time_min[pin_recipe].sum()
+        + gamma * matrix.cost_eur[pin_recipe].sum()
+    ) / max(1, days)
+
+    rows = _Rows()
+
+    # Choose at most 1 recipe per free slot
+    rows.add(free_day.size, [(cell_free, y_cols, 1.0)], -np.inf, 1.0)
+
+    # Link z <= max * y
+    local = np.arange(m)
+    rows.add(m, [(local, z_cols, 1.0), (local, y_cols, -cell_max)], -np.inf, 0.0)
+
+    # and z >= min * y where a minimum portion is set
+    has_min = np.flatnonzero(cell_min > 0)
+    local = np.arange(has_min.size)
+    rows.add(
+        has_min.size,
+        [(local, z_cols[has_min], 1.0), (local, y_cols[has_min], -cell_min[has_min])],
+        0.0,
+        np.inf,
+    )
+
+    # Daily nutrient totals sum_{s,i} z[d,s,i] * nutrient_k[i], kept inside the
+    # 0.85-1.15 target band up to the deviation variables
+    coeffs = matrix.nutrients[cell_recipe]
+    cell_idx, k_idx = np.nonzero(coeffs)
+    total_rows = cell_day[cell_idx] * K + k_idx
+    total_terms = (total_rows, z_cols[cell_idx], coeffs[cell_idx, k_idx])
+    dk = np.arange(days * K)
+    high = BAND_HIGH * targets - fixed
+    low = BAND_LOW * targets - fixed
+    rows.add(days * K, [total_terms, (dk, dev_pos, -1.0)], -np.inf, high.ravel())
+    rows.add(days * K, [total_terms, (dk, dev_neg, 1.0)], low.ravel(), np.inf)
+
+    # Max repeat of a recipe across the horizon; pins use up part of the budget
+    rows.add(n, [(cell_recipe, y_cols, 1.0)], -np.inf, repeat_left)
+
+    integer = np.zeros(num_cols, dtype=bool)
+    integer[y_cols] = True
+
+    return PlanModel(
+        lower=lower,
+        upper=upper,
+        objective=objective,
+        offset=float(offset),
+        constraints=rows.matrix(num_cols),
+        row_lower=np.concatenate(rows.lb),
+        row_upper=np.concatenate(rows.ub),
+        integer=integer,
+        days=days,
+        cell_day=cell_day,
+        cell_slot=cell_slot,
+        cell_recipe=cell_recipe,
+        y_cols=y_cols,
+        z_cols=z_cols,
+        pins=pins,
+        pin_servings=pin_servings,
+        band_low=low,
+        band_high=high,
+        vars_removed=2 * int(matrix.eligible[:, pin_slot].sum()),
+        build_ms=(time.perf_counter() - start) * 1000,
+    )
+
+
+def empty_day() -> Dict[str, Dict]:
+    return {s: {"recipeId": None, "servings": 0.0} for s in SLOTS}
+
+
+def format_plan(
+    matrix: RecipeMatrix, picks: np.ndarray, servings: np.ndarray
+) -> List[Dict[str, Dict]]:
+    """Per-day `{recipeId, servings}` plan from (days, slots) recipe indices (-1 empty) and servings."""
+    plan = [empty_day() for _ in range(len(picks))]
+    days, slots = np.nonzero(picks >= 0)
+    portions = np.round(servings[days, slots], 2)
+    for d, s, r, p in zip(
+        days.tolist(), slots.tolist(), picks[days, slots].tolist(), portions.tolist()
+    ):
+        plan[d][SLOTS[s]] = {"recipeId": matrix.ids[r], "servings": p}
+    return plan
+
+
+def solution_picks(model: PlanModel, values: np.ndarray):
+    """(picks, servings) arrays of a solution vector, pinned slots included."""
+    picks = model.pins.copy()
+    servings = model.pin_servings.copy()
+    if values.size:
+        picked = np.flatnonzero(values[model.y_cols] > 0.5)
+        day, slot = model.cell_day[picked], model.cell_slot[picked]
+        picks[day, slot] = model.cell_recipe[picked]
+        servings[day, slot] = values[model.z_cols[picked]]
+    return picks, servings
+
+
+def extract_plan(
+    model: PlanModel, matrix: RecipeMatrix, values: np.ndarray
+) -> List[Dict[str, Dict]]:
+    """Turn a flat solution vector into the per-day `{recipeId, servings}` plan."""
+    return format_plan(matrix, *solution_picks(model, values))
+
+
+def plan_values(
+    model: PlanModel, matrix: RecipeMatrix, picks: np.ndarray, servings: np.ndarray
+) -> np.ndarray:
+    """Solution vector for a plan given as (days, slots) picks and servings.
+
+    Pinned slots are already part of the model and are skipped; picks with no
+    matching candidate cell (e.g. pruned by the prefilter) are left empty.
+    """
+    n = len(matrix)
+    S = len(SLOTS)
+    values = np.zeros(model.num_cols)
+    day, slot = np.nonzero((picks >= 0) & (model.pins < 0))
+    # Cells are laid out by (day, slot) then recipe, so their keys are sorted
+    cell_keys = (model.cell_day * S + model.cell_slot) * n + model.cell_recipe
+    wanted = (day * S + slot) * n + picks[day, slot]
+    found = np.searchsorted(cell_keys, wanted)
+    hit = found < cell_keys.size
+    hit[hit] = cell_keys[found[hit]] == wanted[hit]
+    cells = found[hit]
+    values[model.y_cols[cells]] = 1.0
+    values[model.z_cols[cells]] = servings[day[hit], slot[hit]]
+
+    totals = np.zeros_like(model.band_low)
+    np.add.at(
+        totals,
+        model.cell_day[cells],
+        matrix.nutrients[model.cell_recipe[cells]] * values[model.z_cols[cells], None],
+    )
+    m = model.y_cols.size
+    dev_pos = np.maximum(0.0, totals - model.band_high).ravel()
+    values[2 * m : 2 * m + dev_pos.size] = dev_pos
+    values[2 * m + dev_pos.size :] = np.maximum(0.0, model.band_low - totals).ravel()
+    return values
+
+
+def exclude_assignment(
+    model: PlanModel, values: np.ndarray, min_distance: int
+) -> PlanModel:
+    """`model` plus a no-good cut: the pick variables y must differ from their
+    values in `values` in at least `min_distance` places (Hamming distance).
+
+    With P the cells picked in `values`, the cut is
+    sum_{j not in P} y_j - sum_{j in P} y_j >= min_distance - |P|.
+    """
+    picked = values[model.y_cols] > 0.5
+    row = sp.csr_matrix(
+        (
+            np.where(picked, -1.0, 1.0),
+            (np.zeros(model.y_cols.size, dtype=int), model.y_cols),
+        ),
+        shape=(1, model.num_cols),
+    )
+    return replace(
+        model,
+        constraints=sp.vstack([model.constraints, row], format="csr"),
+        row_lower=np.append(model.row_lower, min_distance - int(picked.sum())),
+        row_upper=np.append(model.row_upper, np.inf),
+    )
@@ -0,0 +1,946 @@
+"""Solve pipeline shared by the HTTP endpoints and the worker processes."""
+
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from cache import request_key, solution_cache
+from catalog import Catalog, catalogs
+from decompose import SOLVER_BLOCK_DAYS, solve_rolling
+from engines import WARM_START_ENGINES, SolveControl, resolve_engine, solve_model
+from heuristic import plan_heuristic
+from household import (
+    build_household_model,
+    extract_household_plan,
+    fit_portions,
+    household_values,
+    member_plan,
+    member_shares,
+)
+from metrics import PhaseTimer
+from model import (
+    BAND_HIGH,
+    BAND_LOW,
+    N_KEYS,
+    SLOTS,
+    PlanModel,
+    RecipeMatrix,
+    build_model,
+    exclude_assignment,
+    extract_plan,
+    format_plan,
+    pack_recipes,
+    plan_values,
+    solution_picks,
+    target_vector,
+)
+from prefilter import reduce_pool
+from schemas import (
+    HouseholdRequest,
+    PlannedMeal,
+    ResolveRequest,
+    SolveRequest,
+    SubstitutesRequest,
+)
+from scoring import band_deviation, rank_substitutes
+
+# 0 (the default) disables the top-K stage unless a request asks for it
+SOLVER_TOP_K_PER_SLOT = int(os.getenv("SOLVER_TOP_K_PER_SLOT", "0"))
+# Engine for anytime refinement when the request names none; CBC ignores warm starts
+SOLVER_ANYTIME_ENGINE = os.getenv("SOLVER_ANYTIME_ENGINE", "scip")
+# Engine for /solve/stream when the request names none; CP-SAT is the only one
+# reporting incumbents while it searches
+SOLVER_STREAM_ENGINE = os.getenv("SOLVER_STREAM_ENGINE", "cp-sat")
+# MIP time cap for /resolve, on top of the warm-start local search
+SOLVER_RESOLVE_TIME_SEC = float(os.getenv("SOLVER_RESOLVE_TIME_SEC", "0.3"))
+# MIP time cap for each alternative plan, on top of the main solve
+SOLVER_ALTERNATIVE_TIME_SEC = float(os.getenv("SOLVER_ALTERNATIVE_TIME_SEC", "2"))
+
+
+def resolve_catalog(req: SolveRequest) -> Catalog:
+    try:
+        return catalogs.get(req.catalog_id, req.catalog_version)
+    except KeyError as e:
+        raise ValueError(e.args[0])
+
+
+def resolve_pool(req: SolveRequest, catalog: Optional[Catalog] = None) -> RecipeMatrix:
+    """Packed candidate pool after include/exclude ids and dislikes; `catalog`,
+    when given, stands in for the request's recipes or catalog_id"""
+    excluded = set(req.dislikes) | set(req.exclude_ids)
+    if catalog is None and req.catalog_id:
+        catalog = resolve_catalog(req)
+    if catalog is not None:
+        return catalog.select(req.include_ids, sorted(excluded))
+
+    included = None if req.include_ids is None else set(req.include_ids)
+    R = [
+        r
+        for r in req.recipes
+        if r.id not in excluded and (included is None or r.id in included)
+    ]
+    return pack_recipes(R)
+
+
+def resolve_pins(req: SolveRequest, matrix: RecipeMatrix) -> np.ndarray:
+    """(days, slots) matrix of pinned recipe indices from day_templates, -1 when free"""
+    index = {rid: i for i, rid in enumerate(matrix.ids)}
+    pins = np.full((len(req.day_templates), len(SLOTS)), -1)
+    for d, template in enumerate(req.day_templates):
+        for s, slot in enumerate(SLOTS):
+            rid = getattr(template, slot)
+            if rid is None:
+                continue
+            if rid not in index:
+                raise ValueError(
+                    f"Pinned recipe '{rid}' (day {d}, {slot}) is not in the recipe pool"
+                )
+            pins[d, s] = index[rid]
+    return pins
+
+
+def solve_request(
+    req: SolveRequest,
+    control: Optional[SolveControl] = None,
+    on_incumbent: Optional[Callable[[Dict[str, Any]], None]] = None,
+    catalog: Optional[Catalog] = None,
+) -> Dict[str, Any]:
+    """Filter the pool, build the MIP and return the `{status, plan, meta}` response.
+
+    Anytime mode, and engines in WARM_START_ENGINES in any mode, start the
+    search from the heuristic plan and return that plan ("Heuristic") when
+    the engine ends above it. on_incumbent receives `{plan, objective, bound,
+    source}` for the heuristic plan and each strictly better solution the
+    engine reports. `catalog` is an
+    already packed recipe pool, as in resolve_pool(). meta["timings"] has the
+    wall time of each phase; with req.profile, meta["profile"] has a cProfile
+    of the phases before the search (pool, prefilter, build).
+    """
+    if (
+        not (req.recipes or req.catalog_id or catalog is not None)
+        or not req.day_templates
+    ):
+        raise ValueError("recipes (or catalog_id) and day_templates required")
+
+    timer = PhaseTimer(req.profile)
+    with timer.phase("pool", profiled=True):
+        matrix = resolve_pool(req, catalog)
+    if len(matrix) == 0:
+        return {
+            "status": "EMPTY_POOL",
+            "plan": [
+                {"breakfast": None, "lunch": None, "dinner": None, "snack": None}
+                for _ in range(len(req.day_templates))
+            ],
+        }
+
+    days = len(req.day_templates)
+    targets = target_vector(req.targets)
+    pool_before = len(matrix)
+    if req.mode == "fast":
+        pins = resolve_pins(req, matrix)
+        with timer.phase("heuristic", profiled=True):
+            heuristic = plan_heuristic(
+                matrix, days, targets, req.weights, req.max_repeat, pins
+            )
+        with timer.phase("extract"):
+            plan = format_plan(matrix, heuristic.picks, heuristic.servings)
+        if on_incumbent is not None:
+            on_incumbent(
+                {
+                    "plan": plan,
+                    "objective": heuristic.objective,
+                    "bound": None,
+                    "source": "heuristic",
+                }
+            )
+        result = {
+            "status": "Heuristic",
+            "plan": plan,
+            "meta": {
+                "mode": req.mode,
+                "objective": round(heuristic.objective, 4),
+                "heuristic_ms": round(heuristic.elapsed_ms, 2),
+                "moves": heuristic.moves,
+                "pool_before": pool_before,
+                "pinned_slots": int((pins >= 0).sum()),
+            },
+        }
+        if req.num_alternatives:
+            with timer.phase("alternatives"):
+                result["alternatives"] = solve_alternatives(
+                    matrix,
+                    targets,
+                    req,
+                    pins,
+                    heuristic.picks,
+                    heuristic.servings,
+                    heuristic.objective,
+                )
+            result["meta"]["alternatives_ms"] = round(timer.ms["alternatives"], 2)
+        timer.report(result["meta"])
+        return result
+
+    reduced = None
+    if req.prefilter:
+        with timer.phase("prefilter", profiled=True):
+            pinned = {
+                rid for t in req.day_templates for rid in t.model_dump().values() if rid
+            }
+            top_k = req.top_k_per_slot or SOLVER_TOP_K_PER_SLOT or None
+            matrix, reduced = reduce_pool(
+                matrix, targets, req.weights, days, req.max_repeat, top_k, pinned
+            )
+
+    pins = resolve_pins(req, matrix)
+    if req.decompose if req.decompose is not None else days > SOLVER_BLOCK_DAYS:
+        return solve_decomposed(
+            req,
+            matrix,
+            targets,
+            pins,
+            pool_before,
+            control,
+            on_incumbent,
+            timer,
+            reduced,
+        )
+
+    with timer.phase("build", profiled=True):
+        model = build_model(matrix, days, targets, req.weights, req.max_repeat, pins)
+    heuristic = hint = None
+    engine = req.engine
+    if req.mode == "anytime":
+        engine = engine or SOLVER_ANYTIME_ENGINE
+    best_objective = np.inf
+    if req.mode == "anytime" or resolve_engine(engine) in WARM_START_ENGINES:
+        with timer.phase("heuristic"):
+            heuristic = plan_heuristic(
+                matrix, days, targets, req.weights, req.max_repeat, pins
+            )
+            hint = plan_values(model, matrix, heuristic.picks, heuristic.servings)
+        if on_incumbent is not None:
+            best_objective = heuristic.objective
+            plan = format_plan(matrix, heuristic.picks, heuristic.servings)
+            on_incumbent(
+                {
+                    "plan": plan,
+                    "objective": heuristic.objective,
+                    "bound": None,
+                    "source": "heuristic",
+                }
+            )
+
+    control = control or SolveControl()
+    if on_incumbent is not None:
+
+        def report(
+            values: np.ndarray, objective: float, bound: Optional[float]
+        ) -> None:
+            nonlocal best_objective
+            if objective < best_objective - 1e-6:
+                best_objective = objective
+                on_incumbent(
+                    {
+                        "plan": extract_plan(model, matrix, values),
+                        "objective": objective,
+                        "bound": bound,
+                        "source": "solver",
+                    }
+                )
+
+        control.on_solution = report
+    with timer.phase("solve"):
+        outcome = solve_model(
+            model, req.time_limit_sec, engine, req.search_workers, hint, control
+        )
+    with timer.phase("extract"):
+        status, plan = outcome.status, extract_plan(model, matrix, outcome.values)
+
+    meta = {
+        "mode": req.mode,
+        "build_ms": round(model.build_ms, 2),
+        **outcome.meta(),
+        "pool_before": pool_before,
+        "pool_after": len(matrix),
+        "prefilter": reduced,
+        "pinned_slots": int((pins >= 0).sum()),
+        "vars_removed": model.vars_removed,
+    }
+    values, objective = outcome.values, outcome.objective
+    if heuristic is not None:
+        meta["heuristic_objective"] = round(heuristic.objective, 4)
+        meta["heuristic_ms"] = round(heuristic.elapsed_ms, 2)
+        # Never hand back less than the warm start
+        if outcome.objective is None or outcome.objective > heuristic.objective + 1e-6:
+            status, plan = "Heuristic", format_plan(
+                matrix, heuristic.picks, heuristic.servings
+            )
+            values, objective = hint, heuristic.objective
+            meta["solver_objective"] = meta["objective"]
+            meta["objective"] = round(objective, 4)
+    result = {"status": status, "plan": plan, "meta": meta}
+    if req.num_alternatives and values.size and not control.stopped:
+        with timer.phase("alternatives"):
+            picks, servings = solution_picks(model, values)
+            result["alternatives"] = solve_alternatives(
+                matrix,
+                targets,
+                req,
+                pins,
+                picks,
+                servings,
+                objective,
+                model,
+                engine,
+                control,
+            )
+        meta["alternatives_ms"] = round(timer.ms["alternatives"], 2)
+    timer.report(meta, model)
+    return result
+
+
+def solve_decomposed(
+    req: SolveRequest,
+    matrix: RecipeMatrix,
+    targets: np.ndarray,
+    pins: np.ndarray,
+    pool_before: int,
+    control: Optional[SolveControl] = None,
+    on_incumbent: Optional[Callable[[Dict[str, Any]], None]] = None,
+    timer: Optional[PhaseTimer] = None,
+    reduced: Optional[Dict[str, int]] = None,
+) -> Dict[str, Any]:
+    """solve_request() for long horizons: decompose.solve_rolling() over
+    SOLVER_BLOCK_DAYS-day blocks. Anytime mode (and WARM_START_ENGINES)
+    warm-starts every block from the heuristic plan of the whole horizon;
+    only that plan and the final one are reported as incumbents. Block builds are timed within "solve".
+    """
+    days = len(pins)
+    timer = timer or PhaseTimer(req.profile)
+    heuristic = None
+    engine = req.engine
+    if req.mode == "anytime":
+        engine = engine or SOLVER_ANYTIME_ENGINE
+    if req.mode == "anytime" or resolve_engine(engine) in WARM_START_ENGINES:
+        with timer.phase("heuristic"):
+            heuristic = plan_heuristic(
+                matrix, days, targets, req.weights, req.max_repeat, pins
+            )
+        if on_incumbent is not None:
+            plan = format_plan(matrix, heuristic.picks, heuristic.servings)
+            on_incumbent(
+                {
+                    "plan": plan,
+                    "objective": heuristic.objective,
+                    "bound": None,
+                    "source": "heuristic",
+                }
+            )
+
+    control = control or SolveControl()
+    control.on_solution = None
+    start = None if heuristic is None else (heuristic.picks, heuristic.servings)
+    with timer.phase("solve"):
+        rolling = solve_rolling(
+            matrix,
+            targets,
+            req.weights,
+            req.max_repeat,
+            pins,
+            req.time_limit_sec,
+            engine,
+            req.search_workers,
+            start,
+            control,
+        )
+    outcome = rolling.summary
+    status, picks, servings, objective = (
+        outcome.status,
+        rolling.picks,
+        rolling.servings,
+        outcome.objective,
+    )
+
+    meta = {
+        "mode": req.mode,
+        "build_ms": round(rolling.build_ms, 2),
+        **outcome.meta(),
+        "pool_before": pool_before,
+        "pool_after": len(matrix),
+        "prefilter": reduced,
+        "pinned_slots": int((pins >= 0).sum()),
+        "blocks": rolling.blocks,
+    }
+    if heuristic is not None:
+        meta["heuristic_objective"] = round(heuristic.objective, 4)
+        meta["heuristic_ms"] = round(heuristic.elapsed_ms, 2)
+        if objective is None or objective > heuristic.objective + 1e-6:
+            status, picks, servings, objective = (
+                "Heuristic",
+                heuristic.picks,
+                heuristic.servings,
+                heuristic.objective,
+            )
+            meta["solver_objective"] = meta["objective"]
+            meta["objective"] = round(objective, 4)
+    with timer.phase("extract"):
+        plan = format_plan(matrix, picks, servings)
+    if on_incumbent is not None and status != "Heuristic" and objective is not None:
+        on_incumbent(
+            {
+                "plan": plan,
+                "objective": objective,
+                "bound": outcome.best_bound,
+                "source": "solver",
+            }
+        )
+
+    result = {"status": status, "plan": plan, "meta": meta}
+    if req.num_alternatives and objective is not None and not control.stopped:
+        with timer.phase("alternatives"):
+            result["alternatives"] = solve_alternatives(
+                matrix, targets, req, pins, picks, servings, objective
+            )
+        meta["alternatives_ms"] = round(timer.ms["alternatives"], 2)
+    timer.report(meta)
+    return result
+
+
+def _pick_distance(a: np.ndarray, b: np.ndarray) -> int:
+    """Hamming distance between the y assignments of two (days, slots) pick
+    arrays: a changed meal counts twice, a filled or emptied slot once"""
+    return int(np.where(a != b, (a >= 0).astype(int) + (b >= 0), 0).sum())
+
+
+def solve_alternatives(
+    matrix: RecipeMatrix,
+    targets: np.ndarray,
+    req: SolveRequest,
+    pins: np.ndarray,
+    picks: np.ndarray,
+    servings: np.ndarray,
+    objective: float,
+    model: Optional[PlanModel] = None,
+    engine: Optional[str] = None,
+    control: Optional[SolveControl] = None,
+) -> List[Dict[str, Any]]:
+    """Up to req.num_alternatives further plans, each at least
+    req.alternative_distance picks away from the main plan and every earlier
+    alternative.
+
+    Each round bans the last plan's recipe in a few of its slots and lets the
+    heuristic repair the plan around them. With `model` (the MIP already
+    built), that repair warm-starts a solve of the model plus a no-good cut
+    around every plan found, and the better of the two is kept. Stops early
+    once no distant enough plan turns up.
+    """
+    found = [picks]
+    alternatives = []
+    time_limit = min(req.time_limit_sec, SOLVER_ALTERNATIVE_TIME_SEC)
+    if control is not None:
+        # Incumbents of alternatives are not improvements of the main plan
+        control.on_solution = None
+    values = None if model is None else plan_values(model, matrix, picks, servings)
+    filled_needed = -(-req.alternative_distance // 2)
+    for i in range(req.num_alternatives):
+        last = found[-1]
+        filled = np.argwhere((last >= 0) & (pins < 0))
+        chosen = filled[
+            np.random.default_rng(i).choice(
+                len(filled), min(len(filled), filled_needed), replace=False
+            )
+        ]
+        banned = np.column_stack([chosen, last[chosen[:, 0], chosen[:, 1]]])
+        repair = plan_heuristic(
+            matrix,
+            len(pins),
+            targets,
+            req.weights,
+            req.max_repeat,
+            pins,
+            banned=banned,
+            start_from=(last, servings),
+        )
+        best = None
+        if (
+            min(_pick_distance(repair.picks, earlier) for earlier in found)
+            >= req.alternative_distance
+        ):
+            best = (
+                "Heuristic",
+                repair.picks,
+                repair.servings,
+                repair.objective,
+                repair.elapsed_ms,
+            )
+
+        if model is not None:
+            model = exclude_assignment(model, values, req.alternative_distance)
+            hint = plan_values(model, matrix, repair.picks, repair.servings)
+            outcome = solve_model(
+                model, time_limit, engine, req.search_workers, hint, control
+            )
+            if control is not None and control.stopped:
+                break
+            if outcome.objective is not None and (
+                best is None or outcome.objective < best[3] - 1e-6
+            ):
+                best = (
+                    outcome.status,
+                    *solution_picks(model, outcome.values),
+                    outcome.objective,
+                    repair.elapsed_ms + outcome.solve_ms,
+                )
+        if best is None:
+            break
+
+        status, picks, servings, alt_objective, elapsed_ms = best
+        distance = min(_pick_distance(picks, earlier) for earlier in found)
+        found.append(picks)
+        if model is not None:
+            values = plan_values(model, matrix, picks, servings)
+        alternatives.append(
+            {
+                "status": status,
+                "plan": format_plan(matrix, picks, servings),
+                "objective": round(alt_objective, 4),
+                "objective_gap": round(
+                    (alt_objective - objective) / max(abs(objective), 1e-9), 4
+                ),
+                "distance": distance,
+                "ms": round(elapsed_ms, 2),
+            }
+        )
+    return alternatives
+
+
+def household_request(req: HouseholdRequest) -> Dict[str, Any]:
+    """One joint model for every member: shared recipes, per-member portions.
+
+    Returns the shared plan (each meal with its members' portions) and, under
+    `members`, each member's plan in the /solve format.
+    """
+    if not (req.recipes or req.catalog_id) or not req.day_templates:
+        raise ValueError("recipes (or catalog_id) and day_templates required")
+    if req.mode != "exact":
+        raise ValueError("household plans support mode 'exact' only")
+
+    timer = PhaseTimer(req.profile)
+    with timer.phase("pool", profiled=True):
+        matrix = resolve_pool(req)
+    names = [member.name for member in req.members]
+    days = len(req.day_templates)
+    if len(matrix) == 0:
+        plan = [
+            {
+                slot: {"recipeId": None, "servings": 0.0, "portions": {}}
+                for slot in SLOTS
+            }
+            for _ in range(days)
+        ]
+        return {
+            "status": "EMPTY_POOL",
+            "plan": plan,
+            "members": {name: member_plan(plan, name) for name in names},
+        }
+
+    targets = np.array([target_vector(member.targets) for member in req.members])
+    pool_before = len(matrix)
+    reduced = None
+    if req.prefilter:
+        # Dislikes only skip a member's portion, so every member's picks stay candidates
+        with timer.phase("prefilter", profiled=True):
+            pinned = {
+                rid for t in req.day_templates for rid in t.model_dump().values() if rid
+            }
+            top_k = req.top_k_per_slot or SOLVER_TOP_K_PER_SLOT or None
+            matrix, reduced = reduce_pool(
+                matrix,
+                targets.mean(axis=0),
+                req.weights,
+                days,
+                req.max_repeat,
+                top_k,
+                pinned,
+            )
+
+    ids = np.array(matrix.ids, dtype=object)
+    allowed = np.array(
+        [~np.isin(ids, member.dislikes) for member in req.members]
+    ).reshape(len(names), len(matrix))
+    pins = resolve_pins(req, matrix)
+    with timer.phase("build", profiled=True):
+        model = build_household_model(
+            matrix, days, targets, allowed, req.weights, req.max_repeat, pins
+        )
+
+    # Warm start: the heuristic plans for the household as one eater over the
+    # recipes everyone accepts, with portion bounds narrowed so that splitting
+    # each meal by member_shares() keeps every portion within its own bounds;
+    # each member's portions are then fitted to their own band
+    with timer.phase("heuristic"):
+        share = member_shares(targets)
+        pooled_rows = np.flatnonzero(
+            allowed.all(axis=0) | np.isin(np.arange(len(matrix)), pins[pins >= 0])
+        )
+        pooled = matrix.take(pooled_rows)
+        pooled.portion_min = pooled.portion_min / share.min()
+        pooled.portion_max = pooled.portion_max / share.max()
+        pooled_index = np.full(len(matrix), -1)
+        pooled_index[pooled_rows] = np.arange(len(pooled_rows))
+        pooled_pins = np.where(pins >= 0, pooled_index[np.maximum(pins, 0)], -1)
+        heuristic = plan_heuristic(
+            pooled, days, targets.sum(axis=0), req.weights, req.max_repeat, pooled_pins
+        )
+        picks = np.where(
+            heuristic.picks >= 0, pooled_rows[np.maximum(heuristic.picks, 0)], -1
+        )
+        portions = (
+            share[:, None, None] * heuristic.servings * allowed[:, np.maximum(picks, 0)]
+        )
+        portions = fit_portions(matrix, picks, portions, targets, allowed)
+        hint = household_values(model, matrix, picks, portions)
+    hint_objective = float(model.objective @ hint + model.offset)
+
+    with timer.phase("solve"):
+        outcome = solve_model(
+            model,
+            req.time_limit_sec,
+            req.engine,
+            req.search_workers,
+            hint,
+        )
+    status, values = outcome.status, outcome.values
+    if outcome.objective is None or outcome.objective > hint_objective + 1e-6:
+        status, values = "Heuristic", hint
+    with timer.phase("extract"):
+        plan = extract_household_plan(model, matrix, values, names)
+    recipes = {
+        meal["recipeId"] for day in plan for meal in day.values() if meal["recipeId"]
+    }
+    meta = {
+        "mode": "household",
+        "members": len(names),
+        "build_ms": round(model.build_ms, 2),
+        **outcome.meta(),
+        "heuristic_objective": round(hint_objective, 4),
+        "heuristic_ms": round(heuristic.elapsed_ms, 2),
+        "pool_before": pool_before,
+        "pool_after": len(matrix),
+        "prefilter": reduced,
+        "pinned_slots": int((pins >= 0).sum()),
+        "distinct_recipes": len(recipes),
+    }
+    if status == "Heuristic":
+        meta["solver_objective"] = meta["objective"]
+        meta["objective"] = round(hint_objective, 4)
+    return {
+        "status": status,
+        "plan": plan,
+        "members": {name: member_plan(plan, name) for name in names},
+        "meta": timer.report(meta, model),
+    }
+
+
+def plan_arrays(
+    plan: List[Dict[str, Optional[PlannedMeal]]], matrix: RecipeMatrix
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(picks, servings, missing) arrays of a `{recipeId, servings}` plan; picks
+    are pool indices (-1 when empty), missing flags meals not in the pool"""
+    index = {rid: i for i, rid in enumerate(matrix.ids)}
+    shape = (len(plan), len(SLOTS))
+    picks = np.full(shape, -1)
+    servings = np.zeros(shape)
+    missing = np.zeros(shape, dtype=bool)
+    for d, day in enumerate(plan):
+        for s, slot in enumerate(SLOTS):
+            meal = day.get(slot)
+            if meal is None or meal.recipeId is None:
+                continue
+            if meal.recipeId in index:
+                picks[d, s] = index[meal.recipeId]
+                servings[d, s] = meal.servings
+            else:
+                missing[d, s] = True
+    return picks, servings, missing
+
+
+def resolve_request(req: ResolveRequest) -> Dict[str, Any]:
+    """Re-optimize the changed slots of `req.previous_plan` with every other
+    slot fixed at its previous recipe and servings.
+
+    The previous assignment seeds a local search over the changed slots; its
+    result warm-starts a MIP capped at SOLVER_RESOLVE_TIME_SEC, and the better
+    of the two is returned.
+    """
+    solve = req.request
+    if not (solve.recipes or solve.catalog_id):
+        raise ValueError("recipes (or catalog_id) required")
+    days = len(req.previous_plan)
+    for d in [ref.day for ref in req.replace] + req.reoptimize_days:
+        if not 0 <= d < days:
+            raise ValueError(f"Day {d} is outside the previous plan ({days} days)")
+
+    timer = PhaseTimer(solve.profile)
+    with timer.phase("pool", profiled=True):
+        matrix = resolve_pool(solve)
+    targets = target_vector(solve.targets)
+    pool_before = len(matrix)
+    reduced = None
+    if solve.prefilter and len(matrix):
+        with timer.phase("prefilter", profiled=True):
+            kept = {
+                meal.recipeId
+                for day in req.previous_plan
+                for meal in day.values()
+                if meal and meal.recipeId
+            }
+            top_k = solve.top_k_per_slot or SOLVER_TOP_K_PER_SLOT or None
+            matrix, reduced = reduce_pool(
+                matrix, targets, solve.weights, days, solve.max_repeat, top_k, kept
+            )
+
+    previous, servings, missing = plan_arrays(req.previous_plan, matrix)
+    # Meals disliked, excluded or gone from the catalog since are re-planned
+    free = missing.copy()
+    free[req.reoptimize_days] = True
+    replaced = np.array(
+        [(ref.day, SLOTS.index(ref.slot)) for ref in req.replace], dtype=int
+    ).reshape(-1, 2)
+    free[replaced[:, 0], replaced[:, 1]] = True
+
+    pins = np.where(free, -1, previous)
+    # Untouched empty slots stay empty and replaced meals may not come back
+    kept_empty = np.argwhere(~free & (previous < 0))
+    swapped = replaced[previous[replaced[:, 0], replaced[:, 1]] >= 0]
+    banned = np.vstack(
+        [
+            np.column_stack([kept_empty, np.full(len(kept_empty), -1)]),
+            np.column_stack([swapped, previous[swapped[:, 0], swapped[:, 1]]]),
+        ]
+    ).astype(int)
+
+    pin_servings = np.where(free, 0.0, servings)
+    with timer.phase("build", profiled=True):
+        model = build_model(
+            matrix,
+            days,
+            targets,
+            solve.weights,
+            solve.max_repeat,
+            pins,
+            pin_servings,
+            banned,
+        )
+    # Few slots are free, so the local search can afford the whole pool as candidates
+    with timer.phase("heuristic"):
+        heuristic = plan_heuristic(
+            matrix,
+            days,
+            targets,
+            solve.weights,
+            solve.max_repeat,
+            pins,
+            pin_servings=pin_servings,
+            banned=banned,
+            start_from=(previous, servings),
+            candidates_per_slot=len(matrix),
+        )
+        hint = plan_values(model, matrix, heuristic.picks, heuristic.servings)
+    engine = solve.engine or SOLVER_ANYTIME_ENGINE
+    with timer.phase("solve"):
+        outcome = solve_model(
+            model,
+            min(solve.time_limit_sec, SOLVER_RESOLVE_TIME_SEC),
+            engine,
+            solve.search_workers,
+            hint,
+        )
+
+    with timer.phase("extract"):
+        status, plan = outcome.status, extract_plan(model, matrix, outcome.values)
+        if outcome.objective is None or outcome.objective > heuristic.objective + 1e-6:
+            status, plan = "Heuristic", format_plan(
+                matrix, heuristic.picks, heuristic.servings
+            )
+    meta = {
+        "mode": "resolve",
+        "changed_slots": int(free.sum()),
+        "changed_days": np.flatnonzero(free.any(axis=1)).tolist(),
+        "build_ms": round(model.build_ms, 2),
+        **outcome.meta(),
+        "heuristic_objective": round(heuristic.objective, 4),
+        "heuristic_ms": round(heuristic.elapsed_ms, 2),
+        "pool_before": pool_before,
+        "pool_after": len(matrix),
+        "prefilter": reduced,
+    }
+    if status == "Heuristic":
+        meta["solver_objective"] = meta["objective"]
+        meta["objective"] = round(heuristic.objective, 4)
+    return {"status": status, "plan": plan, "meta": timer.report(meta, model)}
+
+
+def substitutes_request(req: SubstitutesRequest) -> Dict[str, Any]:
+    """Top replacements for one slot of `req.plan`, each at its best portion,
+    scored against that day's band with the other meals kept"""
+    timer = PhaseTimer(req.request.profile)
+    solve = req.request
+    if not (solve.recipes or solve.catalog_id):
+        raise ValueError("recipes (or catalog_id) required")
+    days = len(req.plan)
+    if req.day >= days:
+        raise ValueError(f"Day {req.day} is outside the plan ({days} days)")
+    s = SLOTS.index(req.slot)
+
+    with timer.phase("pool", profiled=True):
+        matrix = resolve_pool(solve)
+    picks, servings, missing = plan_arrays(req.plan, matrix)
+    missing[req.day, s] = False  # the meal being replaced may well be disliked now
+    if missing[req.day].any():
+        slot = SLOTS[int(np.flatnonzero(missing[req.day])[0])]
+        raise ValueError(
+            f"Planned recipe '{req.plan[req.day][slot].recipeId}' (day {req.day}, {slot}) is not in the recipe pool"
+        )
+
+    targets = target_vector(solve.targets)
+    low, high = BAND_LOW * targets, BAND_HIGH * targets
+    alpha = float(solve.weights.get("nutri", 1.0))
+    pick_cost = (
+        float(solve.weights.get("time", 0.2)) * matrix.time_min
+        + float(solve.weights.get("cost", 0.2)) * matrix.cost_eur
+    ) / max(1, days)
+
+    others = [o for o in range(len(SLOTS)) if o != s and picks[req.day, o] >= 0]
+    base = (
+        servings[req.day, others, None] * matrix.nutrients[picks[req.day, others]]
+    ).sum(axis=0)
+    current = picks[req.day, s]
+    current_score = alpha * float(np.abs(band_deviation(base, low, high)).sum())
+    if current >= 0:
+        totals = base + servings[req.day, s] * matrix.nutrients[current]
+        current_score = alpha * float(
+            np.abs(band_deviation(totals, low, high)).sum()
+        ) + float(pick_cost[current])
+
+    # Eligible recipes other than the current one that still fit the repeat budget
+    counts = np.bincount(picks[picks >= 0], minlength=len(matrix))
+    if current >= 0:
+        counts[current] -= 1
+    candidates = np.flatnonzero(matrix.eligible[:, s] & (counts < solve.max_repeat))
+    candidates = candidates[candidates != current]
+    with timer.phase("score", profiled=True):
+        rows, portions, deviation, score = rank_substitutes(
+            base,
+            matrix.nutrients[candidates],
+            low,
+            high,
+            matrix.portion_min[candidates, s],
+            matrix.portion_max[candidates, s],
+            pick_cost[candidates],
+            alpha,
+            req.top_n,
+        )
+        chosen = candidates[rows]
+        gaps = band_deviation(
+            base + portions[:, None] * matrix.nutrients[chosen], low, high
+        )
+    return {
+        "day": req.day,
+        "slot": req.slot,
+        "current": (
+            None
+            if current < 0
+            else {
+                "recipeId": matrix.ids[current],
+                "servings": round(float(servings[req.day, s]), 2),
+                "score": round(current_score, 4),
+            }
+        ),
+        "candidates": [
+            {
+                "recipeId": matrix.ids[r],
+                "servings": round(p, 2),
+                "deviation": round(d, 4),
+                "score": round(sc, 4),
+                "score_change": round(sc - current_score, 4),
+                "band_gaps": dict(zip(N_KEYS, np.round(gap, 4).tolist())),
+            }
+            for r, p, d, sc, gap in zip(
+                chosen.tolist(),
+                portions.tolist(),
+                deviation.tolist(),
+                score.tolist(),
+                gaps,
+            )
+        ],
+        "meta": timer.report(
+            {
+                "scored": int(candidates.size),
+                "ms": round((time.perf_counter() - timer.start) * 1000, 2),
+            }
+        ),
+    }
+
+
+def cache_key(
+    req: Union[SolveRequest, ResolveRequest], catalog: Optional[Catalog] = None
+) -> str:
+    payload = req.model_dump()
+    solve = req.request if isinstance(req, ResolveRequest) else req
+    if catalog is not None:
+        # A pool sent packed (wire.py recipe_columns) is only known by its digest
+        payload["catalog_digest"] = catalog.digest
+    elif solve.catalog_id:
+        # Re-registering a catalog must not replay plans built on the old content
+        payload["catalog_digest"] = resolve_catalog(solve).digest
+    return request_key(payload)
+
+
+def cached_result(req: SolveRequest) -> Optional[Dict[str, Any]]:
+    """A cached response for `req`, without solving"""
+    result = solution_cache.get(cache_key(req))
+    return (
+        None
+        if result is None
+        else {**result, "meta": {**result.get("meta", {}), "cached": True}}
+    )
+
+
+def solve_cached(
+    req: Union[SolveRequest, ResolveRequest],
+    solve: Callable[[Any], Dict[str, Any]] = solve_request,
+    catalog: Optional[Catalog] = None,
+) -> Dict[str, Any]:
+    """solve(req) behind the solution cache; meta.cached tells which path
+    served it. `catalog` is a packed pool standing in for req's recipes, as
+    in solve_request()."""
+    key = cache_key(req, catalog)
+    result, source = solution_cache.get_or_solve(
+        key, lambda: solve(req) if catalog is None else solve(req, catalog=catalog)
+    )
+    return {**result, "meta": {**result.get("meta", {}), "cached": source != "miss"}}
+
+
+def solve_streaming(
+    req: SolveRequest,
+    control: SolveControl,
+    on_incumbent: Callable[[Dict[str, Any]], None],
+) -> Dict[str, Any]:
+    """solve_request() for /solve/stream: a cached result is replayed as is,
+    otherwise incumbents are reported as found. Streamed results are not cached,
+    as the client may stop the solve early."""
+    result = cached_result(req)
+    if result is not None:
+        return result
+    if req.engine is None and req.mode != "fast":
+        req = req.model_copy(update={"engine": SOLVER_STREAM_ENGINE})
+    return solve_request(req, control, on_incumbent)
+
+
+def solve_payload(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Worker entry point: validate a plain-dict SolveRequest and solve it"""
+    return solve_cached(SolveRequest(**payload))
@@ -0,0 +1,166 @@
+"""Candidate-pool reduction run before the MIP is built.
+
+Three vectorized passes over the RecipeMatrix:
+
+1. exact duplicates (same nutrients, time, cost, slots and portions) are
+   collapsed to one row;
+2. dominated recipes are dropped. Recipe i dominates j when it has no more
+   energy, at least as much of every other nutrient, no more time or cost,
+   and can fill every slot j can with portion bounds at least as wide. The
+   band objective can penalize surplus nutrients, so this is a heuristic;
+   it is only applied to recipes with enough dominators to cover the
+   horizon under max_repeat, so the repeat budget cannot starve the plan;
+3. optionally, only the top-K recipes per slot are kept, ranked by how well
+   their best portion alone covers that slot's share of the daily band.
+
+Recipes in `keep` (pinned ones) are never removed.
+"""
+
+import math
+from typing import Dict, Optional, Set, Tuple
+
+import numpy as np
+
+from model import BAND_HIGH, BAND_LOW, SLOTS, RecipeMatrix
+from scoring import best_portions
+
+DOMINANCE_CHUNK = 512
+DENSE_COLUMNS = 4
+
+
+def _dedupe(features: np.ndarray, protected: np.ndarray) -> np.ndarray:
+    """Mask of rows to keep, preferring protected rows among duplicates"""
+    order = np.argsort(~protected, kind="stable")
+    _, first = np.unique(features[order], axis=0, return_index=True)
+    keep = np.zeros(len(features), dtype=bool)
+    keep[order[first]] = True
+    return keep | protected
+
+
+def _dominator_counts(features: np.ndarray) -> np.ndarray:
+    """How many rows dominate each row, where larger features are better.
+
+    The first columns are compared densely per chunk; the surviving
+    (dominated, dominator) pairs are then filtered one column at a time, so
+    only a small fraction of the n^2 pairs is ever materialized.
+    """
+    n = len(features)
+    dense = min(DENSE_COLUMNS, features.shape[1])
+    counts = np.zeros(n, dtype=np.int64)
+    for start in range(0, n, DOMINANCE_CHUNK):
+        block = features[start : start + DOMINANCE_CHUNK]
+        weakly = np.ones((len(block), n), dtype=bool)
+        for f in range(dense):
+            weakly &= features[None, :, f] >= block[:, None, f]
+        dominated, dominator = np.nonzero(weakly)
+        dominated += start
+        for f in range(dense, features.shape[1]):
+            weakly = features[dominator, f] >= features[dominated, f]
+            dominated, dominator = dominated[weakly], dominator[weakly]
+        strictly = (features[dominator] > features[dominated]).any(axis=1)
+        counts += np.bincount(dominated[strictly], minlength=n)
+    return counts
+
+
+def _dominance_features(matrix: RecipeMatrix) -> np.ndarray:
+    """Per-recipe vector where a larger value is better in every column"""
+    eligible = matrix.eligible
+    # Ineligible slots impose nothing on dominators, so they get the worst value
+    pmin = np.where(eligible, -matrix.portion_min, -np.inf)
+    pmax = np.where(eligible, matrix.portion_max, -np.inf)
+    return np.hstack(
+        [
+            -matrix.nutrients[:, :1],  # energy_kcal
+            matrix.nutrients[:, 1:],
+            -matrix.time_min[:, None],
+            -matrix.cost_eur[:, None],
+            eligible.astype(np.float64),
+            pmin,
+            pmax,
+        ]
+    )
+
+
+def reduce_pool(
+    matrix: RecipeMatrix,
+    targets: np.ndarray,
+    weights: Dict[str, float],
+    days: int,
+    max_repeat: int,
+    top_k: Optional[int] = None,
+    keep: Optional[Set[str]] = None,
+) -> Tuple[RecipeMatrix, Dict[str, int]]:
+    """Return the reduced pool and how many recipes each pass removed."""
+    n = len(matrix)
+    protected = np.isin(np.array(matrix.ids, dtype=object), list(keep or ()))
+    stats = {"before": n, "duplicates": 0, "dominated": 0, "outside_top_k": 0}
+
+    features = np.hstack(
+        [
+            matrix.nutrients,
+            matrix.time_min[:, None],
+            matrix.cost_eur[:, None],
+            matrix.eligible,
+            matrix.portion_min,
+            matrix.portion_max,
+        ]
+    )
+    alive = _dedupe(features, protected)
+    stats["duplicates"] = n - int(alive.sum())
+
+    rows = np.flatnonzero(alive)
+    needed = math.ceil(days * len(SLOTS) / max_repeat)
+    dominated = (
+        _dominator_counts(_dominance_features(matrix.take(rows))) >= needed
+    ) & ~protected[rows]
+    alive[rows[dominated]] = False
+    stats["dominated"] = int(dominated.sum())
+
+    reduced = matrix.take(np.flatnonzero(alive))
+    if top_k is not None:
+        reduced, stats["outside_top_k"] = _top_k_per_slot(
+            reduced, targets, weights, days, top_k, protected[alive]
+        )
+
+    stats["after"] = len(reduced)
+    return reduced, stats
+
+
+def _top_k_per_slot(
+    matrix: RecipeMatrix,
+    targets: np.ndarray,
+    weights: Dict[str, float],
+    days: int,
+    top_k: int,
+    protected: np.ndarray,
+) -> Tuple[RecipeMatrix, int]:
+    alpha = float(weights.get("nutri", 1.0))
+    beta = float(weights.get("time", 0.2))
+    gamma = float(weights.get("cost", 0.2))
+    # A single meal is scored against its slot's share of the daily band
+    share = targets / len(SLOTS)
+    pick_cost = (beta * matrix.time_min + gamma * matrix.cost_eur) / max(1, days)
+
+    eligible = matrix.eligible.copy()
+    for s in range(len(SLOTS)):
+        candidates = np.flatnonzero(eligible[:, s] & ~protected)
+        if candidates.size <= top_k:
+            continue
+        _, deviation = best_portions(
+            np.zeros_like(share),
+            matrix.nutrients[candidates],
+            BAND_LOW * share,
+            BAND_HIGH * share,
+            matrix.portion_min[candidates, s],
+            matrix.portion_max[candidates, s],
+        )
+        score = alpha * deviation + pick_cost[candidates]
+        dropped = candidates[np.argpartition(score, top_k)[top_k:]]
+        eligible[dropped, s] = False
+
+    kept = np.flatnonzero(eligible.any(axis=1) | protected)
+    reduced = matrix.take(kept)
+    reduced.eligible = np.where(
+        protected[kept, None], matrix.eligible[kept], eligible[kept]
+    )
+    return reduced, len(matrix) - len(kept)
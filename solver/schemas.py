@@ -0,0 +1,185 @@
+"""Request models for the VeganFlemme optimizer API."""
+
+from typing import Dict, List, Literal, Optional
+
+from pydantic import BaseModel, Field, model_validator
+
+CATALOG_ID_PATTERN = r"^[A-Za-z0-9_.-]+$"
+
+
+class Nutrients(BaseModel):
+    energy_kcal: float = 0
+    protein_g: float = 0
+    carbs_g: float = 0
+    fat_g: float = 0
+    fiber_g: float = 0
+    b12_ug: float = 0
+    iron_mg: float = 0
+    calcium_mg: float = 0
+    zinc_mg: float = 0
+    iodine_ug: float = 0
+    selenium_ug: float = 0
+    vitamin_d_ug: float = 0
+    ala_g: float = 0
+
+
+Slot = Literal["breakfast", "lunch", "dinner", "snack"]
+
+
+class PortionBounds(BaseModel):
+    min: float = Field(0.0, ge=0)
+    max: float = Field(2.0, gt=0, le=10)
+
+    @model_validator(mode="after")
+    def check_order(self):
+        if self.min > self.max:
+            raise ValueError("portion min must not exceed max")
+        return self
+
+
+class Recipe(BaseModel):
+    id: str
+    title: str
+    time_min: int = 20
+    cost_eur: float = 2.5
+    nutrients: Nutrients
+    # Slots this recipe may fill (all when omitted) and per-slot servings bounds
+    slots: Optional[List[Slot]] = None
+    portions: Dict[Slot, PortionBounds] = {}
+
+
+class DayPlan(BaseModel):
+    breakfast: Optional[str] = None
+    lunch: Optional[str] = None
+    dinner: Optional[str] = None
+    snack: Optional[str] = None
+
+
+class SolveRequest(BaseModel):
+    recipes: List[Recipe] = []
+    # Reference a registered catalog instead of shipping `recipes`
+    catalog_id: Optional[str] = Field(None, max_length=64, pattern=CATALOG_ID_PATTERN)
+    catalog_version: Optional[int] = None
+    include_ids: Optional[List[str]] = None
+    exclude_ids: List[str] = []
+    day_templates: List[DayPlan]
+    targets: Nutrients
+    weights: Dict[str, float] = {}
+    dislikes: List[str] = []
+    max_repeat: int = Field(2, ge=1, le=5)
+    time_limit_sec: int = Field(25, ge=5, le=180)
+    # Drop duplicate/dominated recipes and keep the best top_k_per_slot
+    # (server default when omitted) before building the model
+    prefilter: bool = True
+    top_k_per_slot: Optional[int] = Field(None, ge=1)
+    # MIP engine (server default when omitted); search_workers only applies to
+    # cp-sat. cp-sat always starts from the heuristic plan and, within the same
+    # time limit, may still end above cbc's objective (about 1.25x on 30
+    # recipes over 3 days with one worker); it reports incumbents as it goes
+    engine: Optional[Literal["cbc", "scip", "cp-sat"]] = None
+    search_workers: Optional[int] = Field(None, ge=1, le=64)
+    # exact: MIP only; fast: heuristic plan in milliseconds; anytime: heuristic
+    # plan now, MIP warm-started from it refines in the background
+    mode: Literal["exact", "fast", "anytime"] = "exact"
+    # Extra plans solved from the same model (exact/anytime modes), each at
+    # least alternative_distance recipe picks away from every earlier one; a
+    # swapped meal counts twice, a filled or emptied slot once
+    num_alternatives: int = Field(0, ge=0, le=10)
+    alternative_distance: int = Field(4, ge=1)
+    # Solve week by week with carried-over repeat budgets (exact/anytime
+    # modes); by default only horizons longer than a week are split
+    decompose: Optional[bool] = None
+    # Return a cProfile of the phases before the search in meta.profile
+    profile: bool = False
+
+
+class Member(BaseModel):
+    name: str = Field(..., min_length=1, max_length=64)
+    targets: Nutrients
+    dislikes: List[str] = []
+
+
+class HouseholdRequest(SolveRequest):
+    """A SolveRequest planning shared meals for several members, each with
+    their own targets and dislikes. The request's own `targets` is not used;
+    its `dislikes` apply to everyone. Pinned recipes are cooked for everyone
+    who does not dislike them, in portions fitted to each member. Only
+    `mode: "exact"` is supported; num_alternatives and decompose are
+    rejected, as a household is solved as one plan."""
+
+    members: List[Member] = Field(..., min_length=1, max_length=12)
+    targets: Optional[Nutrients] = None
+
+    @model_validator(mode="after")
+    def unique_member_names(self):
+        names = [m.name for m in self.members]
+        if len(set(names)) != len(names):
+            raise ValueError("member names must be unique")
+        return self
+
+    @model_validator(mode="after")
+    def single_plan(self):
+        if self.num_alternatives:
+            raise ValueError("household plans do not support num_alternatives")
+        if self.decompose:
+            raise ValueError("household plans do not support decompose")
+        return self
+
+
+class PlannedMeal(BaseModel):
+    recipeId: Optional[str] = None
+    servings: float = Field(0.0, ge=0)
+
+
+class SlotRef(BaseModel):
+    day: int = Field(..., ge=0)
+    slot: Slot
+
+
+class ResolveRequest(BaseModel):
+    """The SolveRequest behind a plan (with any new dislikes, exclusions or
+    targets applied), the plan it produced and what to change.
+
+    Only the changed slots are re-optimized: `replace` slots, meals no longer
+    in the pool and every slot of `reoptimize_days` (e.g. after a target
+    change). Every other slot keeps its recipe and servings, empty ones
+    included; `request.day_templates` is not used as the plan already honors it.
+    """
+
+    request: SolveRequest
+    previous_plan: List[Dict[Slot, Optional[PlannedMeal]]] = Field(..., min_length=1)
+    # Slots whose meal must change
+    replace: List[SlotRef] = []
+    # Days re-planned entirely
+    reoptimize_days: List[int] = []
+
+
+class SubstitutesRequest(BaseModel):
+    """Rank replacements for one (day, slot) of `plan`, built from `request`."""
+
+    request: SolveRequest
+    plan: List[Dict[Slot, Optional[PlannedMeal]]] = Field(..., min_length=1)
+    day: int = Field(..., ge=0)
+    slot: Slot
+    top_n: int = Field(10, ge=1, le=200)
+
+
+class BatchRequest(BaseModel):
+    """Independent solves run side by side.
+
+    `recipes` is a pool shared by every request carrying neither recipes nor
+    catalog_id, so it is sent and decoded once; requests repeating the same
+    inline recipes are packed once as well.
+    """
+
+    requests: List[SolveRequest] = Field(..., min_length=1, max_length=256)
+    recipes: List[Recipe] = []
+    # Newline-delimited JSON as items finish; otherwise one JSON document in request order
+    stream: bool = True
+
+
+class CatalogRequest(BaseModel):
+    catalog_id: str = Field(
+        ..., min_length=1, max_length=64, pattern=CATALOG_ID_PATTERN
+    )
+    recipes: List[Recipe] = Field(..., min_length=1)
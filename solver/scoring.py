@@ -0,0 +1,83 @@
+"""Vectorized scoring of recipes against a nutrient target band."""
+
+from typing import Tuple
+
+import numpy as np
+
+
+def best_portions(
+    base: np.ndarray,
+    nutrients: np.ndarray,
+    low: np.ndarray,
+    high: np.ndarray,
+    portion_min: np.ndarray,
+    portion_max: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Best servings for every candidate and the band deviation they leave.
+
+    For each row i, picks p in [portion_min[i], portion_max[i]] minimizing
+    sum_k max(0, base_k + p*a_ik - high_k) + max(0, low_k - base_k - p*a_ik),
+    the same deviation the MIP penalizes. The deviation is piecewise linear
+    and convex in p: its slope starts at -sum_k |a_ik| and rises by |a_ik|
+    at each breakpoint where nutrient k enters or leaves the band. Sorting the
+    breakpoints per row, the minimum is the first one where the slope turns
+    non-negative, clipped to the portion bounds.
+
+    base: (K,) totals already in place; nutrients: (n, K); low/high: (K,);
+    portion_min/portion_max: (n,). Returns (servings (n,), deviation (n,)).
+    """
+    weight = np.abs(nutrients)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        points = np.concatenate(
+            [(low - base) / nutrients, (high - base) / nutrients], axis=1
+        )
+    step = np.concatenate([weight, weight], axis=1)
+    # Nutrients the recipe lacks have no breakpoint
+    points = np.where(step > 0, points, np.inf)
+    order = np.argsort(points, axis=1)
+    climb = np.cumsum(np.take_along_axis(step, order, axis=1), axis=1)
+    total = weight.sum(axis=1)
+    first = (climb >= total[:, None] * (1 - 1e-12)).argmax(axis=1)
+    rows = np.arange(len(nutrients))
+    servings = np.where(total > 0, points[rows, order[rows, first]], portion_min)
+    servings = np.clip(servings, portion_min, portion_max)
+
+    totals = base + servings[:, None] * nutrients
+    deviation = (np.maximum(0.0, totals - high) + np.maximum(0.0, low - totals)).sum(
+        axis=1
+    )
+    return servings, deviation
+
+
+def band_deviation(totals: np.ndarray, low: np.ndarray, high: np.ndarray) -> np.ndarray:
+    """Signed per-nutrient distance to the band: > 0 above it, < 0 below it."""
+    return np.maximum(0.0, totals - high) - np.maximum(0.0, low - totals)
+
+
+def rank_substitutes(
+    base: np.ndarray,
+    nutrients: np.ndarray,
+    low: np.ndarray,
+    high: np.ndarray,
+    portion_min: np.ndarray,
+    portion_max: np.ndarray,
+    pick_cost: np.ndarray,
+    alpha: float,
+    top_n: int,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Best `top_n` candidates for a slot whose day already holds `base`.
+
+    Every candidate is scored at its best portion as alpha * day deviation +
+    pick_cost, the MIP objective restricted to that day. Returns (rows,
+    servings, deviation, score) of the top candidates, best first.
+    """
+    servings, deviation = best_portions(
+        base, nutrients, low, high, portion_min, portion_max
+    )
+    score = alpha * deviation + pick_cost
+    if len(score) > top_n:
+        top = np.argpartition(score, top_n)[:top_n]
+    else:
+        top = np.arange(len(score))
+    top = top[np.argsort(score[top], kind="stable")]
+    return top, servings[top], deviation[top], score[top]
@@ -0,0 +1,95 @@
+"""Memory-mapped CIQUAL nutrient snapshot.
+
+db/import_ciqual.py --snapshot compiles the CIQUAL foods into one binary
+file (format in db/nutrient_snapshot.py): a float32 matrix of nutrients per
+100 g in N_KEYS order, with aligned ciqual_code and name arrays. The file is
+mapped read-only, so lookups need no parsing or database round trip, and
+every worker process mapping it shares the same pages.
+"""
+
+import json
+import mmap
+import os
+import struct
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from model import N_KEYS
+
+NUTRIENT_SNAPSHOT = os.getenv("NUTRIENT_SNAPSHOT")
+
+MAGIC = b"VFNUTSNP"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+
+
+class NutrientSnapshot:
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, length = struct.unpack_from("<8sII", self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a nutrient snapshot")
+        if version != FORMAT_VERSION:
+            raise ValueError(
+                f"{path} is snapshot format {version}, expected {FORMAT_VERSION}"
+            )
+        self.meta: Dict[str, Any] = json.loads(self._map[16 : 16 + length])
+        if self.meta["keys"] != N_KEYS:
+            raise ValueError(
+                f"{path} has nutrients {self.meta['keys']}, expected {N_KEYS}"
+            )
+        self._data_offset = -(-(16 + length) // ALIGNMENT) * ALIGNMENT
+
+        # (rows, len(N_KEYS)) float32, read-only
+        self.nutrients = self._array("nutrients")
+        self.codes = self._array("ciqual_code")
+        self.names = self._array("food_name_fr")
+        self._rows = {code.decode(): i for i, code in enumerate(self.codes.tolist())}
+
+    def _array(self, name: str) -> np.ndarray:
+        spec = self.meta["arrays"][name]
+        count = int(np.prod(spec["shape"]))
+        return np.frombuffer(
+            self._map,
+            dtype=spec["dtype"],
+            count=count,
+            offset=self._data_offset + spec["offset"],
+        ).reshape(spec["shape"])
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, ciqual_code: str) -> bool:
+        return ciqual_code in self._rows
+
+    def food(self, ciqual_code: str, grams: float = 100.0) -> Optional[Dict[str, Any]]:
+        """A food's nutrients for `grams` of it, None when not in the snapshot"""
+        row = self._rows.get(ciqual_code)
+        if row is None:
+            return None
+        values = self.nutrients[row].astype(np.float64) * (grams / 100.0)
+        return {
+            "ciqual_code": ciqual_code,
+            "name": self.names[row].decode("utf-8"),
+            "grams": grams,
+            "nutrients": dict(zip(N_KEYS, np.round(values, 4).tolist())),
+        }
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "foods": len(self),
+            "source_sha256": self.meta["source_sha256"],
+            "source_name": self.meta.get("source_name"),
+            "created_at": self.meta.get("created_at"),
+        }
+
+
+def load_snapshot(
+    path: Optional[str] = NUTRIENT_SNAPSHOT,
+) -> Optional[NutrientSnapshot]:
+    """The snapshot at `path` (NUTRIENT_SNAPSHOT by default), None when no path is set"""
+    return NutrientSnapshot(path) if path else None
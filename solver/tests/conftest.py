@@ -0,0 +1,20 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# The solver's modules import each other flat, as when run from solver/
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from bench.workload import Case, generate_recipes, make_request
+
+
+@pytest.fixture
+def payload():
+    """Small seeded /solve payload: 30 recipes over 3 days"""
+    return make_request(Case(recipes=30, days=3, time_limit_sec=5))
+
+
+@pytest.fixture
+def recipes():
+    return generate_recipes(30, 0)
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from planner import _pick_distance, solve_request
+from schemas import SolveRequest
+
+
+def picks(plan):
+    return [[meal["recipeId"] for meal in day.values()] for day in plan]
+
+
+def distance(a, b):
+    ids = {rid for day in a + b for rid in day if rid}
+    index = {rid: i for i, rid in enumerate(sorted(ids))}
+    return _pick_distance(
+        *(np.array([[index.get(r, -1) for r in day] for day in p]) for p in (a, b))
+    )
+
+
+def test_pick_distance_counts_swaps_twice():
+    a = np.array([[0, 1, -1, 2]])
+    assert _pick_distance(a, a) == 0
+    assert _pick_distance(a, np.array([[3, 1, -1, 2]])) == 2
+    assert _pick_distance(a, np.array([[0, 1, 4, -1]])) == 2
+
+
+@pytest.mark.parametrize("mode", ["exact", "fast"])
+def test_alternatives_are_distinct_and_no_better(payload, mode):
+    request = {**payload, "mode": mode, "num_alternatives": 3}
+    result = solve_request(SolveRequest(**request))
+    alternatives = result["alternatives"]
+    assert alternatives
+
+    found = [picks(result["plan"])]
+    for alternative in alternatives:
+        plan = picks(alternative["plan"])
+        assert min(distance(plan, earlier) for earlier in found) >= 4
+        assert alternative["distance"] >= 4
+        found.append(plan)
+        if result["status"] == "Optimal":
+            assert alternative["objective"] >= result["meta"]["objective"] - 1e-3
+        assert alternative["objective_gap"] == pytest.approx(
+            (alternative["objective"] - result["meta"]["objective"])
+            / result["meta"]["objective"],
+            abs=1e-3,
+        )
+
+
+def test_no_alternatives_by_default(payload):
+    assert "alternatives" not in solve_request(SolveRequest(**payload))
@@ -0,0 +1,108 @@
+import json
+import multiprocessing as mp
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+
+import pytest
+from fastapi.testclient import TestClient
+
+import batch
+import main
+import planner
+from batch import _Pools
+from cache import SolutionCache
+from planner import cache_key
+from schemas import Recipe, SolveRequest
+
+
+@pytest.fixture
+def client(monkeypatch):
+    store = SolutionCache(max_entries=32, ttl_sec=60)
+    monkeypatch.setattr(planner, "solution_cache", store)
+    monkeypatch.setattr(batch, "solution_cache", store)
+    executor = ProcessPoolExecutor(max_workers=2, mp_context=mp.get_context("spawn"))
+    monkeypatch.setattr(batch, "_executor", executor)
+    yield TestClient(main.app)
+    executor.shutdown(cancel_futures=True)
+
+
+def items(payload, *updates):
+    request = {k: v for k, v in payload.items() if k != "recipes"}
+    return [{**request, "mode": "fast", **update} for update in updates]
+
+
+def test_shared_pool_is_packed_once_and_duplicates_solved_once(client, payload):
+    requests = items(payload, {}, {}, {"max_repeat": 1}, {"catalog_id": "nope"})
+    body = client.post(
+        "/solve/batch",
+        json={"requests": requests, "recipes": payload["recipes"], "stream": False},
+    ).json()
+
+    results = body["results"]
+    assert [r["index"] for r in results] == [0, 1, 2, 3]
+    assert results[0]["plan"] == results[1]["plan"]
+    assert results[3]["error"]["status_code"] == 400
+    assert body["summary"]["pools_packed"] == 1
+    assert body["summary"]["submitted"] == 2
+    assert (body["summary"]["ok"], body["summary"]["failed"]) == (3, 1)
+
+    # /solve with the same recipes inline hits what the batch cached
+    solved = client.post("/solve", json={**requests[2], "recipes": payload["recipes"]})
+    assert solved.json()["meta"]["cached"] is True
+    assert solved.json()["plan"] == results[2]["plan"]
+
+
+class InlineExecutor:
+    """Solves on submit, so an item has finished before the next is read"""
+
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+
+def test_duplicate_of_a_finished_item_is_served_from_the_cache(
+    client, monkeypatch, payload
+):
+    monkeypatch.setattr(batch, "_executor", InlineExecutor())
+    requests = items(payload, {}, {"max_repeat": 1}, {})
+    body = client.post(
+        "/solve/batch",
+        json={"requests": requests, "recipes": payload["recipes"], "stream": False},
+    ).json()
+
+    results = body["results"]
+    assert [r["index"] for r in results] == [0, 1, 2]
+    assert results[2]["plan"] == results[0]["plan"]
+    assert results[2]["meta"]["cached"] is True
+    assert body["summary"]["submitted"] == 2
+    assert (body["summary"]["ok"], body["summary"]["cached"]) == (3, 1)
+
+
+def test_streamed_lines_end_with_the_summary(client, payload):
+    requests = items(payload, {}, {"max_repeat": 1})
+    response = client.post(
+        "/solve/batch", json={"requests": requests, "recipes": payload["recipes"]}
+    )
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(line["index"] for line in lines[:-1]) == [0, 1]
+    assert lines[-1]["summary"]["items"] == 2
+
+
+def test_pool_key_matches_inline_recipes(payload):
+    shared = [Recipe(**r) for r in payload["recipes"]]
+    inline = SolveRequest(**payload)
+    pools = _Pools(shared)
+    try:
+        catalog, key, item = pools.resolve(inline.model_copy(update={"recipes": []}))
+        assert key == cache_key(inline)
+        assert item.recipes == []
+        assert pools.resolve(inline)[0] is catalog
+
+        path, digest = pools.spill(catalog)
+        assert pools.spill(catalog) == (path, digest)
+        assert digest == catalog.digest
+    finally:
+        pools.close()
+    assert not os.path.exists(path)
@@ -0,0 +1,77 @@
+from bench.compare import compare_runs, environment_mismatch
+from bench.runner import run_case
+from bench.workload import SUITES, Case, generate_recipes, make_request
+from schemas import SolveRequest
+
+
+def test_workload_is_seeded_and_valid():
+    case = Case(recipes=80, days=7, dislike_rate=0.2, pinned_rate=0.2)
+    assert make_request(case) == make_request(case)
+    assert generate_recipes(80, 1) != generate_recipes(80, 0)
+
+    req = SolveRequest(**make_request(case))
+    assert len(req.recipes) == 80
+    assert len(req.day_templates) == 7
+    assert len(req.dislikes) == 16
+    pinned = {rid for t in req.day_templates for rid in t.model_dump().values() if rid}
+    assert pinned and not pinned & set(req.dislikes)
+
+
+def test_case_names_are_unique_per_suite():
+    for cases in SUITES.values():
+        names = [case.name for case in cases]
+        assert len(names) == len(set(names))
+
+
+def run(**cases):
+    return {
+        "cases": [
+            {
+                "name": name,
+                "status": "Optimal",
+                "objective": 100.0,
+                "peak_rss_mb": 100.0,
+                **row,
+                "timings": {"build_ms": 10.0, "solve_ms": 100.0, **row["timings"]},
+            }
+            for name, row in cases.items()
+        ]
+    }
+
+
+def test_compare_flags_regressions_only_beyond_tolerance():
+    before = run(
+        a={"timings": {}},
+        b={"timings": {}},
+        c={"timings": {}},
+        d={"timings": {}},
+    )
+    after = run(
+        a={"timings": {"solve_ms": 130.0}},
+        b={"timings": {"solve_ms": 50.0, "build_ms": 12.0}},
+        c={"timings": {}, "status": "NotSolved", "objective": None},
+        d={"timings": {}, "objective": 105.0, "peak_rss_mb": 150.0},
+    )
+    changes = {(c.case, c.metric): c.regression for c in compare_runs(before, after)}
+    assert changes == {
+        ("a", "solve_ms"): True,
+        ("b", "solve_ms"): False,
+        ("c", "status Optimal -> NotSolved"): True,
+        ("d", "objective"): True,
+        ("d", "peak_rss_mb"): True,
+    }
+
+
+def test_environment_mismatch():
+    a = {"environment": {"machine": "x86_64", "cpu_count": 8}}
+    b = {"environment": {"machine": "x86_64", "cpu_count": 4}}
+    assert environment_mismatch(a, b) == ["cpu_count: 8 -> 4"]
+
+
+def test_run_case_records_a_row():
+    row = run_case(Case(recipes=50, days=2, mode="fast"), repeat=2)
+    assert row["name"] == Case(recipes=50, days=2, mode="fast").name
+    assert row["status"] == "Heuristic"
+    assert len(row["wall_ms_runs"]) == 2
+    assert row["peak_rss_mb"] >= row["rss_before_solve_mb"] > 0
+    assert {"heuristic_ms", "total_ms"} <= set(row["timings"])
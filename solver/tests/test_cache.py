@@ -0,0 +1,107 @@
+import threading
+import time
+
+import pytest
+
+import cache
+from cache import SolutionCache, request_key
+
+RESULT = {"status": "Optimal", "plan": []}
+
+
+def test_request_key_ignores_order_of_sets(payload):
+    shuffled = {
+        **payload,
+        "recipes": list(reversed(payload["recipes"])),
+        "dislikes": ["b", "a", "a"],
+    }
+    assert request_key({**payload, "dislikes": ["a", "b"]}) == request_key(shuffled)
+    assert request_key(payload) != request_key({**payload, "max_repeat": 1})
+
+
+def test_hit_and_miss():
+    store = SolutionCache(max_entries=8, ttl_sec=60)
+    calls = []
+
+    def solve():
+        calls.append(1)
+        return RESULT
+
+    assert store.get_or_solve("k", solve) == (RESULT, "miss")
+    assert store.get_or_solve("k", solve) == (RESULT, "hit")
+    assert len(calls) == 1
+    assert store.stats()["hits"] == 1
+    assert store.stats()["misses"] == 1
+
+
+def test_failed_statuses_are_not_cached():
+    store = SolutionCache(max_entries=8, ttl_sec=60)
+    store.get_or_solve("k", lambda: {"status": "NotSolved"})
+    assert store.get("k") is None
+    store.put("k", {"status": "Abnormal"})
+    assert store.get("k") is None
+
+
+def test_ttl_expiry(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "time", lambda: now[0])
+    store = SolutionCache(max_entries=8, ttl_sec=10)
+    store.put("k", RESULT)
+    now[0] += 10
+    assert store.get("k") == RESULT
+    now[0] += 1
+    assert store.get("k") is None
+
+
+def test_lru_eviction_and_disk_mirror(tmp_path):
+    store = SolutionCache(max_entries=2, ttl_sec=60, disk_dir=str(tmp_path))
+    for key in "abc":
+        store.put(key, {**RESULT, "key": key})
+    assert list(store._entries) == ["b", "c"]
+
+    # A fresh process finds every entry on disk
+    restarted = SolutionCache(max_entries=2, ttl_sec=60, disk_dir=str(tmp_path))
+    assert restarted.get("a")["key"] == "a"
+    assert restarted.disk_hits == 1
+
+
+def test_identical_requests_coalesce():
+    store = SolutionCache(max_entries=8, ttl_sec=60)
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def solve():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return RESULT
+
+    results = []
+    first = threading.Thread(
+        target=lambda: results.append(store.get_or_solve("k", solve))
+    )
+    first.start()
+    started.wait(5)
+    second = threading.Thread(
+        target=lambda: results.append(store.get_or_solve("k", solve))
+    )
+    second.start()
+    while store.stats()["coalesced"] == 0:
+        time.sleep(0.01)
+    release.set()
+    first.join()
+    second.join()
+
+    assert len(calls) == 1
+    assert sorted(source for _, source in results) == ["coalesced", "miss"]
+
+
+def test_solve_errors_reach_every_waiter():
+    store = SolutionCache(max_entries=8, ttl_sec=60)
+
+    def solve():
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError, match="bad request"):
+        store.get_or_solve("k", solve)
+    assert store.stats()["inflight"] == 0
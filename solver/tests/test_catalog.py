@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+import planner
+from catalog import CatalogStore
+from model import pack_recipes
+from schemas import Recipe
+
+
+def as_recipes(dicts):
+    return [Recipe(**r) for r in dicts]
+
+
+def test_register_versions_on_change_only(tmp_path, recipes):
+    store = CatalogStore(str(tmp_path))
+    first = store.register("week", as_recipes(recipes[:10]))
+    assert store.register("week", as_recipes(recipes[:10])) is first
+    second = store.register("week", as_recipes(recipes[:12]))
+
+    assert (first.version, second.version) == (1, 2)
+    assert store.get("week").version == 2
+    assert len(store.get("week", 1).matrix) == 10
+    with pytest.raises(KeyError):
+        store.get("week", 3)
+    with pytest.raises(KeyError):
+        store.get("other")
+
+
+def test_every_version_survives_a_restart(tmp_path, recipes):
+    store = CatalogStore(str(tmp_path), keep_versions=2)
+    for size in (10, 11, 12):
+        store.register("week", as_recipes(recipes[:size]))
+
+    restarted = CatalogStore(str(tmp_path), keep_versions=2)
+    assert restarted.get("week").version == 3
+    assert len(restarted.get("week", 2).matrix) == 11
+    # Only the last keep_versions versions are kept on disk
+    with pytest.raises(KeyError):
+        restarted.get("week", 1)
+    assert [c["catalog_id"] for c in restarted.list()] == ["week"]
+
+
+def test_packed_matrix_matches_the_recipes(tmp_path, recipes):
+    catalog = CatalogStore(str(tmp_path)).register("week", as_recipes(recipes))
+    packed = pack_recipes(as_recipes(recipes))
+    assert catalog.matrix.ids == packed.ids
+    np.testing.assert_array_equal(catalog.matrix.nutrients, packed.nutrients)
+
+    selected = catalog.select(include=["r1", "r2", "r3"], exclude=["r2"])
+    assert selected.ids == ["r1", "r3"]
+
+
+def test_solve_by_catalog_id_matches_inline_recipes(monkeypatch, tmp_path, payload):
+    store = CatalogStore(str(tmp_path))
+    monkeypatch.setattr(main, "catalogs", store)
+    monkeypatch.setattr(planner, "catalogs", store)
+    client = TestClient(main.app)
+    request = {**payload, "mode": "fast"}
+
+    registered = client.post(
+        "/catalogs", json={"catalog_id": "week", "recipes": payload["recipes"]}
+    )
+    assert registered.status_code == 201
+    by_id = client.post(
+        "/solve", json={**request, "recipes": [], "catalog_id": "week"}
+    ).json()
+    inline = client.post("/solve", json=request).json()
+    assert by_id["plan"] == inline["plan"]
+
+    unknown = client.post(
+        "/solve", json={**request, "recipes": [], "catalog_id": "nope"}
+    )
+    assert unknown.status_code == 400
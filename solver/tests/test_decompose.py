@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from bench.workload import Case, make_request
+from decompose import block_budget, solve_rolling
+from engines import SolveControl
+from model import pack_recipes, pinned_servings, target_vector
+from planner import resolve_pins, solve_request
+from schemas import SolveRequest
+
+
+@pytest.fixture
+def long_payload():
+    """Two weeks over 40 recipes, a few slots pinned"""
+    return make_request(
+        Case(recipes=40, days=14, pinned_rate=0.1, time_limit_sec=5, seed=1)
+    )
+
+
+def test_block_budget_spreads_what_is_left():
+    budget = block_budget(
+        max_repeat=4,
+        used=np.array([0, 3, 0]),
+        reserved_ahead=np.array([0, 0, 2]),
+        reserved_here=np.array([0, 0, 1]),
+        block_days=7,
+        days_left=14,
+    )
+    # Half the horizon gets half of what is free, plus its own reserved uses
+    np.testing.assert_array_equal(budget, [2, 1, 2])
+
+
+def test_long_horizon_is_solved_week_by_week(long_payload):
+    result = solve_request(SolveRequest(**long_payload))
+    assert result["status"] in ("Optimal", "Feasible")
+    assert [b["days"] for b in result["meta"]["blocks"]] == [[0, 6], [7, 13]]
+
+    picked = [
+        meal["recipeId"]
+        for day in result["plan"]
+        for meal in day.values()
+        if meal["recipeId"]
+    ]
+    counts = np.unique(picked, return_counts=True)[1]
+    assert counts.max() <= long_payload["max_repeat"]
+    for template, day in zip(long_payload["day_templates"], result["plan"]):
+        for slot, rid in template.items():
+            assert day[slot]["recipeId"] == rid
+
+
+def test_short_horizon_is_not_split(payload):
+    assert "blocks" not in solve_request(SolveRequest(**payload))["meta"]
+    forced = solve_request(SolveRequest(**{**payload, "decompose": True}))
+    assert len(forced["meta"]["blocks"]) == 1
+
+
+def test_stopped_solve_keeps_pins_and_reports_no_plan(long_payload):
+    req = SolveRequest(**long_payload)
+    matrix = pack_recipes(req.recipes)
+    pins = resolve_pins(req, matrix)
+    assert (pins >= 0).any()
+    control = SolveControl()
+    control.stop()
+    rolling = solve_rolling(
+        matrix,
+        target_vector(req.targets),
+        req.weights,
+        req.max_repeat,
+        pins,
+        10,
+        control=control,
+    )
+
+    assert rolling.summary.status not in ("Optimal", "Feasible")
+    assert rolling.summary.objective is None
+    np.testing.assert_array_equal(rolling.picks, pins)
+    np.testing.assert_allclose(rolling.servings, pinned_servings(matrix, pins))
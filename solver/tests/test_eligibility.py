@@ -0,0 +1,50 @@
+import pytest
+from pydantic import ValidationError
+
+from model import SLOTS, build_model, pack_recipes, target_vector
+from planner import solve_request
+from schemas import Recipe, SolveRequest
+
+
+def test_cells_only_for_eligible_slots(payload):
+    req = SolveRequest(**payload)
+    matrix = pack_recipes(req.recipes)
+    model = build_model(matrix, 3, target_vector(req.targets), {}, 2)
+
+    assert model.y_cols.size == 3 * int(matrix.eligible.sum())
+    assert matrix.eligible[model.cell_recipe, model.cell_slot].all()
+
+
+@pytest.mark.parametrize("mode", ["exact", "fast"])
+def test_plans_respect_slots_and_portions(payload, mode):
+    for recipe in payload["recipes"]:
+        recipe["portions"] = {slot: {"min": 0.5, "max": 1.5} for slot in SLOTS}
+    result = solve_request(SolveRequest(**{**payload, "mode": mode}))
+    slots = {r["id"]: r["slots"] for r in payload["recipes"]}
+
+    meals = [
+        (slot, meal)
+        for day in result["plan"]
+        for slot, meal in day.items()
+        if meal["recipeId"]
+    ]
+    assert meals
+    for slot, meal in meals:
+        assert slot in slots[meal["recipeId"]]
+        assert 0.5 - 1e-6 <= meal["servings"] <= 1.5 + 1e-6
+
+
+def test_invalid_slots_and_portions_are_rejected(recipes):
+    with pytest.raises(ValidationError):
+        Recipe(**{**recipes[0], "slots": ["brunch"]})
+    with pytest.raises(ValidationError):
+        Recipe(**{**recipes[0], "portions": {"lunch": {"min": 2, "max": 1}}})
+
+
+def test_no_eligible_recipe_leaves_the_slot_empty(payload):
+    for recipe in payload["recipes"]:
+        recipe["slots"] = [slot for slot in recipe["slots"] if slot != "snack"] or [
+            "lunch"
+        ]
+    result = solve_request(SolveRequest(**{**payload, "mode": "fast"}))
+    assert all(day["snack"]["recipeId"] is None for day in result["plan"])
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from engines import ENGINES, SolveControl, solve_model
+from heuristic import plan_heuristic
+from model import build_model, pack_recipes, plan_values, target_vector
+from planner import solve_request
+from schemas import Recipe, SolveRequest
+
+
+@pytest.fixture
+def small(payload):
+    req = SolveRequest(**payload)
+    matrix = pack_recipes([Recipe(**r) for r in payload["recipes"][:8]])
+    targets = target_vector(req.targets)
+    return matrix, targets, build_model(matrix, 2, targets, req.weights, 2)
+
+
+def test_engines_agree_on_the_optimum(small):
+    _, _, model = small
+    outcomes = {engine: solve_model(model, 30, engine) for engine in ENGINES}
+    for engine, outcome in outcomes.items():
+        assert outcome.status == "Optimal", engine
+        assert outcome.engine == engine
+        # The objective is always evaluated in the shared model
+        assert outcome.objective == pytest.approx(
+            model.objective @ outcome.values + model.offset
+        )
+    cbc = outcomes["cbc"].objective
+    assert outcomes["scip"].objective == pytest.approx(cbc, rel=1e-6)
+    # CP-SAT is optimal on its grid of servings, which the MIP optimum may
+    # fall between
+    assert cbc - 1e-6 <= outcomes["cp-sat"].objective <= cbc * 1.1
+
+
+def test_cp_sat_is_warm_started_and_near_cbc_at_bench_size(payload):
+    """On the bench's 30 recipes over 3 days, CP-SAT starts from the heuristic
+    plan and ends within 1.5x of CBC's objective in the same 5 s"""
+    solved = {
+        engine: solve_request(SolveRequest(**{**payload, "engine": engine}))
+        for engine in ("cbc", "cp-sat")
+    }
+    cbc, cp_sat = (solved[engine]["meta"] for engine in ("cbc", "cp-sat"))
+    assert "heuristic_objective" not in cbc
+    assert cp_sat["objective"] <= cp_sat["heuristic_objective"] + 1e-4
+    assert cp_sat["objective"] <= 1.5 * cbc["objective"]
+
+
+def test_unknown_engine_is_rejected(small):
+    with pytest.raises(ValueError, match="Unknown solver engine"):
+        solve_model(small[2], 5, "gurobi")
+
+
+@pytest.mark.parametrize("engine", ["scip", "cp-sat"])
+def test_hint_never_makes_things_worse(small, engine):
+    matrix, targets, model = small
+    start = plan_heuristic(matrix, 2, targets, {}, 2, np.full((2, 4), -1))
+    hint = plan_values(model, matrix, start.picks, start.servings)
+    outcome = solve_model(model, 30, engine, hint=hint)
+    assert outcome.objective <= model.objective @ hint + model.offset + 1e-6
+
+
+def test_stopped_control_skips_the_solve(small):
+    control = SolveControl()
+    control.stop()
+    outcome = solve_model(small[2], 30, "cp-sat", control=control)
+    assert outcome.objective is None
+    assert outcome.values.size == 0
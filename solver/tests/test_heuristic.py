@@ -0,0 +1,78 @@
+import time
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import jobs
+import main
+import planner
+from cache import SolutionCache
+from heuristic import plan_heuristic
+from jobs import WorkerPool
+from model import build_model, pack_recipes, plan_values, target_vector
+from planner import solve_payload, solve_request
+from schemas import SolveRequest
+
+
+def test_objective_matches_the_model(payload):
+    req = SolveRequest(**payload)
+    matrix = pack_recipes(req.recipes)
+    targets = target_vector(req.targets)
+    pins = np.full((3, 4), -1)
+    plan = plan_heuristic(matrix, 3, targets, req.weights, req.max_repeat, pins)
+    model = build_model(matrix, 3, targets, req.weights, req.max_repeat)
+
+    values = plan_values(model, matrix, plan.picks, plan.servings)
+    assert plan.objective == pytest.approx(
+        model.objective @ values + model.offset, rel=1e-6
+    )
+    assert (np.bincount(plan.picks[plan.picks >= 0]) <= req.max_repeat).all()
+
+
+def test_fast_plan_respects_repeats_and_dislikes(payload):
+    disliked = [r["id"] for r in payload["recipes"][:10]]
+    result = solve_request(
+        SolveRequest(
+            **{**payload, "mode": "fast", "max_repeat": 1, "dislikes": disliked}
+        )
+    )
+    picked = [
+        meal["recipeId"]
+        for day in result["plan"]
+        for meal in day.values()
+        if meal["recipeId"]
+    ]
+    assert picked
+    assert len(picked) == len(set(picked))
+    assert not set(picked) & set(disliked)
+
+    exact = solve_request(SolveRequest(**{**payload, "max_repeat": 1}))
+    assert result["meta"]["objective"] >= exact["meta"]["objective"] - 1e-6
+
+
+def test_anytime_refinement_reaches_the_cache(monkeypatch, payload):
+    store = SolutionCache(max_entries=8, ttl_sec=60)
+    monkeypatch.setattr(planner, "solution_cache", store)
+    monkeypatch.setattr(jobs, "solution_cache", store)
+    pool = WorkerPool(solve_payload, workers=1, max_queue=4)
+    monkeypatch.setattr(main, "get_pool", lambda: pool)
+    client = TestClient(main.app)
+    request = {**payload, "mode": "anytime"}
+    try:
+        first = client.post("/solve", json=request).json()
+        assert first["meta"]["mode"] == "anytime"
+        job_id = first["meta"]["job_id"]
+        # A repeat while the refinement runs joins the same job
+        assert client.post("/solve", json=request).json()["meta"]["job_id"] == job_id
+
+        deadline = time.time() + 60
+        while not pool.get(job_id).finished and time.time() < deadline:
+            time.sleep(0.05)
+        assert pool.get(job_id).status == "done"
+
+        refined = client.post("/solve", json=request).json()
+        assert refined["meta"]["cached"] is True
+        assert refined["meta"]["objective"] <= first["meta"]["objective"] + 1e-6
+    finally:
+        pool.shutdown()
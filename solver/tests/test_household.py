@@ -0,0 +1,70 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import engines
+import main
+from household import member_plan
+from planner import household_request
+from schemas import HouseholdRequest
+
+
+@pytest.fixture
+def household(payload):
+    targets = payload.pop("targets")
+    disliked = [r["id"] for r in payload["recipes"][:10]]
+    return {
+        **payload,
+        "day_templates": payload["day_templates"][:2],
+        "members": [
+            {"name": "adult", "targets": targets},
+            {
+                "name": "child",
+                "targets": {key: value / 2 for key, value in targets.items()},
+                "dislikes": disliked,
+            },
+        ],
+    }
+
+
+def test_shared_meals_split_into_member_portions(household):
+    result = household_request(HouseholdRequest(**household))
+    assert result["status"] in ("Optimal", "Feasible", "Heuristic")
+    assert result["meta"]["members"] == 2
+    assert result["meta"]["engine"] == engines.SOLVER_ENGINE
+    # The objective is the one of the plan returned
+    assert result["meta"]["objective"] <= result["meta"]["heuristic_objective"]
+
+    disliked = set(household["members"][1]["dislikes"])
+    for day in result["plan"]:
+        for meal in day.values():
+            if meal["recipeId"] is None:
+                continue
+            assert meal["servings"] == pytest.approx(
+                sum(meal["portions"].values()), abs=0.02
+            )
+            if meal["recipeId"] in disliked:
+                assert meal["portions"]["child"] == 0
+
+    child = result["members"]["child"]
+    assert child == member_plan(result["plan"], "child")
+    assert not {meal["recipeId"] for day in child for meal in day.values()} & disliked
+
+
+def test_engine_is_the_server_default(monkeypatch, household):
+    monkeypatch.setattr(engines, "SOLVER_ENGINE", "scip")
+    result = household_request(HouseholdRequest(**household))
+    assert result["meta"]["engine"] == "scip"
+
+
+def test_invalid_households_are_rejected(household):
+    client = TestClient(main.app)
+    twins = {**household, "members": [household["members"][0]] * 2}
+    assert client.post("/solve/household", json=twins).status_code == 422
+    fast = client.post("/solve/household", json={**household, "mode": "fast"})
+    assert fast.status_code == 400
+    for option in ({"num_alternatives": 2}, {"decompose": True}):
+        response = client.post("/solve/household", json={**household, **option})
+        assert response.status_code == 422
+        assert "household plans do not support" in response.text
+    unsplit = client.post("/solve/household", json={**household, "decompose": False})
+    assert unsplit.status_code == 200
@@ -0,0 +1,87 @@
+import os
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from jobs import QueueFull, WorkerPool, _Worker
+
+
+def echo(payload):
+    time.sleep(payload.get("sleep", 0))
+    if payload.get("exit"):
+        os._exit(1)
+    if payload.get("fail"):
+        raise ValueError("asked to fail")
+    return {"status": "Optimal", "echo": payload["value"]}
+
+
+def wait_for(pool, job_id, statuses=("done", "failed", "cancelled"), timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = pool.get(job_id)
+        if job.status in statuses:
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} still {pool.get(job_id).status}")
+
+
+@pytest.fixture
+def pool():
+    pool = WorkerPool(echo, workers=1, max_queue=1)
+    yield pool
+    pool.shutdown()
+
+
+def test_job_runs_on_a_worker(pool):
+    job = pool.submit({"value": 3})
+    assert wait_for(pool, job.id).to_dict()["result"] == {
+        "status": "Optimal",
+        "echo": 3,
+    }
+
+    failed = wait_for(pool, pool.submit({"value": 0, "fail": True}).id)
+    assert failed.status == "failed"
+    assert failed.error == "ValueError: asked to fail"
+
+
+def test_full_queue_raises_with_retry_after(pool):
+    running = pool.submit({"value": 1, "sleep": 5})
+    wait_for(pool, running.id, ("running",))
+    queued = pool.submit({"value": 2})
+    with pytest.raises(QueueFull) as raised:
+        pool.submit({"value": 3})
+    assert raised.value.retry_after >= 1
+
+    # Cancelling frees the slot; a running job's worker is replaced
+    assert pool.cancel(queued.id).status == "cancelled"
+    assert pool.cancel(running.id).status == "cancelled"
+    assert wait_for(pool, pool.submit({"value": 4}).id).result["echo"] == 4
+
+
+def test_dead_worker_is_replaced_without_holding_the_lock(monkeypatch, pool):
+    held = []
+    restart = _Worker.restart
+
+    def recording(worker):
+        held.append(pool._lock.locked())
+        restart(worker)
+
+    monkeypatch.setattr(_Worker, "restart", recording)
+    crashed = wait_for(pool, pool.submit({"value": 1, "exit": True}).id)
+    assert crashed.status == "failed"
+    assert crashed.error == "Solver worker exited unexpectedly"
+    assert wait_for(pool, pool.submit({"value": 2}).id).result["echo"] == 2
+    assert held == [False]
+
+
+def test_full_queue_answers_429(monkeypatch, payload):
+    class Full:
+        def submit(self, *args):
+            raise QueueFull(7)
+
+    monkeypatch.setattr(main, "get_pool", Full)
+    response = TestClient(main.app).post("/solve/jobs", json=payload)
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "7"
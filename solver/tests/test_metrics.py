@@ -0,0 +1,71 @@
+import re
+
+from fastapi.testclient import TestClient
+
+import main
+from metrics import Counter, Histogram, PhaseTimer
+
+
+def sample(text, series):
+    """Value of one series line of a /metrics page, 0 when absent"""
+    match = re.search(rf"^{re.escape(series)} (\S+)$", text, re.MULTILINE)
+    return float(match.group(1)) if match else 0.0
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("h", "help", ("phase",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(value, "solve")
+    lines = histogram.render()
+    assert 'h_bucket{phase="solve",le="0.1"} 1' in lines
+    assert 'h_bucket{phase="solve",le="1"} 2' in lines
+    assert 'h_bucket{phase="solve",le="+Inf"} 3' in lines
+    assert 'h_count{phase="solve"} 3' in lines
+    assert 'h_sum{phase="solve"} 5.55' in lines
+
+
+def test_label_values_are_escaped():
+    counter = Counter("c", "help", ("status",))
+    counter.inc('say "hi"\n')
+    assert counter.render()[-1] == 'c{status="say \\"hi\\"\\n"} 1'
+
+
+def test_phase_timer_reports_timings_and_profile():
+    timer = PhaseTimer(profile=True)
+    with timer.phase("build", profiled=True):
+        sum(range(1000))
+    with timer.phase("build"):
+        pass
+    meta = timer.report({})
+    assert set(meta["timings"]) == {"build_ms", "total_ms"}
+    assert "function calls" in meta["profile"]["top"]
+    assert PhaseTimer().report({}).get("profile") is None
+
+
+def test_solves_show_up_in_metrics(payload):
+    client = TestClient(main.app)
+    before = client.get("/metrics").text
+    series = 'solver_results_total{endpoint="/solve",status="Heuristic",engine="none"}'
+    requests = 'solver_request_seconds_count{endpoint="/solve/jobs/{job_id}"}'
+
+    result = client.post(
+        "/solve", json={**payload, "mode": "fast", "profile": True}
+    ).json()
+    timings = result["meta"]["timings"]
+    assert {"validate_ms", "pool_ms", "heuristic_ms", "total_ms"} <= set(timings)
+    assert "top" in result["meta"]["profile"]
+    client.get("/solve/jobs/unknown")
+
+    after = client.get("/metrics").text
+    assert sample(after, series) == sample(before, series) + 1
+    assert sample(after, requests) == sample(before, requests) + 1
+    assert 'solver_phase_seconds_count{phase="heuristic"}' in after
+    assert 'solver_state{name="cache_entries"}' in after
+
+
+def test_exact_solves_report_model_and_search_stats(payload):
+    meta = TestClient(main.app).post("/solve", json=payload).json()["meta"]
+    assert meta["model"]["variables"] > 0
+    assert meta["model"]["nonzeros"] > 0
+    assert {"engine", "nodes", "gap", "best_bound"} <= set(meta)
+    assert {"build_ms", "solve_ms"} <= set(meta["timings"])
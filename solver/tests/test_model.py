@@ -0,0 +1,95 @@
+import numpy as np
+import pytest
+from ortools.linear_solver import pywraplp
+
+from engines import solve_model
+from model import (
+    BAND_HIGH,
+    BAND_LOW,
+    BIG,
+    N_KEYS,
+    SLOTS,
+    build_model,
+    pack_recipes,
+    solution_picks,
+    target_vector,
+)
+from schemas import Recipe, SolveRequest
+
+
+def reference_objective(recipes, days, targets, weights, max_repeat):
+    """Optimal objective of the model as /solve built it expression by
+    expression before model.py, without slot eligibility or portion bounds"""
+    solver = pywraplp.Solver.CreateSolver("CBC")
+    n = len(recipes)
+    y, z = {}, {}
+    for d in range(days):
+        for s in SLOTS:
+            for i in range(n):
+                y[d, s, i] = solver.BoolVar("")
+                z[d, s, i] = solver.NumVar(0.0, BIG, "")
+            solver.Add(sum(y[d, s, i] for i in range(n)) <= 1)
+            for i in range(n):
+                solver.Add(z[d, s, i] <= BIG * y[d, s, i])
+    deviations = []
+    for d in range(days):
+        for k, key in enumerate(N_KEYS):
+            total = sum(
+                z[d, s, i] * recipes[i].nutrients.model_dump()[key]
+                for s in SLOTS
+                for i in range(n)
+            )
+            over = solver.NumVar(0.0, solver.infinity(), "")
+            under = solver.NumVar(0.0, solver.infinity(), "")
+            solver.Add(total - BAND_HIGH * targets[k] <= over)
+            solver.Add(BAND_LOW * targets[k] - total <= under)
+            deviations += [over, under]
+    for i in range(n):
+        solver.Add(sum(y[d, s, i] for d in range(days) for s in SLOTS) <= max_repeat)
+    picks = [
+        (y[d, s, i], recipes[i]) for d in range(days) for s in SLOTS for i in range(n)
+    ]
+    solver.Minimize(
+        weights["nutri"] * solver.Sum(deviations)
+        + weights["time"] / days * solver.Sum([v * r.time_min for v, r in picks])
+        + weights["cost"] / days * solver.Sum([v * r.cost_eur for v, r in picks])
+    )
+    assert solver.Solve() == pywraplp.Solver.OPTIMAL
+    return solver.Objective().Value()
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_matrix_model_matches_expression_model(recipes, seed):
+    rng = np.random.default_rng(seed)
+    chosen = [recipes[i] for i in rng.choice(len(recipes), 6, replace=False)]
+    # Without slots, every recipe is eligible everywhere, as in the old model
+    pool = [Recipe(**{**r, "slots": None}) for r in chosen]
+    req = SolveRequest(
+        recipes=pool,
+        day_templates=[{}, {}],
+        targets={"energy_kcal": 1800, "protein_g": 70, "fiber_g": 25},
+    )
+    targets = target_vector(req.targets)
+    weights = {"nutri": 1.0, "time": 0.2, "cost": 0.2}
+
+    model = build_model(pack_recipes(pool), 2, targets, weights, 2)
+    outcome = solve_model(model, 30, "cbc")
+
+    assert outcome.status == "Optimal"
+    expected = reference_objective(pool, 2, targets, weights, 2)
+    assert outcome.objective == pytest.approx(expected, rel=1e-6, abs=1e-6)
+
+
+def test_plan_respects_max_repeat_and_one_recipe_per_slot(payload):
+    req = SolveRequest(**payload)
+    matrix = pack_recipes(req.recipes)
+    model = build_model(
+        matrix, 3, target_vector(req.targets), req.weights, max_repeat=1
+    )
+    outcome = solve_model(model, 10, "cbc")
+    picks, servings = solution_picks(model, outcome.values)
+
+    picked = picks[picks >= 0]
+    assert np.bincount(picked).max() <= 1
+    assert (servings[picks >= 0] <= BIG + 1e-9).all()
+    assert (servings[picks < 0] == 0).all()
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from model import build_model, pack_recipes, target_vector
+from planner import resolve_pins, solve_request
+from schemas import SolveRequest
+
+
+def lunch_recipe(recipes):
+    return next(r["id"] for r in recipes if "lunch" in r["slots"])
+
+
+@pytest.mark.parametrize("mode", ["exact", "fast"])
+def test_pinned_slots_keep_their_recipe(payload, mode):
+    pinned = lunch_recipe(payload["recipes"])
+    templates = [{"lunch": pinned}, {}, {"lunch": pinned, "snack": None}]
+    result = solve_request(
+        SolveRequest(**{**payload, "day_templates": templates, "mode": mode})
+    )
+
+    assert result["plan"][0]["lunch"]["recipeId"] == pinned
+    assert result["plan"][2]["lunch"]["recipeId"] == pinned
+    assert result["meta"]["pinned_slots"] == 2
+
+
+def test_pins_remove_variables(payload):
+    pinned = lunch_recipe(payload["recipes"])
+    req = SolveRequest(**{**payload, "day_templates": [{"lunch": pinned}, {}, {}]})
+    matrix = pack_recipes(req.recipes)
+    targets = target_vector(req.targets)
+    free = build_model(matrix, 3, targets, req.weights, req.max_repeat)
+    pins = resolve_pins(req, matrix)
+    fixed = build_model(matrix, 3, targets, req.weights, req.max_repeat, pins)
+
+    assert fixed.num_cols < free.num_cols
+    assert fixed.vars_removed == 2 * int(matrix.eligible[:, 1].sum())
+    # The pinned serving's nutrients move into the day's band
+    assert (fixed.band_low[0] < free.band_low[0]).any()
+    np.testing.assert_array_equal(fixed.band_low[1:], free.band_low[1:])
+
+
+def test_pin_outside_the_pool_is_rejected(payload):
+    req = SolveRequest(**{**payload, "day_templates": [{"dinner": "missing"}, {}, {}]})
+    with pytest.raises(ValueError, match="not in the recipe pool"):
+        solve_request(req)
+
+
+def test_pins_use_up_max_repeat(payload):
+    pinned = lunch_recipe(payload["recipes"])
+    templates = [{"lunch": pinned}, {"lunch": pinned}, {}]
+    result = solve_request(
+        SolveRequest(**{**payload, "day_templates": templates, "max_repeat": 2})
+    )
+    uses = sum(
+        meal["recipeId"] == pinned for day in result["plan"] for meal in day.values()
+    )
+    assert uses == 2
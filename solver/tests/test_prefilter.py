@@ -0,0 +1,85 @@
+import numpy as np
+
+import planner
+from model import pack_recipes, target_vector
+from planner import solve_request
+from prefilter import reduce_pool
+from schemas import Recipe, SolveRequest
+
+TARGETS = {"energy_kcal": 2000, "protein_g": 60}
+
+
+def pool(*recipes):
+    return pack_recipes(
+        [
+            Recipe(id=rid, title=rid, nutrients=nutrients, time_min=time, cost_eur=2)
+            for rid, nutrients, time in recipes
+        ]
+    )
+
+
+def reduce(matrix, days=1, max_repeat=4, top_k=None, keep=None):
+    targets = target_vector(SolveRequest(day_templates=[{}], targets=TARGETS).targets)
+    return reduce_pool(matrix, targets, {}, days, max_repeat, top_k, keep)
+
+
+def test_duplicates_collapse_to_one_row():
+    same = {"energy_kcal": 500, "protein_g": 20}
+    richer = {"energy_kcal": 500, "protein_g": 25}
+    matrix = pool(("a", same, 20), ("b", same, 20), ("c", richer, 30))
+    reduced, stats = reduce(matrix)
+    assert reduced.ids == ["a", "c"]
+    assert stats["duplicates"] == 1
+
+    # A pinned duplicate is the one kept
+    reduced, _ = reduce(matrix, keep={"b"})
+    assert "b" in reduced.ids
+
+
+def test_dominated_recipes_are_dropped_unless_kept():
+    matrix = pool(
+        ("good", {"energy_kcal": 400, "protein_g": 30}, 10),
+        ("worse", {"energy_kcal": 500, "protein_g": 20}, 30),
+        ("other", {"energy_kcal": 300, "protein_g": 10}, 5),
+    )
+    reduced, stats = reduce(matrix)
+    assert reduced.ids == ["good", "other"]
+    assert stats["dominated"] == 1
+    assert reduce(matrix, keep={"worse"})[0].ids == ["good", "worse", "other"]
+
+    # Not dropped when its dominators could not fill the horizon on their own
+    reduced, stats = reduce(matrix, days=7, max_repeat=1)
+    assert stats["dominated"] == 0
+
+
+def test_top_k_caps_candidates_per_slot(payload):
+    matrix = pack_recipes([Recipe(**r) for r in payload["recipes"]])
+    reduced, stats = reduce(matrix, days=3, max_repeat=2, top_k=3)
+    assert (reduced.eligible.sum(axis=0) <= 3).all()
+    assert stats["after"] == len(reduced)
+    assert stats["before"] - stats["after"] == (
+        stats["duplicates"] + stats["dominated"] + stats["outside_top_k"]
+    )
+    assert stats["outside_top_k"] > 0
+
+
+def test_solve_reports_the_reduction(monkeypatch, payload):
+    monkeypatch.setattr(planner, "SOLVER_TOP_K_PER_SLOT", 0)
+    meta = solve_request(SolveRequest(**payload))["meta"]
+    assert meta["prefilter"]["outside_top_k"] == 0
+    assert meta["prefilter"]["after"] == meta["pool_after"]
+
+    meta = solve_request(SolveRequest(**{**payload, "top_k_per_slot": 2}))["meta"]
+    assert meta["prefilter"]["outside_top_k"] > 0
+
+    meta = solve_request(SolveRequest(**{**payload, "prefilter": False}))["meta"]
+    assert meta["prefilter"] is None
+    assert meta["pool_after"] == len(payload["recipes"])
+
+
+def test_matrix_rows_stay_aligned(payload):
+    matrix = pack_recipes([Recipe(**r) for r in payload["recipes"]])
+    reduced, _ = reduce(matrix, days=3, max_repeat=2, top_k=5)
+    rows = [matrix.ids.index(rid) for rid in reduced.ids]
+    np.testing.assert_array_equal(reduced.nutrients, matrix.nutrients[rows])
+    np.testing.assert_array_equal(reduced.cost_eur, matrix.cost_eur[rows])
@@ -0,0 +1,77 @@
+from fastapi.testclient import TestClient
+
+import main
+from planner import solve_request
+from schemas import SolveRequest
+
+
+def previous_plan(payload):
+    return solve_request(SolveRequest(**{**payload, "mode": "fast"}))["plan"]
+
+
+def test_only_the_replaced_slot_changes(payload):
+    plan = previous_plan(payload)
+    replaced = plan[1]["lunch"]["recipeId"]
+    response = TestClient(main.app).post(
+        "/resolve",
+        json={
+            "request": payload,
+            "previous_plan": plan,
+            "replace": [{"day": 1, "slot": "lunch"}],
+        },
+    )
+    assert response.status_code == 200
+    result = response.json()
+
+    assert result["meta"]["changed_slots"] == 1
+    assert result["meta"]["changed_days"] == [1]
+    assert result["plan"][1]["lunch"]["recipeId"] != replaced
+    for d, day in enumerate(plan):
+        for slot, meal in day.items():
+            if (d, slot) != (1, "lunch"):
+                assert result["plan"][d][slot] == meal
+
+
+def test_disliked_meals_and_reoptimized_days_are_replanned(payload):
+    plan = previous_plan(payload)
+    disliked = plan[0]["dinner"]["recipeId"]
+    result = (
+        TestClient(main.app)
+        .post(
+            "/resolve",
+            json={
+                "request": {**payload, "dislikes": [disliked]},
+                "previous_plan": plan,
+                "reoptimize_days": [2],
+            },
+        )
+        .json()
+    )
+
+    changed = {
+        (d, slot)
+        for d, day in enumerate(plan)
+        for slot, meal in day.items()
+        if d == 2 or meal["recipeId"] == disliked
+    }
+    assert result["meta"]["changed_slots"] == len(changed)
+    assert all(
+        meal["recipeId"] != disliked for day in result["plan"] for meal in day.values()
+    )
+    for d, day in enumerate(plan):
+        for slot, meal in day.items():
+            if (d, slot) not in changed:
+                assert result["plan"][d][slot] == meal
+
+
+def test_day_outside_the_plan_is_rejected(payload):
+    response = TestClient(main.app).post(
+        "/resolve",
+        json={
+            "request": payload,
+            "previous_plan": previous_plan(payload),
+            "replace": [{"day": 5, "slot": "lunch"}],
+        },
+    )
+    assert response.status_code == 400
+    assert "outside the previous plan" in response.json()["detail"]
@@ -0,0 +1,78 @@
+import importlib.util
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from model import N_KEYS
+from snapshot import NutrientSnapshot
+
+# The importer side of the format, which writes the files the solver maps
+_spec = importlib.util.spec_from_file_location(
+    "nutrient_snapshot",
+    Path(__file__).resolve().parents[2] / "db" / "nutrient_snapshot.py",
+)
+nutrient_snapshot = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(nutrient_snapshot)
+
+FOODS = [
+    {
+        "ciqual_code": "20047",
+        "food_name_fr": "Épinard, cru",
+        "food_group": "légumes",
+        "food_subgroup": None,
+        "data_quality_score": 38,
+        "energy_kcal": 28.6,
+        "protein_g": 2.97,
+        "vitamin_b12_ug": None,
+    },
+    {
+        "ciqual_code": "9081",
+        "food_name_fr": "Tofu nature",
+        "food_group": "aides culinaires",
+        "food_subgroup": "substituts",
+        "data_quality_score": 52,
+        "energy_kcal": 123.0,
+        "protein_g": 12.7,
+        "calcium_mg": 350.0,
+    },
+]
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    source = tmp_path / "ciqual.csv"
+    source.write_text("alim_code;alim_nom_fr\n")
+    path = tmp_path / "ciqual.snapshot"
+    nutrient_snapshot.write_snapshot(path, FOODS, source)
+    return NutrientSnapshot(str(path))
+
+
+def test_keys_are_the_solver_keys():
+    assert list(nutrient_snapshot.SOLVER_KEYS) == N_KEYS
+
+
+def test_foods_are_looked_up_by_code(snapshot):
+    assert len(snapshot) == 2
+    assert "9081" in snapshot and "1" not in snapshot
+    tofu = snapshot.food("9081", grams=50)
+    assert tofu["name"] == "Tofu nature"
+    assert tofu["nutrients"]["protein_g"] == pytest.approx(6.35, abs=1e-4)
+    assert tofu["nutrients"]["calcium_mg"] == pytest.approx(175)
+    # Missing values read as zero
+    assert snapshot.food("20047")["nutrients"]["b12_ug"] == 0
+    assert not snapshot.nutrients.flags.writeable
+
+
+def test_foods_endpoints(monkeypatch, snapshot):
+    client = TestClient(main.app)
+    monkeypatch.setattr(main, "nutrient_snapshot", None)
+    assert client.get("/foods").status_code == 404
+
+    monkeypatch.setattr(main, "nutrient_snapshot", snapshot)
+    assert client.get("/foods").json()["foods"] == 2
+    spinach = client.get("/foods/20047", params={"grams": 200}).json()
+    assert spinach["nutrients"]["energy_kcal"] == pytest.approx(57.2, abs=1e-3)
+    assert client.get("/foods/1").status_code == 404
+    assert client.get("/foods/20047", params={"grams": 0}).status_code == 422
@@ -0,0 +1,76 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+import planner
+from cache import SolutionCache
+
+
+@pytest.fixture(autouse=True)
+def store(monkeypatch):
+    """An empty cache, so no stream is a replay of an earlier solve"""
+    store = SolutionCache(max_entries=8, ttl_sec=60)
+    monkeypatch.setattr(planner, "solution_cache", store)
+    return store
+
+
+def events(response):
+    parsed = []
+    for block in response.text.strip().split("\n\n"):
+        kind, data = block.split("\n")
+        parsed.append((kind.removeprefix("event: "), json.loads(data[len("data: ") :])))
+    return parsed
+
+
+def test_incumbents_improve_then_final(payload):
+    response = TestClient(main.app).post("/solve/stream", json=payload)
+    assert response.headers["content-type"].startswith("text/event-stream")
+    stream = events(response)
+
+    kinds = [kind for kind, _ in stream]
+    assert kinds[-1] == "final"
+    assert set(kinds[:-1]) == {"incumbent"}
+    incumbents = [body for kind, body in stream if kind == "incumbent"]
+    assert incumbents
+    objectives = [body["objective"] for body in incumbents]
+    assert objectives == sorted(objectives, reverse=True)
+    for body in incumbents:
+        assert len(body["plan"]) == len(payload["day_templates"])
+        assert {"recipeId", "servings"} <= set(body["plan"][0]["lunch"])
+        assert body["elapsed_ms"] >= 0
+
+    # The stream's default engine, CP-SAT, starts from the heuristic plan
+    assert incumbents[0]["source"] == "heuristic"
+    final = stream[-1][1]
+    assert final["status"] in ("Optimal", "Feasible", "Heuristic")
+    assert final["meta"]["objective"] == pytest.approx(objectives[-1], rel=1e-6)
+
+
+def test_anytime_streams_the_heuristic_first(payload):
+    request = {**payload, "mode": "anytime"}
+    stream = events(TestClient(main.app).post("/solve/stream", json=request))
+    assert stream[0][0] == "incumbent"
+    assert stream[0][1]["source"] == "heuristic"
+    # The MIP result, or the heuristic plan when the MIP did not beat it
+    final = stream[-1][1]
+    assert final["meta"]["objective"] <= stream[0][1]["objective"] + 1e-4
+    if final["status"] == "Heuristic":
+        assert final["plan"] == stream[0][1]["plan"]
+
+
+def test_cached_result_is_replayed_as_final(payload, store):
+    request = {**payload, "mode": "fast"}
+    solved = TestClient(main.app).post("/solve", json=request).json()
+    stream = events(TestClient(main.app).post("/solve/stream", json=request))
+    assert [kind for kind, _ in stream] == ["final"]
+    assert stream[0][1]["plan"] == solved["plan"]
+    assert stream[0][1]["meta"]["cached"] is True
+
+
+def test_errors_close_the_stream(payload):
+    request = {**payload, "day_templates": [{"dinner": "missing"}]}
+    stream = events(TestClient(main.app).post("/solve/stream", json=request))
+    assert stream == [("error", {"status_code": 400, "detail": stream[0][1]["detail"]})]
+    assert "not in the recipe pool" in stream[0][1]["detail"]
@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from planner import solve_request
+from schemas import SolveRequest
+from scoring import best_portions, rank_substitutes
+
+
+def deviation(totals, low, high):
+    return (np.maximum(0, totals - high) + np.maximum(0, low - totals)).sum(axis=-1)
+
+
+def test_best_portions_beat_a_fine_grid():
+    rng = np.random.default_rng(0)
+    base = rng.uniform(0, 50, 6)
+    nutrients = rng.uniform(0, 40, (200, 6))
+    low, high = np.full(6, 60.0), np.full(6, 80.0)
+    pmin, pmax = np.full(200, 0.5), np.full(200, 2.0)
+
+    servings, dev = best_portions(base, nutrients, low, high, pmin, pmax)
+    assert ((servings >= pmin - 1e-9) & (servings <= pmax + 1e-9)).all()
+    np.testing.assert_allclose(
+        dev, deviation(base + servings[:, None] * nutrients, low, high), atol=1e-9
+    )
+    grid = np.linspace(0.5, 2.0, 301)
+    on_grid = deviation(
+        base + grid[None, :, None] * nutrients[:, None, :], low, high
+    ).min(axis=1)
+    assert (dev <= on_grid + 1e-9).all()
+
+
+def test_ranking_is_best_first_and_capped():
+    rng = np.random.default_rng(1)
+    nutrients = rng.uniform(0, 40, (50, 6))
+    cost = rng.uniform(0, 5, 50)
+    low, high = np.full(6, 60.0), np.full(6, 80.0)
+    ones = np.ones(50)
+    rows, _, dev, score = rank_substitutes(
+        np.zeros(6), nutrients, low, high, 0.5 * ones, 2 * ones, cost, 2.0, 5
+    )
+    assert len(rows) == 5
+    assert (np.diff(score) >= 0).all()
+    np.testing.assert_allclose(score, 2.0 * dev + cost[rows])
+    _, all_dev = best_portions(np.zeros(6), nutrients, low, high, 0.5 * ones, 2 * ones)
+    assert score[-1] <= np.sort(2.0 * all_dev + cost)[4] + 1e-9
+
+
+def test_endpoint_skips_the_current_meal_and_full_repeats(payload):
+    plan = solve_request(SolveRequest(**{**payload, "mode": "fast"}))["plan"]
+    current = plan[0]["lunch"]["recipeId"]
+    response = TestClient(main.app).post(
+        "/substitutes",
+        json={
+            "request": {**payload, "max_repeat": 1},
+            "plan": plan,
+            "day": 0,
+            "slot": "lunch",
+            "top_n": 200,
+        },
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert body["current"]["recipeId"] == current
+
+    planned = {meal["recipeId"] for day in plan for meal in day.values()}
+    candidates = [c["recipeId"] for c in body["candidates"]]
+    assert candidates
+    assert not set(candidates) & planned
+    lunch = {r["id"] for r in payload["recipes"] if "lunch" in r["slots"]}
+    assert set(candidates) <= lunch
+    scores = [c["score"] for c in body["candidates"]]
+    assert scores == sorted(scores)
+    first = body["candidates"][0]
+    assert first["score_change"] == pytest.approx(
+        first["score"] - body["current"]["score"], abs=1e-3
+    )
+
+
+def test_day_outside_the_plan_is_rejected(payload):
+    plan = solve_request(SolveRequest(**{**payload, "mode": "fast"}))["plan"]
+    response = TestClient(main.app).post(
+        "/substitutes",
+        json={"request": payload, "plan": plan, "day": 3, "slot": "lunch"},
+    )
+    assert response.status_code == 400
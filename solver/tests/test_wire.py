@@ -0,0 +1,85 @@
+import msgpack
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from model import pack_recipes
+from schemas import Recipe
+from wire import MSGPACK, pack_columns, unpack_columns, wants_msgpack
+
+
+@pytest.mark.parametrize(
+    "accept, expected",
+    [
+        (None, False),
+        ("application/json", False),
+        ("application/msgpack", True),
+        ("application/x-msgpack, application/json;q=0.5", True),
+        ("application/msgpack;q=0.5, */*", False),
+        ("application/msgpack, application/json", False),
+        ("application/msgpack;q=0", False),
+    ],
+)
+def test_accept_negotiation(accept, expected):
+    assert wants_msgpack(accept) is expected
+
+
+@pytest.mark.parametrize("dtype", ["<f8", "<f4"])
+def test_columns_unpack_to_the_packed_matrix(recipes, dtype):
+    matrix = unpack_columns(pack_columns(recipes, dtype))
+    expected = pack_recipes([Recipe(**r) for r in recipes])
+    assert matrix.ids == expected.ids
+    rtol = 1e-12 if dtype == "<f8" else 1e-6
+    np.testing.assert_allclose(matrix.nutrients, expected.nutrients, rtol=rtol)
+    np.testing.assert_array_equal(matrix.eligible, expected.eligible)
+    np.testing.assert_allclose(matrix.portion_max, expected.portion_max, rtol=rtol)
+
+
+def post(client, body, accept="application/msgpack"):
+    return client.post(
+        "/solve",
+        content=msgpack.packb(body),
+        headers={"Content-Type": MSGPACK, "Accept": accept},
+    )
+
+
+def test_msgpack_round_trip_matches_json(payload):
+    client = TestClient(main.app)
+    request = {**payload, "mode": "fast"}
+    as_json = client.post("/solve", json=request).json()
+
+    inline = post(client, request)
+    assert inline.headers["content-type"] == MSGPACK
+    assert msgpack.unpackb(inline.content)["plan"] == as_json["plan"]
+
+    block = pack_columns(payload["recipes"])
+    columns = {**request, "recipes": [], "recipe_columns": block}
+    packed = post(client, columns, accept="application/json")
+    assert packed.headers["content-type"].startswith("application/json")
+    assert packed.json()["plan"] == as_json["plan"]
+
+
+def test_invalid_bodies_are_rejected(payload):
+    client = TestClient(main.app)
+    request = {**payload, "mode": "fast", "recipes": []}
+    block = pack_columns(payload["recipes"][:3])
+
+    duplicates = {**block, "ids": [block["ids"][0]] * 3}
+    response = post(client, {**request, "recipe_columns": duplicates})
+    assert response.status_code == 422
+    assert "duplicates" in response.json()["detail"]
+
+    short = {**block, "nutrients": block["nutrients"][:-8]}
+    assert post(client, {**request, "recipe_columns": short}).status_code == 422
+
+    not_a_map = client.post(
+        "/solve", content=msgpack.packb([1, 2]), headers={"Content-Type": MSGPACK}
+    )
+    assert not_a_map.status_code == 422
+    garbage = client.post("/solve", content=b"\xc1", headers={"Content-Type": MSGPACK})
+    assert garbage.status_code == 422
+
+    both = post(client, {**payload, "recipe_columns": block})
+    assert both.status_code == 422
+    assert post(client, {"recipes": 3}).status_code == 422
@@ -0,0 +1,271 @@
+"""Wire formats of /solve: JSON by default, MessagePack on request.
+
+Clients opt in with `Content-Type: application/msgpack` for the request and
+`Accept: application/msgpack` for the response; both are independent and
+JSON stays the default. A MessagePack SolveRequest may replace `recipes`
+with a columnar `recipe_columns` block, all arrays row-major little-endian:
+
+    ids          [str], n recipe ids
+    dtype        "<f8" (default) or "<f4" (half the bytes, ~7 significant digits), of the float arrays below
+    nutrients    bytes, (n, len(N_KEYS)) per serving, in N_KEYS order
+    time_min     bytes, (n,)
+    cost_eur     bytes, (n,)
+    eligible     bytes, (n, len(SLOTS)) uint8, slots each recipe may fill (all when omitted)
+    portion_min  bytes, (n, len(SLOTS)) servings bounds (0 and BIG when omitted)
+    portion_max  bytes, (n, len(SLOTS))
+
+It is read with np.frombuffer straight into a RecipeMatrix: no Recipe or
+Nutrients instance per recipe, no per-value JSON parsing. pack_columns()
+builds the block from Recipe-shaped dicts.
+"""
+
+import hashlib
+import json
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from catalog import Catalog
+from model import BIG, N_KEYS, SLOTS, RecipeMatrix
+from schemas import SolveRequest
+
+try:
+    import msgpack
+except ImportError:  # MessagePack is then refused, JSON still works
+    msgpack = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+MSGPACK_TYPES = {MSGPACK, "application/x-msgpack", "application/vnd.msgpack"}
+FLOAT_DTYPES = ("<f8", "<f4")
+MAX_PORTION = 10.0  # as PortionBounds.max
+
+
+class UnsupportedMediaType(Exception):
+    pass
+
+
+def _media_type(value: Optional[str]) -> str:
+    return (value or "").split(";", 1)[0].strip().lower()
+
+
+def is_msgpack(content_type: Optional[str]) -> bool:
+    return _media_type(content_type) in MSGPACK_TYPES
+
+
+def wants_msgpack(accept: Optional[str]) -> bool:
+    """Whether the Accept header prefers MessagePack over JSON (ties and
+    wildcards go to JSON); always False without the msgpack package"""
+    if msgpack is None or not accept:
+        return False
+    best_msgpack = best_json = 0.0
+    for part in accept.split(","):
+        media, *params = [item.strip() for item in part.split(";")]
+        q = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        media = media.lower()
+        if media in MSGPACK_TYPES:
+            best_msgpack = max(best_msgpack, q)
+        elif media in (JSON, "application/*", "*/*"):
+            best_json = max(best_json, q)
+    return best_msgpack > 0 and best_msgpack > best_json
+
+
+def decode_solve(
+    body: bytes, content_type: Optional[str]
+) -> Tuple[SolveRequest, Optional[Catalog]]:
+    """SolveRequest of a request body, plus the packed pool of its
+    recipe_columns block when it has one (passed to solve_request as `catalog`).
+    Raises pydantic's ValidationError, TypeError or ValueError on invalid bodies."""
+    if not is_msgpack(content_type):
+        return SolveRequest.model_validate_json(body), None
+    if msgpack is None:
+        raise UnsupportedMediaType(
+            "MessagePack needs the msgpack package on the server"
+        )
+    try:
+        payload = msgpack.unpackb(body, raw=False)
+    except Exception as e:
+        raise ValueError(f"Invalid MessagePack body: {e}")
+    if not isinstance(payload, dict):
+        raise TypeError("MessagePack body must be a map")
+    block = payload.pop("recipe_columns", None)
+    req = SolveRequest.model_validate(payload)
+    if block is None:
+        return req, None
+    if req.recipes or req.catalog_id:
+        raise ValueError(
+            "recipe_columns replaces recipes and catalog_id, send only one of them"
+        )
+    return req, columns_catalog(block)
+
+
+def _column(
+    block: Dict[str, Any], name: str, dtype: str, shape: Tuple[int, ...]
+) -> Optional[np.ndarray]:
+    raw = block.get(name)
+    if raw is None:
+        return None
+    if not isinstance(raw, (bytes, bytearray)):
+        raise TypeError(f"recipe_columns.{name} must be binary")
+    expected = int(np.prod(shape)) * np.dtype(dtype).itemsize
+    if len(raw) != expected:
+        raise ValueError(
+            f"recipe_columns.{name} has {len(raw)} bytes, expected {expected} for shape {shape}"
+        )
+    return np.frombuffer(raw, dtype=dtype).reshape(shape)
+
+
+def unpack_columns(block: Dict[str, Any]) -> RecipeMatrix:
+    """RecipeMatrix of a recipe_columns block, validated as Recipe would be"""
+    if not isinstance(block, dict):
+        raise TypeError("recipe_columns must be a map")
+    ids = block.get("ids")
+    if not isinstance(ids, list) or not all(isinstance(rid, str) for rid in ids):
+        raise TypeError("recipe_columns.ids must be a list of strings")
+    if len(set(ids)) != len(ids):
+        duplicates = sorted(rid for rid, count in Counter(ids).items() if count > 1)
+        raise ValueError(
+            f"recipe_columns.ids has duplicates: {', '.join(duplicates[:5])}"
+        )
+    n, S = len(ids), len(SLOTS)
+    dtype = block.get("dtype", "<f8")
+    if dtype not in FLOAT_DTYPES:
+        raise ValueError(
+            f"recipe_columns.dtype must be one of {', '.join(FLOAT_DTYPES)}"
+        )
+
+    arrays = {}
+    for name, shape in (
+        ("nutrients", (n, len(N_KEYS))),
+        ("time_min", (n,)),
+        ("cost_eur", (n,)),
+    ):
+        array = _column(block, name, dtype, shape)
+        if array is None:
+            raise ValueError(f"recipe_columns.{name} is required")
+        arrays[name] = array.astype(np.float64)
+    eligible = _column(block, "eligible", "u1", (n, S))
+    portion_min = _column(block, "portion_min", dtype, (n, S))
+    portion_max = _column(block, "portion_max", dtype, (n, S))
+    portion_min = (
+        np.zeros((n, S)) if portion_min is None else portion_min.astype(np.float64)
+    )
+    portion_max = (
+        np.full((n, S), BIG) if portion_max is None else portion_max.astype(np.float64)
+    )
+
+    for name, array in (
+        *arrays.items(),
+        ("portion_min", portion_min),
+        ("portion_max", portion_max),
+    ):
+        if not np.isfinite(array).all():
+            raise ValueError(f"recipe_columns.{name} must be finite")
+    if (
+        (portion_min < 0).any()
+        or (portion_max <= 0).any()
+        or (portion_max > MAX_PORTION).any()
+    ):
+        raise ValueError(
+            f"recipe_columns portions must satisfy 0 <= min and 0 < max <= {MAX_PORTION:g}"
+        )
+    if (portion_min > portion_max).any():
+        raise ValueError("portion min must not exceed max")
+
+    return RecipeMatrix(
+        ids=ids,
+        nutrients=arrays["nutrients"],
+        time_min=arrays["time_min"],
+        cost_eur=arrays["cost_eur"],
+        eligible=(
+            np.ones((n, S), dtype=bool) if eligible is None else eligible.astype(bool)
+        ),
+        portion_min=portion_min,
+        portion_max=portion_max,
+    )
+
+
+def columns_catalog(block: Dict[str, Any]) -> Catalog:
+    """An unregistered Catalog around a recipe_columns block; its digest keys
+    the solution cache in place of the recipes"""
+    matrix = unpack_columns(block)
+    digest = hashlib.sha256("\x00".join(matrix.ids).encode("utf-8"))
+    digest.update(str(block.get("dtype", "<f8")).encode())
+    for name in (
+        "nutrients",
+        "time_min",
+        "cost_eur",
+        "eligible",
+        "portion_min",
+        "portion_max",
+    ):
+        digest.update(name.encode())
+        digest.update(block.get(name) or b"")
+    return Catalog(
+        id="recipe_columns",
+        version=0,
+        digest=digest.hexdigest(),
+        matrix=matrix,
+        registered_at=time.time(),
+    )
+
+
+def pack_columns(recipes: List[Dict[str, Any]], dtype: str = "<f8") -> Dict[str, Any]:
+    """recipe_columns block of Recipe-shaped dicts (client side of unpack_columns)"""
+    n, S = len(recipes), len(SLOTS)
+    slot_index = {slot: j for j, slot in enumerate(SLOTS)}
+    eligible = np.ones((n, S), dtype="u1")
+    portion_min = np.zeros((n, S), dtype=dtype)
+    portion_max = np.full((n, S), BIG, dtype=dtype)
+    for i, r in enumerate(recipes):
+        if r.get("slots") is not None:
+            eligible[i] = 0
+            eligible[i, [slot_index[slot] for slot in r["slots"]]] = 1
+        for slot, bounds in (r.get("portions") or {}).items():
+            portion_min[i, slot_index[slot]] = bounds.get("min", 0.0)
+            portion_max[i, slot_index[slot]] = bounds.get("max", 2.0)
+    return {
+        "ids": [r["id"] for r in recipes],
+        "dtype": dtype,
+        "nutrients": np.array(
+            [[r["nutrients"].get(key, 0) for key in N_KEYS] for r in recipes],
+            dtype=dtype,
+        ).tobytes(),
+        "time_min": np.array(
+            [r.get("time_min", 20) for r in recipes], dtype=dtype
+        ).tobytes(),
+        "cost_eur": np.array(
+            [r.get("cost_eur", 2.5) for r in recipes], dtype=dtype
+        ).tobytes(),
+        "eligible": eligible.tobytes(),
+        "portion_min": portion_min.tobytes(),
+        "portion_max": portion_max.tobytes(),
+    }
+
+
+def encode(result: Any, msgpack_response: bool) -> Tuple[bytes, str]:
+    """Response body and media type; JSON goes through orjson when installed"""
+    if msgpack_response:
+        return msgpack.packb(result, use_bin_type=True), MSGPACK
+    if orjson is not None:
+        return orjson.dumps(result), JSON
+    # As Starlette's JSONResponse renders it
+    return (
+        json.dumps(
+            result, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+        ).encode("utf-8"),
+        JSON,
+    )
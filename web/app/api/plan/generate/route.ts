@@ -86,22 +86,25 @@ export async function POST(req: NextRequest) {
       }
     }
 
-    // Generate day templates
+    // Generate day templates (a recipe id in a slot pins it for the solver)
     const dayTemplates = Array.from({ length: 7 }).map(() => ({
-      breakfast: recipes[0]?.id || null,
-      lunch: recipes[1]?.id || null,
-      dinner: recipes[2]?.id || null,
+      breakfast: null,
+      lunch: null,
+      dinner: null,
       snack: null
     }))
 
     let planResult: any
     let solverSource = 'mock'
+    let solverError = ''
 
-    // Try real solver if configured and reachable
+    // Real solver when configured; its fast plan replaces the old mock fallback
     if (config.services.solver.configured) {
       const solverHealthy = await testSolverConnectivity(config.services.solver.url!)
       
-      if (solverHealthy) {
+      if (!solverHealthy) {
+        solverError = 'Solver health check failed'
+      } else {
         try {
           const resp = await fetchWithTimeout(`${config.services.solver.url}/solve`, {
             method: 'POST',
@@ -111,7 +114,9 @@ export async function POST(req: NextRequest) {
               day_templates: dayTemplates,
               targets,
               weights: { nutri: 1.0, time: 0.2, cost: 0.2 },
-              dislikes: []
+              dislikes: [],
+              // Heuristic plan in milliseconds; the solver refines it in the background
+              mode: 'anytime'
             }),
             timeout: 30000 // 30 second timeout
           })
@@ -122,17 +127,27 @@ export async function POST(req: NextRequest) {
           } else {
             throw new Error(`Solver HTTP ${resp.status}`)
           }
-        } catch (error) {
-          console.warn('Real solver failed, using mock solver:', error)
+        } catch (error: any) {
+          console.warn('Real solver failed:', error)
+          solverError = error?.message || String(error)
         }
       }
+
+      if (!planResult) {
+        return NextResponse.json({
+          ok: false,
+          error: 'Solver unavailable',
+          details: solverError
+        }, { status: 502 })
+      }
     }
 
-    // Fallback to mock solver
+    // Demo mode (no solver configured): placeholder plan
     if (!planResult) {
-      // Simple mock solver implementation directly here
+      // Simple mock solver implementation directly here; "Demo" keeps clients
+      // from taking it for a solved plan ("Optimal", "Feasible", "Heuristic")
       const mockPlan = {
-        status: "Optimal",
+        status: "Demo",
         plan: Array.from({ length: 7 }).map((_, day) => ({
           breakfast: { recipeId: recipes[0]?.id || `mock-${day + 1}-breakfast`, servings: 1.5 },
           lunch: { recipeId: recipes[1]?.id || `mock-${day + 1}-lunch`, servings: 1.0 },